@@ -30,7 +30,9 @@ def parse_evs_ivs(line):
             
     return stats
 
-def load_party_from_file(file_path="my_team.txt"):
+def load_party_from_file(file_path="my_team.txt", party=None):
+    """ party: 등록할 UserParty (세션별). 없으면 전역 my_party """
+    party = party or my_party
     print(f"📂 '{file_path}'에서 파티 정보를 불러옵니다...")
     
     if not os.path.exists(file_path):
@@ -109,7 +111,7 @@ def load_party_from_file(file_path="my_team.txt"):
             )
 
         # 4. UserParty에 등록
-        my_party.add_pokemon(
+        party.add_pokemon(
             name=name,
             stats=final_stats,
             item=item,
@@ -118,7 +120,7 @@ def load_party_from_file(file_path="my_team.txt"):
             tera_type=tera_type
         )
 
-    print(f"✅ 총 {len(my_party.team)}마리의 포켓몬이 파티에 등록되었습니다!\n")
+    print(f"✅ 총 {len(party.team)}마리의 포켓몬이 파티에 등록되었습니다!\n")
 
 # 테스트 실행
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 # user_party.py
 
+from battle_codes import SPECIES
+
 class UserParty:
     def __init__(self):
         self.team = {} # 내 포켓몬들이 저장될 딕셔너리
@@ -8,7 +10,9 @@ class UserParty:
         """
         사용자가 입력한 상세 정보를 저장합니다.
         stats: {'hp': 131, 'atk': 76, 'def': 75, 'spa': 187, 'spd': 155, 'spe': 205} (실수치)
+        name은 표준 표기로 저장 ('Flutter-Mane' -> 'Flutter Mane', 배틀 상태/통계와 같은 키)
         """
+        name = SPECIES.canonical(name)
         self.team[name] = {
             "stats": stats,
             "item": item,
@@ -20,7 +24,7 @@ class UserParty:
         print(f"✅ 내 파티 등록 완료: {name} (HP: {stats.get('hp')}) (ATK: {stats.get('atk')}) (DEF: {stats.get('def')}) (SPA: {stats.get('spa')}) (SPD: {stats.get('spd')}) (SPE: {stats.get('spe')})")
 
     def get_pokemon(self, name):
-        return self.team.get(name)
+        return self.team.get(SPECIES.canonical(name))
 
 # 전역 인스턴스 생성 (어디서든 불러다 쓸 수 있게)
 my_party = UserParty()
\ No newline at end of file
@@ -2,6 +2,18 @@ import math
 import os
 import sys
 
+try:
+    import telemetry   # 앱에서 불러올 때만 계측 (Calculator 폴더를 단독 실행하면 없음)
+    from profiler import profiled
+except ImportError:
+    telemetry = None
+    def profiled(name): return lambda func: func
+
+try:
+    from Calculator.modifiers import compile_damage
+except ImportError:
+    from modifiers import compile_damage
+
 # ---------------------------------------------------------
 # [1] 데이터 및 유틸리티
 # ---------------------------------------------------------
@@ -46,7 +58,12 @@ def apply_rank(stat_value, stage):
 # [2] 데미지 계산 로직 (Pure Function)
 # ---------------------------------------------------------
 
-def calculate_damage_math(att_spec, def_spec, move_spec, field_spec):
+def calculate_damage_math(att_spec, def_spec, move_spec, field_spec, chain=None):
+    """
+    chain: compile_damage(att_spec, def_spec, field_spec) 결과
+    같은 대면의 기술 여러 개를 계산할 때 한 번 만들어 넘기면 보정 선택을 다시 하지 않음
+    """
+    if telemetry: telemetry.count("calc_calls")
 
     level = 50
     
@@ -54,28 +71,18 @@ def calculate_damage_math(att_spec, def_spec, move_spec, field_spec):
     move_power = move_spec['power']
     move_type = move_spec['type']
     move_cat = move_spec['category'] # Physical / Special
-    is_crit = move_spec.get('is_crit', False) # [New] 급소 여부
-    
-    weather = field_spec.get('weather')
-    terrain = field_spec.get('terrain')
-    screens = def_spec.get('screens', {}) 
-    
-    # 1. 위력 보정 (날씨/필드)
-    weather_mod = 1.0
-    if weather == "Sun":
-        if move_type == "Fire": weather_mod = 1.5
-        elif move_type == "Water": weather_mod = 0.5
-    elif weather == "Rain":
-        if move_type == "Water": weather_mod = 1.5
-        elif move_type == "Fire": weather_mod = 0.5
-        
-    terrain_mod = 1.0
-    if terrain == "Electric" and move_type == "Electric": terrain_mod = 1.3
-    elif terrain == "Grassy" and move_type == "Grass": terrain_mod = 1.3
-    elif terrain == "Psychic" and move_type == "Psychic": terrain_mod = 1.3
-    elif terrain == "Misty" and move_type == "Dragon": terrain_mod = 0.5
+    is_crit = bool(move_spec.get('is_crit', False)) # [New] 급소 여부
 
-    base_power = math.floor(move_power * weather_mod * terrain_mod)
+    # 도구/날씨/필드/화상/벽 보정 (Calculator/modifiers.py 레지스트리)
+    if chain is None:
+        chain = compile_damage(att_spec, def_spec, field_spec)
+    power_mods, damage_mods = chain.for_move(move_type, move_cat, is_crit)
+    
+    # 1. 위력 보정 (날씨 -> 필드 순으로 곱한 뒤 한 번 내림)
+    base_power = move_power
+    for m in power_mods:
+        base_power *= m
+    base_power = math.floor(base_power)
     
     # 2. 스탯 결정 및 랭크 반영 (급소 로직 적용)
     # 급소 시: 공격자의 '랭크 다운' 무시 / 방어자의 '랭크 업' 무시
@@ -103,26 +110,9 @@ def calculate_damage_math(att_spec, def_spec, move_spec, field_spec):
     base_damage = math.floor((math.floor((2 * level / 5 + 2) * base_power * final_atk / final_def) / 50) + 2)
     damage = base_damage
 
-    # 4. 보정치 적용
-    
-    # (1) 화상 (물리 0.5배) - 객기 예외처리는 생략(호출자가 power를 2배로 주거나 해야 함)
-    if att_spec.get('status') == "Burn" and move_cat == "Physical":
-        damage = math.floor(damage * 0.5)
-        
-    # (2) 벽 (0.5배) - [New] 급소 시 무시
-    if screens and not is_crit:
-        if move_cat == "Physical" and screens.get('reflect'):
-            damage = math.floor(damage * 0.5)
-        elif move_cat == "Special" and screens.get('light_screen'):
-            damage = math.floor(damage * 0.5)
-
-    # (3) 도구 (간단 예시)
-    item_mod = 1.0
-    item = att_spec.get('item')
-    if item == "Choice Band" and move_cat == "Physical": item_mod = 1.5
-    elif item == "Choice Specs" and move_cat == "Special": item_mod = 1.5
-    elif item == "Life Orb": item_mod = 1.3
-    damage = math.floor(damage * item_mod)
+    # 4. 보정치 적용: 화상(물리 0.5) -> 벽(0.5, 급소 무시) -> 도구, 단계마다 내림
+    for m in damage_mods:
+        damage = math.floor(damage * m)
     
     # (4) 급소 (1.5배)
     is_tera = att_spec.get('is_terastal', False)
@@ -182,14 +172,15 @@ def calculate_damage_math(att_spec, def_spec, move_spec, field_spec):
 # [3] 메인 실행 함수 (Interface)
 # ---------------------------------------------------------
 
-def run_calculation(attacker_spec, defender_spec, move_spec, field_spec):
+@profiled("run_calculation")
+def run_calculation(attacker_spec, defender_spec, move_spec, field_spec, chain=None):
     """
     [Interface Function]
     외부에서 스펙을 입력받아 데미지 계산 결과만 반환합니다.
     """
     
     # 데미지 계산
-    dmg_res = calculate_damage_math(attacker_spec, defender_spec, move_spec, field_spec)
+    dmg_res = calculate_damage_math(attacker_spec, defender_spec, move_spec, field_spec, chain)
     
     # 결과 반환
     return {
@@ -0,0 +1,161 @@
+# Calculator/modifiers.py
+
+from collections import namedtuple
+
+# ---------------------------------------------------------
+# [보정 레지스트리] 도구/특성/날씨/필드/상태/벽 보정을 표로 선언
+# - (출처, 값) -> 보정 목록. 예) ("item", "Choice Band") -> 물리 기술이면 ITEM 단계 1.5배
+# - 대면(공격자, 방어자, 필드)마다 해당하는 보정만 모아 한 번 컴파일
+#   -> 기술(타입/분류/급소)별 배율 묶음은 처음 쓸 때 만들고 재사용
+# - 같은 조합이면 같은 컴파일 결과를 공유 (도구를 더 등록해도 계산 때는 dict 조회 한 번)
+# - 단계와 내림(floor) 순서는 기존 calculate_damage_math / calculate_dynamic_speed와 동일
+# ---------------------------------------------------------
+
+# 데미지 단계 (이 순서대로 적용)
+POWER = "power"      # 위력: 곱한 뒤 한 번에 내림
+BURN = "burn"        # 이하 기초 데미지 이후, 단계마다 내림
+SCREEN = "screen"
+ITEM = "item"
+DAMAGE_STEPS = (BURN, SCREEN, ITEM)
+
+# 스피드 단계 (랭크 반영 뒤, 단계마다 int)
+SPEED_ITEM = "speed_item"
+SPEED_ABILITY = "speed_ability"
+SPEED_STATUS = "speed_status"
+SPEED_TAILWIND = "speed_tailwind"
+SPEED_STEPS = (SPEED_ITEM, SPEED_ABILITY, SPEED_STATUS, SPEED_TAILWIND)
+
+Modifier = namedtuple("Modifier", ["stage", "mult", "when"])
+Not = namedtuple("Not", ["value"])    # 조건 값이 이것과 다를 때
+
+
+def mod(stage, mult, **when):
+    """
+    보정 하나. when의 조건이 모두 맞을 때만 적용
+    데미지: move_type / category / crit,  스피드: weather / terrain / item_lost / status / ability
+    """
+    return Modifier(stage, mult, tuple(when.items()))
+
+
+DAMAGE_MODIFIERS = {
+    # 날씨/필드 (위력)
+    ("weather", "Sun"): (mod(POWER, 1.5, move_type="Fire"), mod(POWER, 0.5, move_type="Water")),
+    ("weather", "Rain"): (mod(POWER, 1.5, move_type="Water"), mod(POWER, 0.5, move_type="Fire")),
+    ("terrain", "Electric"): (mod(POWER, 1.3, move_type="Electric"),),
+    ("terrain", "Grassy"): (mod(POWER, 1.3, move_type="Grass"),),
+    ("terrain", "Psychic"): (mod(POWER, 1.3, move_type="Psychic"),),
+    ("terrain", "Misty"): (mod(POWER, 0.5, move_type="Dragon"),),
+    # 공격자 상태이상 (객기 예외는 호출자가 power로 처리)
+    ("status", "Burn"): (mod(BURN, 0.5, category="Physical"),),
+    # 방어 측 벽 (급소면 무시)
+    ("screen", "reflect"): (mod(SCREEN, 0.5, category="Physical", crit=False),),
+    ("screen", "light_screen"): (mod(SCREEN, 0.5, category="Special", crit=False),),
+    # 공격자 도구
+    ("item", "Choice Band"): (mod(ITEM, 1.5, category="Physical"),),
+    ("item", "Choice Specs"): (mod(ITEM, 1.5, category="Special"),),
+    ("item", "Life Orb"): (mod(ITEM, 1.3),),
+}
+
+SPEED_MODIFIERS = {
+    ("item", "Choice Scarf"): (mod(SPEED_ITEM, 1.5),),
+    ("item", "Iron Ball"): (mod(SPEED_ITEM, 0.5),),
+    ("ability", "Swift Swim"): (mod(SPEED_ABILITY, 2, weather="Rain"),),       # 쓱쓱
+    ("ability", "Chlorophyll"): (mod(SPEED_ABILITY, 2, weather="Sun"),),       # 엽록소
+    ("ability", "Sand Rush"): (mod(SPEED_ABILITY, 2, weather="Sand"),),        # 모래헤치기
+    ("ability", "Slush Rush"): (mod(SPEED_ABILITY, 2, weather="Snow"),),       # 눈치우기
+    ("ability", "Surge Surfer"): (mod(SPEED_ABILITY, 2, terrain="Electric"),), # 서핑테일
+    ("ability", "Unburden"): (mod(SPEED_ABILITY, 2, item_lost=True),),         # 곡예
+    ("ability", "Quick Feet"): (mod(SPEED_STATUS, 1.5, status="Paralysis"),),  # 속보 (마비 감속 대신)
+    ("status", "Paralysis"): (mod(SPEED_STATUS, 0.5, ability=Not("Quick Feet")),),
+    ("field", "tailwind"): (mod(SPEED_TAILWIND, 2),),
+}
+
+MAX_COMPILED = 4096    # 컴파일 결과 보관 수 (넘으면 비우고 다시 채움)
+
+
+def _matches(modifier, context):
+    for key, want in modifier.when:
+        have = context.get(key)
+        if type(want) is Not:
+            if have == want.value: return False
+        elif have != want:
+            return False
+    return True
+
+
+def _collect(registry, sources):
+    return tuple(m for source in sources for m in registry.get(source, ()))
+
+# ---------------------------------------------------------
+# [데미지]
+# ---------------------------------------------------------
+
+class DamageChain:
+    """
+    한 대면의 데미지 보정. for_move()가 (위력 배율들, 기초 데미지 이후 배율들)을 돌려줌
+    기술 종류(타입, 분류, 급소)마다 한 번만 고르고 이후엔 dict 조회
+    """
+    __slots__ = ("modifiers", "_by_move")
+
+    def __init__(self, modifiers):
+        self.modifiers = modifiers
+        self._by_move = {}
+
+    def for_move(self, move_type, category, crit=False):
+        key = (move_type, category, crit)
+        chain = self._by_move.get(key)
+        if chain is None:
+            context = {"move_type": move_type, "category": category, "crit": crit}
+            active = [m for m in self.modifiers if _matches(m, context)]
+            power = tuple(m.mult for m in active if m.stage == POWER)
+            steps = tuple(m.mult for stage in DAMAGE_STEPS for m in active if m.stage == stage)
+            chain = self._by_move[key] = (power, steps)
+        return chain
+
+
+_damage_chains = {}
+
+
+def compile_damage(att_spec, def_spec, field_spec):
+    """ (공격자, 방어자, 필드) -> DamageChain. 보정에 쓰이는 값이 같으면 같은 객체 """
+    screens = def_spec.get('screens') or {}
+    key = (
+        att_spec.get('item'), att_spec.get('ability'), att_spec.get('status'),
+        field_spec.get('weather'), field_spec.get('terrain'),
+        bool(screens.get('reflect')), bool(screens.get('light_screen')),
+    )
+    chain = _damage_chains.get(key)
+    if chain is None:
+        item, ability, status, weather, terrain, reflect, light_screen = key
+        # 같은 단계 안에서는 이 순서대로 곱함 (위력: 날씨 -> 필드)
+        sources = [("weather", weather), ("terrain", terrain), ("status", status),
+                   ("item", item), ("ability", ability)]
+        if reflect: sources.append(("screen", "reflect"))
+        if light_screen: sources.append(("screen", "light_screen"))
+        if len(_damage_chains) >= MAX_COMPILED: _damage_chains.clear()
+        chain = _damage_chains[key] = DamageChain(_collect(DAMAGE_MODIFIERS, sources))
+    return chain
+
+# ---------------------------------------------------------
+# [스피드]
+# ---------------------------------------------------------
+
+_speed_chains = {}
+
+
+def compile_speed(item, ability, status, field_state):
+    """ 랭크 반영 뒤 곱할 스피드 배율들 (단계마다 int) """
+    get = field_state.get
+    key = (item, ability, status, get('weather'), get('terrain'), get('item_lost'), get('tailwind'))
+    chain = _speed_chains.get(key)
+    if chain is None:
+        item, ability, status, weather, terrain, item_lost, tailwind = key
+        item_lost = bool(item_lost)
+        context = {"weather": weather, "terrain": terrain, "item_lost": item_lost,
+                   "status": status, "ability": ability}
+        sources = [("item", item), ("ability", ability), ("status", status)]
+        if tailwind: sources.append(("field", "tailwind"))
+        active = [m for m in _collect(SPEED_MODIFIERS, sources) if _matches(m, context)]
+        if len(_speed_chains) >= MAX_COMPILED: _speed_chains.clear()
+        chain = _speed_chains[key] = tuple(m.mult for stage in SPEED_STEPS for m in active if m.stage == stage)
+    return chain
@@ -1,54 +1,135 @@
 import requests
 import json
 import os
+import time
+import sys
+import threading
+
+try:
+    import telemetry   # 앱에서 불러올 때만 계측 (Calculator 폴더를 단독 실행하면 없음)
+except ImportError:
+    telemetry = None
+
+# 이름 인터닝은 프로젝트 루트의 battle_codes (이 폴더를 직접 실행하면 루트를 경로에 추가)
+try:
+    from battle_codes import MOVES
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from battle_codes import MOVES
 
 # 1. 캐시 파일 경로 설정
 # (현재 파일 위치 기준으로 moves_cache.json 파일을 찾거나 생성)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_FILE = os.path.join(BASE_DIR, "moves_cache.json")
 
-# 2. 메모리 캐시 로드
+# POKEAPI_OFFLINE=1: 네트워크 요청 없이 캐시에 없는 기술은 기본값 (오프라인 벤치마크/테스트용)
+OFFLINE = os.getenv("POKEAPI_OFFLINE", "0") not in ("0", "false", "off", "")
+
+# Smogon 통계의 기술은 id('stealthrock')라서 표시 이름에서 slug를 만들 수 없음
+# -> PokeAPI 기술 목록(slug 전체)을 처음 한 번 받아 파일로 저장하고 MOVES.add_slug()로 등록
+SLUG_FILE = os.path.join(BASE_DIR, "move_slugs.json")
+MOVE_LIST_URL = "https://pokeapi.co/api/v2/move?limit=2000"
+_SLUGS_READY = False
+_SLUG_LOCK = threading.Lock()
+
+# 2. 메모리 캐시 로드 {기술 ID: 기술 정보} ('Draco Meteor' / 'dracometeor' -> 같은 항목)
 _MEMORY_CACHE = {}
+_SAVE_LOCK = threading.Lock()  # 백그라운드 프리웜 스레드와 동시 저장 방지
 
 def load_cache_from_disk():
-    """ 파일에서 캐시 로드 """
+    """ 파일에서 캐시 로드 (표기만 다른 중복 항목은 표시 이름 쪽을 사용) """
     if os.path.exists(CACHE_FILE):
         try:
             with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                raw = json.load(f)
         except:
             return {}
+        cache = {}
+        for name, data in raw.items():
+            move_id = MOVES.intern(name)
+            if move_id not in cache or name != name.lower():
+                cache[move_id] = data
+        return cache
     return {}
 
 def save_cache_to_disk():
     """ 메모리 캐시를 파일에 저장 """
     try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(_MEMORY_CACHE, f, indent=2)
+        with _SAVE_LOCK:
+            start = time.perf_counter()
+            tmp = CACHE_FILE + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({MOVES.name(i): data for i, data in list(_MEMORY_CACHE.items())}, f, indent=2)
+            os.replace(tmp, CACHE_FILE)
+            if telemetry: telemetry.observe("io_seconds", time.perf_counter() - start, kind="move_cache_write")
     except Exception as e:
         print(f"⚠️ 캐시 저장 실패: {e}")
 
 # 초기 실행 시 캐시 로드
 _MEMORY_CACHE = load_cache_from_disk()
 
+def load_move_slugs():
+    """ PokeAPI 기술 slug 목록을 MOVES에 등록 (파일 -> 없으면 한 번 받아서 저장). 실패해도 다시 시도하지 않음 """
+    global _SLUGS_READY
+    if _SLUGS_READY:
+        return
+    with _SLUG_LOCK:
+        if _SLUGS_READY:
+            return
+        slugs = []
+        try:
+            if os.path.exists(SLUG_FILE):
+                with open(SLUG_FILE, 'r', encoding='utf-8') as f:
+                    slugs = json.load(f)
+            elif not OFFLINE:
+                response = requests.get(MOVE_LIST_URL, timeout=5)
+                response.raise_for_status()
+                slugs = [m['name'] for m in response.json()['results']]
+                tmp = SLUG_FILE + ".tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(slugs, f)
+                os.replace(tmp, SLUG_FILE)
+                print(f"📥 PokeAPI 기술 목록 저장: {len(slugs)}개")
+        except Exception as e:
+            print(f"⚠️ 기술 slug 목록 조회 실패 (표시 이름으로 주소 생성): {e}")
+        for slug in slugs:
+            MOVES.add_slug(slug)
+        _SLUGS_READY = True
+
+
+def _english_name(data):
+    for entry in data.get('names', []):
+        if entry.get('language', {}).get('name') == 'en':
+            return entry.get('name')
+    return None
+
 # 3. 핵심 함수: 기술 정보 가져오기
 def get_move_data(move_name):
     """
     기술 이름(영어)을 받아서 위력, 타입, 분류, 우선도 등을 반환합니다.
     """
-    # API 요청을 위해 이름 소문자 변환 및 공백 처리 (Make It Rain -> make-it-rain)
-    api_name = move_name.lower().replace(" ", "-")
+    # 이름 -> 기술 ID (Smogon id 'makeitrain'와 'Make It Rain'이 같은 항목, 정규화는 처음 한 번만)
+    move_id = MOVES.intern(move_name)
     
     # 캐시에 있으면 반환
-    if move_name in _MEMORY_CACHE:
-        return _MEMORY_CACHE[move_name]
+    cached = _MEMORY_CACHE.get(move_id)
+    if telemetry: telemetry.cache_event("move_data", cached is not None)
+    if cached is not None:
+        return cached
+    if OFFLINE:
+        return {"name": move_name, "type": "Normal", "category": "Physical", "power": 0, "priority": 0}
 
-    # API 호출
-    url = f"https://pokeapi.co/api/v2/move/{api_name}"
+    # API 호출 (Make It Rain -> make-it-rain, stealthrock -> stealth-rock)
+    load_move_slugs()
+    url = f"https://pokeapi.co/api/v2/move/{MOVES.slug(move_id)}"
     
     try:
         # 타임아웃을 짧게 주어 너무 오래 걸리면 건너뛰도록 함
-        response = requests.get(url, timeout=2)
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, timeout=2)
+        finally:
+            if telemetry: telemetry.observe("io_seconds", time.perf_counter() - start, kind="pokeapi_move")
         
         if response.status_code != 200:
             # 기술을 못 찾은 경우 기본값 반환 (에러 방지)
@@ -59,14 +140,19 @@ def get_move_data(move_name):
                 "power": 0, 
                 "priority": 0
             }
-            _MEMORY_CACHE[move_name] = default_data
+            _MEMORY_CACHE[move_id] = default_data
             return default_data
 
         data = response.json()
+
+        # id로만 알던 기술은 PokeAPI의 영어 이름을 표시 이름으로 ('stealthrock' -> 'Stealth Rock')
+        display = _english_name(data)
+        if display and MOVES.id_of(display) == move_id:
+            MOVES.register(display)
         
         # 데이터 가공
         move_info = {
-            "name": move_name,
+            "name": MOVES.name(move_id),
             "type": data['type']['name'].capitalize(), # type
             "category": data['damage_class']['name'].capitalize(), # category
             "power": data['power'] if data['power'] else 0, # power
@@ -75,7 +161,7 @@ def get_move_data(move_name):
         }
         
         # 캐시 업데이트 및 저장
-        _MEMORY_CACHE[move_name] = move_info
+        _MEMORY_CACHE[move_id] = move_info
         save_cache_to_disk()
         
         return move_info
@@ -1,5 +1,15 @@
 import math
 
+try:
+    from profiler import profiled   # 앱에서 불러올 때만 (Calculator 폴더 단독 실행이면 그대로 통과)
+except ImportError:
+    def profiled(name): return lambda func: func
+
+try:
+    from Calculator.modifiers import compile_speed
+except ImportError:
+    from modifiers import compile_speed
+
 def get_rank_multiplier(stage):
     if stage == 0: return 1.0
     if stage > 0: return (2 + stage) / 2
@@ -18,43 +28,10 @@ def calculate_dynamic_speed(stats, ranks, item, status, ability, field_state):
     rank_stage = ranks.get('spe', 0)
     speed = int(speed * get_rank_multiplier(rank_stage))
     
-    # 3. 아이템 (구애스카프, 철구 등)
-    if item == "Choice Scarf":
-        speed = int(speed * 1.5)
-    elif item == "Iron Ball":
-        speed = int(speed * 0.5)
-
-    # 4. 특성 & 날씨 상호작용 (Speed Abilities)
-    weather = field_state.get('weather')
-    terrain = field_state.get('terrain')
-
-    if ability == "Swift Swim" and weather == "Rain":       # 쓱쓱 (비)
-        speed *= 2
-    elif ability == "Chlorophyll" and weather == "Sun":     # 엽록소 (쾌청)
-        speed *= 2
-    elif ability == "Sand Rush" and weather == "Sand":      # 모래헤치기 (모래바람)
-        speed *= 2
-    elif ability == "Slush Rush" and weather == "Snow":     # 눈치우기 (설경)
-        speed *= 2
-    elif ability == "Surge Surfer" and terrain == "Electric": # 서핑테일 (일렉트릭필드)
-        speed *= 2
-    elif ability == "Unburden" and field_state.get('item_lost'): # 곡예 (도구 소모)
-        speed *= 2
-    
-    # [삭제됨] 고대활성(Protosynthesis) / 쿼크차지(Quark Drive)
-    # 외부에서 처리: 스피드가 오르는 경우라면 rank에 +1을 더해주거나, 
-    # 기본 stats['spe']에 1.5배를 해서 넘겨주는 것을 권장.
-
-    # 5. 상태이상 (마비)
-    if status == "Paralysis":
-        if ability == "Quick Feet": # 속보
-            speed = int(speed * 1.5)
-        else:
-            speed = int(speed * 0.5)
-
-    # 6. 순풍
-    if field_state.get('tailwind', False):
-        speed *= 2
+    # 3~6. 아이템(스카프/철구) -> 특성x날씨/필드(쓱쓱, 엽록소, 곡예 등) -> 마비(속보 예외) -> 순풍
+    # (Calculator/modifiers.py 레지스트리, 단계마다 int)
+    for m in compile_speed(item, ability, status, field_state):
+        speed = int(speed * m)
         
     return int(speed)
 
@@ -74,6 +51,7 @@ def calculate_priority_bonus(priority, move_cat, move_type, ability, hp_percent)
         
     return final_prio
 
+@profiled("check_turn_order")
 def check_turn_order(my_spec, opp_spec, field_spec, my_move_spec, opp_move_spec=None):
     """
     [최종 턴 순서 판정]
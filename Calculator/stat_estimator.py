@@ -4,6 +4,14 @@ import requests
 import json
 import os
 import sys
+import time
+
+try:
+    import telemetry   # 앱에서 불러올 때만 계측 (Calculator 폴더를 단독 실행하면 없음)
+    from profiler import profiled
+except ImportError:
+    telemetry = None
+    def profiled(name): return lambda func: func
 
 # --- [모듈 임포트 경로 설정] ---
 # 같은 폴더(Calculator)에 있는 stat_utils.py를 불러오기 위한 설정
@@ -21,23 +29,45 @@ except ImportError:
             sys.path.append(current_dir)
         from stat_utils import calculate_stat, parse_smogon_spread, NATURE_MODS
 
-# API 호출 횟수를 줄이기 위한 캐시
+# 이름 인터닝은 프로젝트 루트의 battle_codes (이 폴더를 직접 실행하면 루트를 경로에 추가)
+try:
+    from battle_codes import SPECIES
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from battle_codes import SPECIES
+
+# API 호출 횟수를 줄이기 위한 캐시 {종족 ID: 종족값} (오프라인 벤치마크는 여기에 로컬 종족값을 미리 넣음)
 POKEAPI_CACHE = {}
 
+# rank_battle_data.json 경로 -> (수정시각, {종족 ID: 통계 항목}). 파일이 바뀌었을 때만 다시 읽음
+_RANK_DATA = {}
+
+# POKEAPI_OFFLINE=1: 네트워크 요청 없이 캐시에 있는 것만 사용 (오프라인 벤치마크/테스트용)
+OFFLINE = os.getenv("POKEAPI_OFFLINE", "0") not in ("0", "false", "off", "")
+
 def get_base_stats(pokemon_name):
     """
     PokeAPI를 통해 포켓몬의 종족값(Base Stats)을 가져옵니다.
     """
-    # 이름 정규화 (Smogon: "Flutter Mane" -> API: "flutter-mane")
-    api_name = pokemon_name.lower().replace(" ", "-").replace(".", "").replace(":", "")
+    # 이름 -> 종족 ID ("Flutter Mane" / "flutter-mane" / "날치머" -> 같은 ID, 정규화는 처음 한 번만)
+    species_id = SPECIES.intern(pokemon_name)
     
     # 캐시 확인
-    if api_name in POKEAPI_CACHE:
-        return POKEAPI_CACHE[api_name]
+    cached = POKEAPI_CACHE.get(species_id)
+    if telemetry: telemetry.cache_event("pokeapi_pokemon", cached is not None)
+    if cached is not None:
+        return cached
+    if OFFLINE:
+        return None
 
+    api_name = SPECIES.slug(species_id)   # PokeAPI 주소: "flutter-mane"
     url = f"https://pokeapi.co/api/v2/pokemon/{api_name}"
     try:
-        res = requests.get(url)
+        start = time.perf_counter()
+        try:
+            res = requests.get(url)
+        finally:
+            if telemetry: telemetry.observe("io_seconds", time.perf_counter() - start, kind="pokeapi_pokemon")
         if res.status_code != 200:
             print(f"⚠️ PokeAPI 검색 실패: {api_name} (Status: {res.status_code})")
             return None
@@ -56,12 +86,24 @@ def get_base_stats(pokemon_name):
             "spd": stats['special-defense'],
             "spe": stats['speed']
         }
-        POKEAPI_CACHE[api_name] = formatted_stats
+        POKEAPI_CACHE[species_id] = formatted_stats
         return formatted_stats
     except Exception as e:
         print(f"API 에러: {e}")
         return None
 
+def _load_rank_data(path):
+    """ rank_battle_data.json -> {종족 ID: 통계 항목} (없으면 FileNotFoundError) """
+    mtime = os.path.getmtime(path)
+    cached = _RANK_DATA.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        by_id = {SPECIES.intern(name): entry for name, entry in json.load(f).items()}
+    _RANK_DATA[path] = (mtime, by_id)
+    return by_id
+
+@profiled("estimate_stats")
 def estimate_stats(pokemon_name, smogon_data_path=None):
     """
     Smogon 데이터의 1순위 샘플을 기반으로 포켓몬의 실능(Stats)을 추정합니다.
@@ -80,26 +122,26 @@ def estimate_stats(pokemon_name, smogon_data_path=None):
         smogon_data_path = os.path.join(project_root, "Statistics", "rank_battle_data.json")
     # --------------------------------
 
-    # 1. Smogon 데이터 로드
+    # 1. Smogon 데이터 로드 (종족 ID 기준, 파일은 바뀌었을 때만 다시 읽음)
     try:
-        with open(smogon_data_path, 'r', encoding='utf-8') as f:
-            rank_data = json.load(f)
+        rank_data = _load_rank_data(smogon_data_path)
     except FileNotFoundError:
         print(f"❌ [Error] 데이터 파일을 찾을 수 없습니다.\n경로 확인: {smogon_data_path}")
         return None
     
-    if pokemon_name not in rank_data:
+    entry = rank_data.get(SPECIES.id_of(pokemon_name))
+    if entry is None:
         # 데이터에 없으면 None 반환 (나중에 기본값 처리 등 필요)
         print(f"⚠️ Smogon 데이터에 없는 포켓몬: {pokemon_name}")
         return None
 
     # 2. 가장 많이 쓰이는 성격/노력치(Spread) 가져오기 (0번 인덱스 = 1순위)
     # 예: ["Modest:244/0/12/188/4/60", 0.35]
-    if not rank_data[pokemon_name].get("Spreads"):
+    if not entry.get("Spreads"):
         print(f"⚠️ {pokemon_name}의 노력치(Spread) 데이터가 비어있습니다.")
         return None
 
-    top_spread = rank_data[pokemon_name]["Spreads"][0][0]
+    top_spread = entry["Spreads"][0][0]
     nature, evs = parse_smogon_spread(top_spread)
     
     # 3. 종족값(Base Stats) 가져오기
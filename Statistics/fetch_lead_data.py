@@ -1,54 +1,36 @@
-import requests
 import os
 
+try:
+    from stats_downloader import StatsJob, download
+    from lead_index import load_lead_stats
+except ImportError:
+    from Statistics.stats_downloader import StatsJob, download
+    from Statistics.lead_index import load_lead_stats
+
 # 설정
 TARGET_DATE = "2025-12" 
 FORMAT_NAME = "gen9bssregj"
 RATING = "1760" 
 
 # Leads 데이터는 JSON이 아니라 텍스트 테이블 형태입니다.
-URL = f"https://www.smogon.com/stats/{TARGET_DATE}/leads/{FORMAT_NAME}-{RATING}.txt"
+LEAD_JOB = StatsJob(TARGET_DATE, FORMAT_NAME, RATING, "leads")
 SAVE_PATH = os.path.join("Statistics", "lead_stats.txt")
 
 def fetch_lead_stats():
-    print(f"📡 선봉 데이터 다운로드: {URL}")
-    response = requests.get(URL)
+    print(f"📡 선봉 데이터 다운로드: {LEAD_JOB.url()}")
 
-    # 파일로 저장
-    if not os.path.exists("Statistics"):
-        os.makedirs("Statistics")
-        
-    with open(SAVE_PATH, "w", encoding="utf-8") as f:
-        f.write(response.text)
-    print(f"✅ 선봉 데이터 저장 완료: {SAVE_PATH}")
+    # 조건부 요청 + 검증 후 원자적 교체 (실패 시 기존 파일 유지)
+    result = download(LEAD_JOB, SAVE_PATH)
+    if result.status == "failed":
+        print(f"❌ 선봉 데이터 다운로드 실패: {result.error}")
+    elif result.status == "not_modified":
+        print(f"💤 선봉 데이터 변경 없음: {SAVE_PATH}")
+    else:
+        print(f"✅ 선봉 데이터 저장 완료: {SAVE_PATH}")
 
 def parse_lead_stats():
-    """ 텍스트 파일을 읽어서 딕셔너리로 변환 {포켓몬명: 선봉사용률(%)} """
-    leads = {}
-    try:
-        with open(SAVE_PATH, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            
-        # Smogon 텍스트 테이블 파싱
-        #  | Rank | Pokemon            | Usage % | ...
-        for line in lines:
-            if "|" not in line or "Rank" in line or "Usage %" in line:
-                continue
-            
-            parts = line.split("|")
-            if len(parts) < 4: continue
-            
-            name = parts[2].strip()
-            usage_str = parts[3].strip().replace("%", "")
-            
-            try:
-                leads[name] = float(usage_str)
-            except ValueError:
-                continue
-                
-        return leads
-    except FileNotFoundError:
-        return {}
+    """ 선봉 통계를 딕셔너리로 변환 {포켓몬명: 선봉사용률(%)} (파서는 lead_index 공용) """
+    return dict(load_lead_stats(SAVE_PATH).items())
 
 if __name__ == "__main__":
     fetch_lead_stats()
\ No newline at end of file
@@ -1,54 +1,259 @@
-import requests
 import json
 import os
+import sys
+import heapq
+from operator import itemgetter
+
+try:
+    from stats_downloader import StatsJob, DOWNLOAD_DIR, download
+except ImportError:
+    from Statistics.stats_downloader import StatsJob, DOWNLOAD_DIR, download
 
 # --- 설정 구간 ---
-TARGET_DATE = "2025-12" 
+TARGET_DATE = "2025-12"
 FORMAT_NAME = "gen9bssregj"
-RATING = "1760" 
+RATING = "1760"
 
-BASE_URL = f"https://www.smogon.com/stats/{TARGET_DATE}/chaos/"
-FILE_NAME = f"{FORMAT_NAME}-{RATING}.json"
 SAVE_FILE = "rank_battle_data.json"
 
-def fetch_rank_data():
-    full_url = f"{BASE_URL}{FILE_NAME}"
-    print(f"📡 데이터 다운로드 시도: {full_url}")
-    
-    response = requests.get(full_url)
+# 스트리밍 설정
+CHUNK_SIZE = 64 * 1024   # 한 번에 읽어들이는 텍스트 크기
+MIN_USAGE = 0.01         # 이 사용률 미만의 포켓몬은 버림
+TOP_K = None             # 숫자를 주면 사용률 상위 K마리만 힙으로 유지 (None = 전부)
 
-    print("✅ 데이터 다운로드 성공! 가공을 시작합니다...")
-    raw_data = response.json()
-    processed_data = {}
+# ---------------------------------------------------------
+# [1] 스트리밍 JSON 리더
+# ---------------------------------------------------------
 
-    # 테라타입 데이터가 실제로 있는지 확인하기 위한 디버그용 카운터
-    tera_found_count = 0
+class _JsonStream:
+    """
+    텍스트 청크 이터레이터 위에서 JSON 값을 하나씩 꺼내 읽는 최소한의 리더.
+    chaos 파일 전체를 메모리에 올리지 않고, 현재 읽고 있는 값 하나만큼만 버퍼에 유지합니다.
+    """
+    _WS = " \t\r\n"
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """ 청크를 하나 더 읽어 버퍼에 붙임 (이미 소비한 앞부분은 잘라냄) """
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode("utf-8")
+            self.buf = self.buf[self.pos:] + chunk
+            self.pos = 0
+            return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """ 공백을 건너뛴 다음 글자 (스트림 끝이면 None) """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return None
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON 형식 오류: '{char}' 기대, '{found}' 발견 (offset {self.pos})")
+        self.pos += 1
+
+    def value(self):
+        """ 다음 JSON 값 하나를 완전히 디코딩해서 반환 (버퍼가 모자라면 더 읽음) """
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+                # 숫자가 청크 경계에서 잘렸을 수 있으므로 버퍼 끝에 딱 맞으면 한 번 더 확인
+                if end == len(self.buf) and not self.eof and self._fill():
+                    continue
+                self.pos = end
+                return obj
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+
+def iter_chaos_species(chunks):
+    """
+    Smogon chaos JSON 텍스트 청크를 받아 "data" 안의 (포켓몬명, 통계) 쌍을 하나씩 yield 합니다.
+    "info" 등 다른 최상위 키는 읽고 버립니다.
+    """
+    stream = _JsonStream(chunks)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
 
-    for pokemon, stats in raw_data['data'].items():
-        if stats.get('usage', 0) < 0.01: 
+    while True:
+        key = stream.value()
+        stream.expect(":")
+
+        if key == "data":
+            stream.expect("{")
+            if stream.peek() == "}":
+                stream.pos += 1
+            else:
+                while True:
+                    name = stream.value()
+                    stream.expect(":")
+                    yield name, stream.value()
+                    if stream.peek() == ",":
+                        stream.pos += 1
+                        continue
+                    stream.expect("}")
+                    break
+        else:
+            stream.value()  # info 등은 스킵
+
+        if stream.peek() == ",":
+            stream.pos += 1
             continue
-        
-        # 테라타입 키 찾기 (혹시 이름이 다를까봐 여러 후보군 탐색)
-        tera_data = stats.get('Tera Types')
-        
-        # 데이터가 있으면 카운트 증가
-        if tera_data:
-            tera_found_count += 1
-
-        processed_data[pokemon] = {
-            "Usage_Rate": round(stats.get('usage', 0) * 100, 2),
-            "Moves": sorted(stats.get('Moves', {}).items(), key=lambda x: x[1], reverse=True)[:10],
-            "Items": sorted(stats.get('Items', {}).items(), key=lambda x: x[1], reverse=True)[:5],
-            "Abilities": sorted(stats.get('Abilities', {}).items(), key=lambda x: x[1], reverse=True)[:3],
-            "TeraTypes": sorted(tera_data.items(), key=lambda x: x[1], reverse=True),
-            "Spreads": sorted(stats.get('Spreads', {}).items(), key=lambda x: x[1], reverse=True)[:3],
-            "Teammates": sorted(stats.get('Teammates', {}).items(), key=lambda x: x[1], reverse=True)[:10]
-        }
-
-    with open(SAVE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(processed_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"🎉 완료! '{SAVE_FILE}'에 저장되었습니다.")
+        stream.expect("}")
+        break
+
+
+def iter_file_chunks(path, chunk_size=CHUNK_SIZE):
+    """ 로컬 chaos 파일을 청크 단위로 읽기 """
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+# ---------------------------------------------------------
+# [2] 엔트리 가공 및 저장
+# ---------------------------------------------------------
+
+def _top(stats_dict, n=None):
+    """ {이름: 값} 중 값이 큰 순서로 (이름, 값) 리스트. 전체 정렬 대신 상위 n개만 힙으로 선택 """
+    if not stats_dict:
+        return []
+    if n is None:
+        return sorted(stats_dict.items(), key=itemgetter(1), reverse=True)
+    return heapq.nlargest(n, stats_dict.items(), key=itemgetter(1))
+
+
+def process_species(stats):
+    """ chaos 엔트리 하나를 rank_battle_data.json 포맷으로 가공 """
+    return {
+        "Usage_Rate": round(stats.get('usage', 0) * 100, 2),
+        "Moves": _top(stats.get('Moves'), 10),
+        "Items": _top(stats.get('Items'), 5),
+        "Abilities": _top(stats.get('Abilities'), 3),
+        "TeraTypes": _top(stats.get('Tera Types')),
+        "Spreads": _top(stats.get('Spreads'), 3),
+        "Teammates": _top(stats.get('Teammates'), 10)
+    }
+
+
+def _write_entry(f, name, entry, first):
+    """ json.dump(indent=2)와 동일한 모양으로 엔트리 하나를 이어 씀 """
+    body = json.dumps(entry, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+    f.write(("\n" if first else ",\n") + f"  {json.dumps(name, ensure_ascii=False)}: {body}")
+
+
+def stream_rank_data(chunks, save_file=SAVE_FILE, min_usage=MIN_USAGE, top_k=TOP_K):
+    """
+    [스트리밍 파이프라인]
+    청크 -> 포켓몬 단위 파싱 -> 사용률 필터 -> (top_k 지정 시) 힙 유지 -> 파일에 한 마리씩 기록
+    메모리에는 현재 엔트리 하나(+ top_k개)만 남으므로 입력 크기와 무관하게 사용량이 일정합니다.
+    Returns: 저장된 포켓몬 수
+    """
+    if isinstance(chunks, str):
+        chunks = iter_file_chunks(chunks)
+
+    heap = []  # (usage, 순번, 이름, 가공 데이터) - 최소 힙
+    tera_found_count = 0
+    written = 0
+
+    with open(save_file, 'w', encoding='utf-8') as f:
+        f.write("{")
+
+        for order, (pokemon, stats) in enumerate(iter_chaos_species(chunks)):
+            usage = stats.get('usage', 0)
+            if usage < min_usage:
+                continue
+            if top_k is not None and len(heap) >= top_k and usage <= heap[0][0]:
+                continue
+
+            # 테라타입 데이터가 실제로 있는지 확인하기 위한 디버그용 카운터
+            if stats.get('Tera Types'):
+                tera_found_count += 1
+
+            entry = process_species(stats)
+
+            if top_k is None:
+                _write_entry(f, pokemon, entry, written == 0)
+                written += 1
+            elif len(heap) < top_k:
+                heapq.heappush(heap, (usage, -order, pokemon, entry))
+            else:
+                heapq.heapreplace(heap, (usage, -order, pokemon, entry))
+
+        # 힙에 남은 상위 K마리를 사용률 내림차순으로 기록
+        for _, _, pokemon, entry in sorted(heap, reverse=True):
+            _write_entry(f, pokemon, entry, written == 0)
+            written += 1
+
+        f.write("\n}" if written else "}")
+
+    print(f"🔎 테라타입 데이터 보유: {tera_found_count}마리")
+    return written
+
+# ---------------------------------------------------------
+# [3] 실행 함수
+# ---------------------------------------------------------
+
+def fetch_rank_data(save_file=SAVE_FILE, top_k=TOP_K):
+    """
+    원본 chaos 파일을 받아두고(변경 없으면 건너뜀) 스트리밍으로 가공
+    새로 받은 파일은 가공 패스가 곧 내용 검증 (파일을 두 번 파싱하지 않음, 결과는 임시 파일에 쓰고 성공 시 교체)
+    """
+    job = StatsJob(TARGET_DATE, FORMAT_NAME, RATING, "chaos")
+    raw_path = os.path.join(DOWNLOAD_DIR, job.file_name)
+    tmp_save = save_file + ".tmp"
+    counts = []
+    print(f"📡 데이터 다운로드 시도: {job.url()}")
+
+    def process(kind, path):
+        try:
+            counts.append(stream_rank_data(path, tmp_save, top_k=top_k))
+            return True
+        except ValueError:
+            return False
+
+    result = download(job, raw_path, verify=process)
+    if result.status == "failed":
+        if os.path.exists(tmp_save): os.remove(tmp_save)
+        print(f"❌ 다운로드 실패: {result.error}")
+        return
+    print(f"✅ 다운로드 {result.status} ({result.bytes} bytes, {result.elapsed:.2f}s)")
+
+    if counts:
+        os.replace(tmp_save, save_file)
+        count = counts[-1]
+    else:
+        # 304 (이미 검증된 원본) -> 가공만
+        count = stream_rank_data(raw_path, save_file, top_k=top_k)
+    print(f"🎉 완료! '{save_file}'에 {count}마리 저장되었습니다.")
 
 if __name__ == "__main__":
-    fetch_rank_data()
\ No newline at end of file
+    # 로컬 파일 경로를 주면 다운로드 없이 그 파일을 가공 (예: python fetch_rank_data.py gen9bssregj-1760.json)
+    if len(sys.argv) > 1:
+        count = stream_rank_data(sys.argv[1])
+        print(f"🎉 완료! '{SAVE_FILE}'에 {count}마리 저장되었습니다.")
+    else:
+        fetch_rank_data()
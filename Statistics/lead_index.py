@@ -0,0 +1,214 @@
+import hashlib
+import os
+import pickle
+from array import array
+
+# --- [경로 설정] ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEAD_TXT_PATH = os.path.join(BASE_DIR, "lead_stats.txt")
+
+CACHE_VERSION = 1
+
+# ---------------------------------------------------------
+# [1] Smogon 선봉 테이블 파서 (유일한 구현)
+# ---------------------------------------------------------
+
+def parse_lead_table(lines):
+    """
+    Smogon leads 텍스트 테이블을 파싱합니다.
+     | Rank | Pokemon            | Usage %   | Raw    | %       |
+     | 1    | Koraidon           | 16.46392% | 4213   |  8.059% |
+    Returns: [(rank, 이름, 가중 사용률%, raw 횟수, raw 사용률%), ...] (Usage % 내림차순)
+    """
+    rows = []
+    for line in lines:
+        if "|" not in line or "Rank" in line or "Usage %" in line:
+            continue
+
+        parts = line.split("|")
+        if len(parts) < 4: continue
+
+        name = parts[2].strip()
+        try:
+            usage = float(parts[3].strip().replace("%", ""))
+        except ValueError:
+            continue
+
+        try: rank = int(parts[1].strip())
+        except ValueError: rank = len(rows) + 1
+        try: raw = int(parts[4].strip()) if len(parts) > 4 else 0
+        except ValueError: raw = 0
+        try: raw_pct = float(parts[5].strip().replace("%", "")) if len(parts) > 5 else 0.0
+        except ValueError: raw_pct = 0.0
+
+        rows.append((rank, name, usage, raw, raw_pct))
+
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return rows
+
+# ---------------------------------------------------------
+# [2] 인덱스 객체
+# ---------------------------------------------------------
+
+class LeadStats:
+    """
+    [선봉 통계 인덱스]
+    사용률 내림차순으로 정렬된 배열 + 이름 -> 위치 인덱스.
+    dict처럼 .get(이름, 기본값)으로 가중 사용률(%)을 돌려주므로 기존 LEAD_STATS 사용처와 호환됩니다.
+    """
+    _COLUMNS = ("names", "rank", "usage", "raw", "raw_pct", "index")
+
+    def __init__(self, rows=()):
+        self.names = tuple(r[1] for r in rows)
+        self.rank = array('l', (r[0] for r in rows))
+        self.usage = array('d', (r[2] for r in rows))
+        self.raw = array('q', (r[3] for r in rows))
+        self.raw_pct = array('d', (r[4] for r in rows))
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def to_columns(self):
+        """ 캐시 저장용 (클래스 대신 표준 타입만 피클 -> 임포트 경로와 무관하게 읽힘) """
+        return {col: getattr(self, col) for col in self._COLUMNS}
+
+    @classmethod
+    def from_columns(cls, columns):
+        obj = cls.__new__(cls)
+        for col in cls._COLUMNS:
+            setattr(obj, col, columns[col])
+        return obj
+
+    # --- dict 호환 ---
+    def get(self, name, default=0.0):
+        i = self.index.get(name)
+        return default if i is None else self.usage[i]
+
+    def __getitem__(self, name):
+        return self.usage[self.index[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.names)
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def items(self):
+        return zip(self.names, self.usage)
+
+    # --- 조회 ---
+    def position(self, name):
+        """ 사용률 순위(0부터). 통계에 없으면 맨 뒤 """
+        return self.index.get(name, len(self.names))
+
+    def top_k(self, k):
+        """ 전체 선봉 사용률 TOP k 이름 """
+        return list(self.names[:k])
+
+    def top_in_roster(self, roster, k=3):
+        """ 로스터 안에서 선봉 사용률 TOP k (통계에 없는 포켓몬은 입력 순서대로 뒤에) """
+        return sorted(roster, key=self.position)[:k]
+
+    def lead_probabilities(self, roster, weighted=True):
+        """
+        로스터 6마리 중 각 포켓몬이 선봉으로 나올 확률 (로스터 내에서 정규화)
+        weighted=True면 가중 사용률, False면 raw 횟수 기준
+        """
+        source = self.usage if weighted else self.raw
+        scores = [source[self.index[n]] if n in self.index else 0 for n in roster]
+        total = sum(scores)
+        if total <= 0:
+            return {n: 1 / len(roster) for n in roster} if roster else {}
+        return {n: s / total for n, s in zip(roster, scores)}
+
+    def row(self, name):
+        """ (rank, 가중%, raw, raw%) """
+        i = self.index.get(name)
+        if i is None: return None
+        return self.rank[i], self.usage[i], self.raw[i], self.raw_pct[i]
+
+# ---------------------------------------------------------
+# [3] 바이너리 캐시 (원본 파일 해시 기준)
+# ---------------------------------------------------------
+
+def _cache_path_for(source_path):
+    return os.path.splitext(source_path)[0] + ".cache"
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(64 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("version") != CACHE_VERSION:
+            return None
+        return payload
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, KeyError):
+        return None
+
+
+def _write_cache(cache_path, payload):
+    tmp = cache_path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        print(f"⚠️ 선봉 캐시 저장 실패: {e}")
+
+
+def load_lead_stats(source_path=LEAD_TXT_PATH, cache_path=None):
+    """
+    선봉 통계를 로드합니다.
+    1. 캐시의 (크기, 수정시각)이 원본과 같으면 캐시만 읽음 (텍스트 파싱 없음)
+    2. 다르면 원본 해시를 비교해서 내용이 같으면 캐시 재사용
+    3. 내용이 바뀌었으면 한 번 파싱해서 캐시를 다시 씀
+    """
+    cache_path = cache_path or _cache_path_for(source_path)
+    cached = _read_cache(cache_path)
+
+    try:
+        st = os.stat(source_path)
+    except FileNotFoundError:
+        if cached: return LeadStats.from_columns(cached["columns"])
+        return LeadStats()
+
+    if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+        return LeadStats.from_columns(cached["columns"])
+
+    digest = _file_sha1(source_path)
+    if cached and cached["sha1"] == digest:
+        stats = LeadStats.from_columns(cached["columns"])
+    else:
+        try:
+            with open(source_path, "r", encoding="utf-8") as f:
+                stats = LeadStats(parse_lead_table(f))
+        except Exception as e:
+            print(f"⚠️ 선봉 데이터 파싱 중 오류: {e}")
+            return LeadStats.from_columns(cached["columns"]) if cached else LeadStats()
+        print(f"📦 선봉 통계 캐시 갱신: {len(stats)}마리")
+
+    _write_cache(cache_path, {
+        "version": CACHE_VERSION,
+        "sha1": digest,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "columns": stats.to_columns(),
+    })
+    return stats
+
+
+if __name__ == "__main__":
+    leads = load_lead_stats()
+    print(f"선봉 통계 {len(leads)}마리, TOP 5: {leads.top_k(5)}")
+    roster = ["Flutter Mane", "Ting-Lu", "Koraidon", "Dragonite", "Miraidon", "Missingno"]
+    print(leads.top_in_roster(roster, 3))
+    print(leads.lead_probabilities(roster))
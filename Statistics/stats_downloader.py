@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- 설정 구간 ---
+STATS_ROOT = "https://www.smogon.com/stats"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOWNLOAD_DIR = os.path.join(BASE_DIR, "raw")
+
+TIMEOUT = (5, 30)        # (연결, 읽기) 타임아웃 초
+MAX_ATTEMPTS = 4         # 중간에 끊겼을 때 이어받기 재시도 횟수
+BACKOFF = 0.5            # 재시도 간 대기 (0.5, 1, 2 ... 초)
+CHUNK_SIZE = 64 * 1024
+MAX_WORKERS = 6
+
+# ---------------------------------------------------------
+# [1] 다운로드 대상 정의
+# ---------------------------------------------------------
+
+class StatsJob(namedtuple("StatsJob", ["month", "format_name", "rating", "kind"])):
+    """ (월, 포맷, 레이팅, chaos/leads) 한 건 """
+    __slots__ = ()
+
+    @property
+    def file_name(self):
+        ext = "json" if self.kind == "chaos" else "txt"
+        return f"{self.month}-{self.kind}-{self.format_name}-{self.rating}.{ext}"
+
+    def url(self, base_url=STATS_ROOT):
+        ext = "json" if self.kind == "chaos" else "txt"
+        return f"{base_url}/{self.month}/{self.kind}/{self.format_name}-{self.rating}.{ext}"
+
+
+def build_jobs(months, formats, ratings, kinds=("chaos", "leads")):
+    """ 조합 전체를 StatsJob 리스트로 """
+    return [
+        StatsJob(m, f, str(r), k)
+        for m in months for f in formats for r in ratings for k in kinds
+    ]
+
+
+DownloadResult = namedtuple(
+    "DownloadResult",
+    ["job", "path", "status", "bytes", "elapsed", "attempts", "error"]
+)
+# status: "downloaded" | "resumed" | "not_modified" | "failed"
+
+# ---------------------------------------------------------
+# [2] 세션 / 메타데이터
+# ---------------------------------------------------------
+
+def make_session(pool_size=MAX_WORKERS):
+    """ 커넥션 풀을 공유하는 세션 (연결 실패/429/5xx는 urllib3가 재시도) """
+    session = requests.Session()
+    retry = Retry(
+        total=3, connect=3, read=0, backoff_factor=BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",)
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "identity"  # Range 이어받기를 위해 압축 해제 안 된 원본 바이트 기준
+    return session
+
+
+def _meta_path(path):
+    return path + ".meta.json"
+
+
+def _load_meta(path):
+    try:
+        with open(_meta_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(path, meta):
+    tmp = _meta_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, _meta_path(path))
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+# ---------------------------------------------------------
+# [3] 내용 검증
+# ---------------------------------------------------------
+
+def verify_content(kind, path):
+    """
+    받은 파일이 정상인지 확인합니다. (잘린 파일이나 에러 페이지가 저장되는 것 방지)
+    - chaos: 스트리밍 파서로 끝까지 읽혀야 함
+    - leads: Smogon 선봉 테이블 헤더가 있어야 함
+    """
+    if kind == "chaos":
+        try:
+            from fetch_rank_data import iter_chaos_species, iter_file_chunks
+        except ImportError:
+            from Statistics.fetch_rank_data import iter_chaos_species, iter_file_chunks
+        try:
+            for _ in iter_chaos_species(iter_file_chunks(path)):
+                pass
+            return True
+        except ValueError:
+            return False
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        head = f.read(2048)
+    return "Rank" in head and "Pokemon" in head and "|" in head
+
+def _promote(part_path, dest_path, url, etag, last_modified, size):
+    """ 검증된 .part를 dest_path로 원자적 교체 + 메타데이터 기록 """
+    os.replace(part_path, dest_path)
+    meta = {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "size": size,
+        "sha256": _file_sha256(dest_path),
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    _save_meta(dest_path, meta)
+    return meta
+
+
+def _range_total(res):
+    """ 416 응답의 'Content-Range: bytes */<전체>' -> 전체 크기 (없으면 None) """
+    value = res.headers.get("Content-Range", "")
+    try:
+        return int(value.rsplit("/", 1)[1]) if "/" in value else None
+    except ValueError:
+        return None
+
+# ---------------------------------------------------------
+# [4] 단일 다운로드 (조건부 요청 + 이어받기 + 원자적 교체)
+# ---------------------------------------------------------
+
+def download(job, dest_path, session=None, base_url=STATS_ROOT, on_progress=None, force=False,
+             verify=verify_content):
+    """
+    파일 하나를 받아 dest_path에 원자적으로 저장합니다.
+    1. 이전에 받은 적 있으면 ETag/Last-Modified로 조건부 요청 -> 304면 건너뜀
+    2. .part 파일이 남아 있으면 Range 요청으로 이어받기 (If-Range로 원본 변경 시 처음부터)
+       416(이미 끝까지 받은 .part): 검증되면 그대로 교체, 아니면 지우고 Range 없이 다시 받기
+    3. 길이/내용 검증 후 os.replace로 교체 (실패해도 기존 파일은 그대로)
+    verify(kind, path) -> bool: 내용 검증 (가공 패스를 검증으로 겸하려면 호출자가 넘김)
+    """
+    session = session or make_session(1)
+    url = job.url(base_url)
+    part_path = dest_path + ".part"
+    meta = _load_meta(dest_path)
+    start = time.perf_counter()
+    attempts = 0
+    resumed = False
+    error = None
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+    while attempts < MAX_ATTEMPTS:
+        attempts += 1
+        headers = {}
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+        if have and meta.get("part_validator"):
+            headers["Range"] = f"bytes={have}-"
+            headers["If-Range"] = meta["part_validator"]
+        else:
+            have = 0
+            if not force and os.path.exists(dest_path):
+                if meta.get("etag"): headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"): headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as res:
+                if res.status_code == 304:
+                    return DownloadResult(job, dest_path, "not_modified", 0,
+                                          time.perf_counter() - start, attempts, None)
+                if res.status_code == 416 and have:
+                    total = _range_total(res)
+                    if total in (None, have) and verify(job.kind, part_path):
+                        # 저장 직후 교체 전에 멈췄던 경우: 받은 파일이 이미 완전함
+                        validator = meta.get("part_validator") or ""
+                        is_etag = validator.startswith(('"', "W/"))
+                        meta = _promote(part_path, dest_path, url, validator if is_etag else res.headers.get("ETag"),
+                                        None if is_etag else validator or None, have)
+                        return DownloadResult(job, dest_path, "resumed", 0,
+                                              time.perf_counter() - start, attempts, None)
+                    os.remove(part_path)
+                    meta.pop("part_validator", None)
+                    _save_meta(dest_path, meta)
+                    print(f"⚠️ {job.file_name}: 남은 .part가 원본과 맞지 않아 처음부터 다시 받습니다")
+                    continue
+                if res.status_code not in (200, 206):
+                    raise requests.HTTPError(f"HTTP {res.status_code}")
+
+                validator = res.headers.get("ETag") or res.headers.get("Last-Modified")
+                if res.status_code == 206:
+                    resumed = True
+                    mode = "ab"
+                    total = have + int(res.headers.get("Content-Length", 0))
+                else:
+                    have = 0
+                    mode = "wb"
+                    total = int(res.headers.get("Content-Length", 0))
+
+                # 이어받기에 쓸 검증자를 먼저 기록해 둠
+                meta["part_validator"] = validator
+                _save_meta(dest_path, meta)
+
+                done = have
+                with open(part_path, mode) as f:
+                    for chunk in res.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        done += len(chunk)
+                        if on_progress: on_progress(job, done, total)
+
+                if total and done != total:
+                    raise requests.ConnectionError(f"길이 불일치 ({done}/{total} bytes)")
+
+                if not verify(job.kind, part_path):
+                    os.remove(part_path)
+                    meta.pop("part_validator", None)
+                    _save_meta(dest_path, meta)
+                    raise ValueError("내용 검증 실패")
+
+                meta = _promote(part_path, dest_path, url, res.headers.get("ETag"),
+                                res.headers.get("Last-Modified"), done)
+                return DownloadResult(job, dest_path, "resumed" if resumed else "downloaded", done - have if resumed else done,
+                                      time.perf_counter() - start, attempts, None)
+
+        except (requests.RequestException, ValueError) as e:
+            error = str(e)
+            # 404 같은 확정 실패는 재시도 의미 없음
+            if isinstance(e, requests.HTTPError) and "HTTP 4" in error:
+                break
+            time.sleep(BACKOFF * (2 ** (attempts - 1)))
+
+    return DownloadResult(job, dest_path, "failed", 0, time.perf_counter() - start, attempts, error)
+
+# ---------------------------------------------------------
+# [5] 병렬 다운로드
+# ---------------------------------------------------------
+
+class FetchMetrics:
+    """ 진행률 및 타이밍 집계 (스레드 안전) """
+    def __init__(self, jobs):
+        self._lock = threading.Lock()
+        self.progress = {job: (0, 0) for job in jobs}
+        self.results = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def on_progress(self, job, done, total):
+        with self._lock:
+            self.progress[job] = (done, total)
+
+    def add(self, result):
+        with self._lock:
+            self.results.append(result)
+
+    def snapshot(self):
+        """ 현재 (받은 바이트, 전체 바이트, 완료 건수, 전체 건수) """
+        with self._lock:
+            done = sum(d for d, _ in self.progress.values())
+            total = sum(t for _, t in self.progress.values())
+            return done, total, len(self.results), len(self.progress)
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        counts = {}
+        for r in self.results:
+            counts[r.status] = counts.get(r.status, 0) + 1
+        total_bytes = sum(r.bytes for r in self.results)
+        return {
+            "elapsed": round(elapsed, 3),
+            "bytes": total_bytes,
+            "throughput_kbps": round(total_bytes / 1024 / elapsed, 1) if elapsed > 0 else 0.0,
+            "counts": counts,
+            "slowest": sorted(((r.job.file_name, round(r.elapsed, 3)) for r in self.results),
+                              key=lambda x: x[1], reverse=True)[:3],
+        }
+
+
+def download_many(jobs, dest_dir=DOWNLOAD_DIR, base_url=STATS_ROOT, max_workers=MAX_WORKERS,
+                  on_progress=None, force=False):
+    """
+    여러 통계 파일을 하나의 커넥션 풀로 동시에 받습니다.
+    Returns: (결과 리스트, FetchMetrics)
+    """
+    metrics = FetchMetrics(jobs)
+    session = make_session(max_workers)
+
+    def progress(job, done, total):
+        metrics.on_progress(job, done, total)
+        if on_progress: on_progress(job, done, total)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(download, job, os.path.join(dest_dir, job.file_name),
+                        session, base_url, progress, force)
+            for job in jobs
+        ]
+        for fut in as_completed(futures):
+            result = fut.result()
+            metrics.add(result)
+            icon = {"downloaded": "✅", "resumed": "⏯️", "not_modified": "💤"}.get(result.status, "❌")
+            print(f"{icon} {result.job.file_name}: {result.status} ({result.bytes} bytes, {result.elapsed:.2f}s)"
+                  + (f" - {result.error}" if result.error else ""))
+
+    metrics.finished = time.perf_counter()
+    session.close()
+    return metrics.results, metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smogon 통계 병렬 다운로더")
+    parser.add_argument("--months", nargs="+", default=["2025-12"])
+    parser.add_argument("--formats", nargs="+", default=["gen9bssregj"])
+    parser.add_argument("--ratings", nargs="+", default=["1760"])
+    parser.add_argument("--kinds", nargs="+", default=["chaos", "leads"])
+    parser.add_argument("--base-url", default=STATS_ROOT)
+    parser.add_argument("--dest", default=DOWNLOAD_DIR)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--force", action="store_true", help="조건부 요청 없이 다시 받기")
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.months, args.formats, args.ratings, args.kinds)
+    print(f"📡 {len(jobs)}개 파일 다운로드 시작 (동시 {args.workers}개)")
+    results, metrics = download_many(jobs, args.dest, args.base_url, args.workers, force=args.force)
+    print(f"📊 {json.dumps(metrics.summary(), ensure_ascii=False)}")
+    sys.exit(1 if any(r.status == "failed" for r in results) else 0)
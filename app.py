@@ -1,13 +1,22 @@
 import streamlit as st
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
+_rerun_start = time.perf_counter()
+
 # --- [모듈 임포트] ---
+from battle_session import session_manager  # 세션별 파티/배틀 상태
+from Battle_Preparing.user_party import UserParty
 from Battle_Preparing.party_loader import load_party_from_file
-from Battle_Preparing.user_party import my_party
-from battle_state import current_battle  # Single Source of Truth
-from entry import analyze_entry_strategy, parse_opponent_input, parse_recommended_selection
-from battle import analyze_battle_turn
+import llm_provider
+import telemetry
+import profiler
+import jobs  # 분석은 워커에서, 화면은 job id로 폴링
+from battle import summarize_turn_metrics, ADVISOR_MODES, MODE_LABELS
+from entry import TOKEN_KEYS
+from win_probability import win_table
 
 # 1. 페이지 설정
 st.set_page_config(layout="wide", page_title="Pokémon AI Consultant")
@@ -29,11 +38,8 @@ st.markdown("""
 if "initialized" not in st.session_state:
     load_dotenv()
     
-    # [Step 1] 파티 로드
-    load_party_from_file("my_team.txt")
-    
-    # [Step 2] BattleState 초기화 (중요)
-    current_battle.refresh_my_party()
+    # [Step 1] 세션 ID 발급 (파티 로드 + BattleState 생성은 세션 매니저가 담당)
+    st.session_state.session_id = uuid.uuid4().hex
     
     # [Step 3] 세션 변수
     st.session_state.messages = []
@@ -41,13 +47,66 @@ if "initialized" not in st.session_state:
     st.session_state.opponent_list = []
     
     # [New] 토큰 관리 변수
-    st.session_state.entry_tokens = {"parser": 0, "strategy": 0, "selection": 0}
+    st.session_state.entry_tokens = dict.fromkeys(TOKEN_KEYS, 0)   # jobs의 선출 결과 "tokens"와 같은 키
     # 기존 battle_token_total 대신 상세 내역 저장을 위한 딕셔너리로 초기화
     if "battle_tokens" not in st.session_state:
         st.session_state.battle_tokens = {"parser": 0, "analysis": 0} 
     
     st.session_state.initialized = True
 
+# ==============================================================================
+# [캐시] 스크립트는 상호작용마다 처음부터 다시 실행됨
+# - 무거운 객체(파티)는 cache_resource로 프로세스에 하나 (Smogon 통계/기술 캐시는 이미 모듈 전역)
+# - 상태에서 파생되는 표는 cache_data + 상태 키 (battle.state_key: 상태가 같으면 재계산 안 함)
+# - 사이드바/채팅은 fragment: 그 안의 위젯을 건드리면 그 부분만 다시 그림
+# ==============================================================================
+
+@st.cache_resource(show_spinner=False)
+def load_party(team_file, mtime):
+    """ 파티 파일 -> UserParty (파일이 바뀌면 mtime이 달라져 다시 불러옴) """
+    party = UserParty()
+    load_party_from_file(team_file, party)
+    return party
+
+session_manager.party_loader = lambda team_file: load_party(team_file, os.path.getmtime(team_file))
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_win_rows(state_key, _battle):
+    """ 행동별 승률표 (몬테카를로 롤아웃, 수십 ms) -> 같은 상태면 다시 돌리지 않음 """
+    rows = win_table(_battle)
+    if not rows:
+        return [], 0
+    return [
+        {"행동": label, "승률": f"{e.p*100:.1f}%", "95% 구간": f"{e.low*100:.1f}~{e.high*100:.1f}%"}
+        for label, e in rows
+    ], rows[0][1].n
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_mode_rows(session_id, turns, _battle):
+    """ 분석 방식별 지연/토큰 비교 (턴 기록이 늘어날 때만 다시 계산) """
+    return [
+        {
+            "방식": MODE_LABELS[mode], "턴": v["turns"],
+            "평균 지연": f"{v['avg_latency']:.2f}s", "평균 토큰": f"{v['avg_tokens']:.0f}",
+            "캐시 입력": f"{v['avg_cached_tokens']:.0f}/{v['avg_input_tokens']:.0f}",
+            "LLM 호출": f"{v['avg_calls']:.1f}",
+            "첫 글자까지": f"{v['avg_ttft']:.2f}s" if v["avg_ttft"] is not None else "-",
+            "추측 적중": f"{v['hit_rate']*100:.0f}%" if v["hit_rate"] is not None else "-",
+        }
+        for mode, v in summarize_turn_metrics(_battle).items()
+    ]
+
+# [Step 2] 이 세션의 파티/배틀 상태
+# 재시작 복구: 세션이 새로 만들어지면 URL의 battle id로 이벤트 로그 재생
+session = session_manager.get(st.session_state.session_id, st.query_params.get("battle"))
+battle = session.battle
+job_queue = jobs.get_queue()
+POLL_INTERVAL = 0.5   # 진행 중인 작업 확인 주기 (초, 해당 fragment만 다시 그림)
+# 행동 순서 선택지 -> analyze_battle_turn의 opp_moved_first (모름이면 스피드 역산 안 함)
+TURN_ORDERS = {"모름": None, "상대 선공": True, "내가 선공": False}
+
 # ==============================================================================
 # [사이드바] 배틀 상태 뷰어 (View Only Dashboard)
 # ==============================================================================
@@ -55,16 +114,44 @@ with st.sidebar:
     st.header("📊 배틀 현황판")
     st.info("모든 상태 조작은 채팅으로 명령하세요.\n(예: '상대 딩루 교체', '내 피 50%')")
     
-    if not os.getenv("GOOGLE_API_KEY"):
-        st.error("API Key가 없습니다.")
+    if not llm_provider.is_ready():
+        st.error("API Key가 없습니다. (오프라인 확인은 LLM_PROVIDER=fake)")
         st.stop()
 
+
+@st.fragment
+@telemetry.timed("ui_render", part="sidebar")
+def sidebar_board():
+    """ 현황판 + 설정 + 계측 (여기 위젯은 사이드바만 다시 그림, 상태를 바꾸는 버튼은 전체 다시 그림) """
+    # 파싱이 잘못된 턴은 되돌리기로 복구
+    # (분석 작업이 상태를 쓰는 중에는 잠금)
+    col_undo, col_redo = st.columns(2)
+    if col_undo.button("↩️ 되돌리기", disabled=session.busy or not battle.history.can_undo, use_container_width=True):
+        battle.undo()
+        st.rerun()
+    if col_redo.button("↪️ 다시 실행", disabled=session.busy or not battle.history.can_redo, use_container_width=True):
+        battle.redo()
+        st.rerun()
+
+    # 턴 분석 방식 (세션별)
+    battle.advisor_mode = st.selectbox(
+        "🧠 턴 분석 방식", ADVISOR_MODES,
+        index=ADVISOR_MODES.index(battle.advisor_mode), format_func=MODE_LABELS.get,
+        help="단일 호출: LLM 1회로 파싱+조언 / 추측 조언: 로컬 파싱으로 조언을 먼저 시작",
+    )
+    # 이 세션의 선출/턴 분석만 프로파일 (끄면 감싼 함수는 그냥 통과, 값은 st.session_state.profile_mode)
+    st.selectbox(
+        "🔬 프로파일링", (None,) + profiler.MODES, format_func=lambda m: m or "끔", key="profile_mode",
+        help="sample: collapsed stack(.folded, 플레임그래프용) / cprofile: .prof + 상위 함수 .txt\n"
+             "스트리밍으로 받는 조언 본문 시간은 포함되지 않음 (계측 패널의 llm_phase 참고)",
+    )
+
     st.divider()
 
     # --- 1. 나의 상태 (My Status) ---
     st.subheader("🟢 나의 필드")
-    if current_battle.my_active:
-        me = current_battle.my_active
+    if battle.my_active:
+        me = battle.my_active
         st.markdown(f"**{me.name}**")
         
         # HP Bar (읽기 전용)
@@ -92,8 +179,8 @@ with st.sidebar:
 
     # --- 2. 상대 상태 (Opponent Status) ---
     st.subheader("🔴 상대 필드")
-    if current_battle.opp_active:
-        opp = current_battle.opp_active
+    if battle.opp_active:
+        opp = battle.opp_active
         st.markdown(f"**{opp.name}**")
         
         # HP Bar
@@ -128,9 +215,9 @@ with st.sidebar:
     st.subheader("🌐 필드 환경")
     
     # 날씨/필드/룸
-    w = current_battle.global_effects['weather']
-    t = current_battle.global_effects['terrain']
-    tr = current_battle.global_effects['trick_room']
+    w = battle.global_effects['weather']
+    t = battle.global_effects['terrain']
+    tr = battle.global_effects['trick_room']
     
     st.write(f"🌤️ 날씨: **{w if w else '없음'}**")
     st.write(f"🌱 필드: **{t if t else '없음'}**")
@@ -143,19 +230,72 @@ with st.sidebar:
     with col_me:
         st.markdown("**[나]**")
         effs = []
-        if current_battle.side_effects['me']['tailwind']: effs.append("순풍")
-        if current_battle.side_effects['me']['reflect']: effs.append("벽")
+        if battle.side_effects['me']['tailwind']: effs.append("순풍")
+        if battle.side_effects['me']['reflect']: effs.append("벽")
         if not effs: st.write("-")
         else: st.write(", ".join(effs))
         
     with col_opp:
         st.markdown("**[상대]**")
         o_effs = []
-        if current_battle.side_effects['opp']['tailwind']: o_effs.append("순풍")
-        if current_battle.side_effects['opp']['reflect']: o_effs.append("벽")
+        if battle.side_effects['opp']['tailwind']: o_effs.append("순풍")
+        if battle.side_effects['opp']['reflect']: o_effs.append("벽")
         if not o_effs: st.write("-")
         else: st.write(", ".join(o_effs))
 
+    st.divider()
+
+    # --- 4. 계측 (어디서 시간이 쓰이는지) ---
+    # 표 변환(pandas/arrow)이 사이드바 다시 그리기 시간의 대부분 -> 켰을 때만 그림 (접힌 expander 안도 매번 실행됨)
+    with st.expander("📈 계측 (지연 / 토큰 / 캐시)"):
+        if st.toggle("표 보기", key="show_telemetry"):
+            rows = telemetry.summary()
+            if rows:
+                st.dataframe([{
+                    "항목": r["metric"].replace("_seconds", ""), "라벨": r["labels"], "횟수": r["count"],
+                    "합계(s)": round(r["total"], 3), "평균(s)": round(r["avg"], 3), "p95(s)": round(r["p95"], 3),
+                } for r in rows], hide_index=True, use_container_width=True)
+            else:
+                st.caption("아직 기록이 없습니다.")
+
+            ratios = telemetry.hit_ratios()
+            if ratios:
+                st.caption("캐시 적중률")
+                st.dataframe([{"캐시": name, "적중": int(hits), "전체": int(total), "적중률": f"{ratio:.0%}"}
+                              for name, (hits, total, ratio) in ratios.items()], hide_index=True, use_container_width=True)
+
+            tokens = {}
+            for (name, labels), value in telemetry.counters().items():
+                if name == "llm_tokens":
+                    lab = dict(labels)
+                    tokens.setdefault(lab["phase"], {})[lab["kind"]] = int(value)
+            if tokens:
+                st.caption("단계별 토큰")
+                st.dataframe([{"단계": phase, **kinds} for phase, kinds in tokens.items()],
+                             hide_index=True, use_container_width=True)
+
+            col_prom, col_jsonl = st.columns(2)
+            col_prom.download_button("Prometheus", telemetry.prometheus_text(), file_name="metrics.prom",
+                                     mime="text/plain", use_container_width=True)
+            if col_jsonl.button("JSONL 저장", use_container_width=True):
+                telemetry.write_prometheus()
+                path, n = telemetry.flush_jsonl()
+                st.caption(f"💾 {n}건 -> {path}")
+
+            job_stats = job_queue.stats()
+            if job_stats:
+                st.caption("작업 큐: " + " · ".join(f"{k} {v}" for k, v in job_stats.items()))
+
+            recent = profiler.results()
+            if recent:
+                st.caption("최근 프로파일")
+                st.dataframe([{"대상": r["name"], "방식": r["mode"], "시간(s)": round(r["seconds"], 3),
+                               "파일": os.path.basename(r["files"][0]) if r["files"] else "-"} for r in recent[:10]],
+                             hide_index=True, use_container_width=True)
+
+with st.sidebar:
+    sidebar_board()
+
 
 # ==============================================================================
 # [메인 화면] 채팅 인터페이스
@@ -171,44 +311,47 @@ with tab1:
     
     entry_input = st.text_input("입력 (예: 날치머 망나뇽 딩루 물거폰 우라오스 미라이돈 ...)")
     
-    if st.button("분석 시작"):
+    entry_job = job_queue.get(st.session_state.get("entry_job"))
+    if st.button("분석 시작", disabled=entry_job is not None):
         if entry_input:
-            with st.spinner("Gemini 3.0이 시뮬레이션을 돌리고 있습니다..."):
-                # 1. 파싱
-                opp_list, t1 = parse_opponent_input(entry_input)
-                
-                if opp_list:
-                    st.session_state.opponent_list = opp_list
-                    
-                    # 2. BattleState 초기화
-                    current_battle.initialize_opponent(opp_list)
-                    
-                    # 3. 분석 실행
-                    analysis, t2 = analyze_entry_strategy(opp_list)
-                    st.session_state.entry_analysis = analysis
-                    
-                    # 4. 선출 추출
-                    try:
-                        rec_team, t3 = parse_recommended_selection(analysis)
-                        if rec_team:
-                            lead = rec_team[0]
-                            if lead in my_party.team:
-                                current_battle.set_active("me", lead)
-                                current_battle.set_my_selection(rec_team)
-                    except Exception as e:
-                        print(f"선출 자동 반영 실패: {e}")
-
-                    # [New] 토큰 정보 저장
-                    st.session_state.entry_tokens = {
-                        "input_tokens": t1.get('input_tokens', 0) + t2.get('input_tokens', 0) + t3.get('input_tokens', 0),
-                        "output_tokens": t1.get('output_tokens') + t2.get('output_tokens', 0) + t3.get('output_tokens', 0),
-                        "total_tokens": t1.get('total_tokens', 0) + t2.get('total_tokens', 0) + t3.get('total_tokens', 0)
-                    }
-
-                    st.success("✅ 전략 수립 및 선출 반영 완료!")
-                    st.rerun()
-                else:
-                    st.error("입력 해석 실패")
+            # 같은 입력이 이미 분석 중이면 그 작업을 그대로 이어서 봄
+            st.session_state.entry_job = job_queue.submit(
+                "entry", jobs.run_entry_job, session, entry_input, st.session_state.get("profile_mode"),
+                key=("entry", session.session_id, entry_input),
+            )
+            st.rerun()
+
+    @st.fragment(run_every=POLL_INTERVAL if entry_job is not None else None)
+    def entry_job_view():
+        """ 선출 분석 진행 상황 (이 부분만 주기적으로 다시 그림) """
+        job = job_queue.get(st.session_state.get("entry_job"))
+        if job is None:
+            return
+        if not job.done:
+            st.progress(job.progress, text=f"{job.message} ({job.elapsed:.1f}s)")
+            if job.parts:
+                st.markdown(job.text)
+            if st.button("⏹️ 취소", key="cancel_entry"):
+                job_queue.cancel(job.id)
+            return
+
+        # 끝남 -> 결과 반영 후 전체 다시 그림 (사이드바 상태 갱신)
+        st.session_state.entry_job = None
+        if job.status == jobs.DONE:
+            result = job.result
+            st.session_state.opponent_list = result["opponent_list"]
+            st.query_params["battle"] = result["battle_id"]   # 재시작 시 복구용
+            st.session_state.entry_analysis = result["analysis"]
+            st.session_state.entry_timing = result["timing"]
+            st.session_state.entry_tokens = result["tokens"]
+            st.session_state.entry_notice = None if result["selection"] else "추천 선출을 찾지 못했습니다. 직접 선택하세요."
+        else:
+            st.session_state.entry_notice = job.message
+        st.rerun()
+
+    entry_job_view()
+    if st.session_state.get("entry_notice"):
+        st.warning(st.session_state.entry_notice)
     
     if st.session_state.entry_analysis:
         st.markdown("---")
@@ -223,57 +366,103 @@ with tab1:
         c1.metric("1. 입력 토큰", f"{et['input_tokens']}")
         c2.metric("2. 출력 토큰", f"{et['output_tokens']}")
         c3.metric("3. 총 사용량", f"{et['total_tokens']}")
+        timing = st.session_state.get("entry_timing")
+        if timing and timing["ttft"] is not None:
+            c4.metric("⏱️ 첫 토큰 / 전체", f"{timing['ttft']:.1f}s / {timing['latency']:.1f}s")
 
 # --- Tab 2: 배틀 ---
 with tab2:
-    # 대화 기록 표시
-    chat_container = st.container()
-    with chat_container:
-        for msg in st.session_state.messages:
-            with st.chat_message(msg["role"]):
-                st.markdown(msg["content"])
+    # 행동별 승률표 (계산기 표 기반 몬테카를로 롤아웃, 수십 ms -> 상태 키로 캐시)
+    if battle.my_active and battle.opp_active:
+        with st.expander("🎲 행동별 승률 (몬테카를로)"):
+            if session.busy:
+                st.caption("분석 중에는 갱신하지 않습니다.")
+            else:
+                win_rows, rollouts = cached_win_rows(battle.state_key, battle)
+                if win_rows:
+                    st.dataframe(win_rows, hide_index=True, use_container_width=True)
+                    st.caption(f"행동별 롤아웃 {rollouts}회 · 이후는 최대 피해 기술 고정 정책 · 미확인 상대는 공개된 상대로 대체")
+                elif not battle.my_entry_selection:
+                    st.caption("내 선출 3마리를 정하면 계산합니다.")
+                else:
+                    st.caption("공개된 상대 정보가 부족합니다.")
+
+    @st.fragment
+    @telemetry.timed("ui_render", part="chat")
+    def chat_view():
+        """ 대화 기록 + 진행 중인 턴 + 입력창 (선공 체크 등은 이 부분만 다시 그림) """
+        # 대화 기록 표시
+        chat_container = st.container()
+        with chat_container:
+            for msg in st.session_state.messages:
+                with st.chat_message(msg["role"]):
+                    st.markdown(msg["content"])
+
+        turn_job = job_queue.get(st.session_state.get("turn_job"))
+
+        @st.fragment(run_every=POLL_INTERVAL if turn_job is not None else None)
+        def turn_job_view():
+            """ 턴 분석 진행 상황: 받은 조언을 그대로 보여 주고, 끝나면 기록에 넣고 전체 다시 그림 """
+            job = job_queue.get(st.session_state.get("turn_job"))
+            if job is None:
+                return
+            if not job.done:
+                with st.chat_message("assistant"):
+                    st.progress(job.progress, text=f"{job.message} ({job.elapsed:.1f}s)")
+                    if job.parts:
+                        st.markdown(job.text)
+                    if st.button("⏹️ 취소", key="cancel_turn"):
+                        job_queue.cancel(job.id)
+                return
+
+            st.session_state.turn_job = None
+            if job.status == jobs.DONE:
+                result = job.result
+                parser_tokens, analyze_tokens = result["parser_tokens"], result["analyze_tokens"]
+                # [Token Update] 채팅 턴마다 토큰 누적 (Index 2: Total Token 가정)
+                p_cnt = parser_tokens[2] if parser_tokens and len(parser_tokens) > 2 else 0
+                a_cnt = analyze_tokens[2] if analyze_tokens and len(analyze_tokens) > 2 else 0
+                st.session_state.battle_tokens["parser"] += p_cnt
+                st.session_state.battle_tokens["analysis"] += a_cnt
+
+                # 응답 메시지 끝에 이번 턴 토큰/시간 정보 추가 (저장할 때도 포함)
+                timing = f" · ⏱️ {result['latency']:.1f}s" if result["latency"] is not None else ""
+                token_info = f"\n\n--- \n*💎 Cost: {p_cnt + a_cnt} Tokens (Parser: {p_cnt}, Analysis: {a_cnt}){timing}*"
+                content = result["text"] + token_info
+            else:
+                # 취소/실패: 받은 데까지 남김 (상태 반영이 끝났으면 되돌리기로 복구)
+                content = (job.text + "\n\n" if job.parts else "") + f"*⚠️ {job.message}*"
+            st.session_state.messages.append({"role": "assistant", "content": content})
+            st.rerun()
+
+        turn_job_view()
     
-    st.markdown("---")
+        st.markdown("---")
     
-    # 입력창
-    with st.container():
-        c1, c2 = st.columns([5, 1])
-        with c1:
-            user_input = st.chat_input("상황을 입력하세요 (예: 상대 미라이돈 등장, 내 피 50%)")
-        with c2:
-            opp_first = st.checkbox("상대 선공?", key="chk_opp_first", help="체크 시 스피드/스카프 추론 작동")
-
-        if user_input:
-            # 1. 사용자 메시지
-            st.session_state.messages.append({"role": "user", "content": user_input})
-            with st.chat_message("user"):
-                st.markdown(user_input)
-            
-            # 2. AI 응답 (상태 업데이트 + 계산 + 조언)
-            with st.chat_message("assistant"):
-                place = st.empty()
-                with st.spinner("계산 및 전략 수립 중..."):
-                    # [핵심] battle.py 호출 -> 상태 갱신 -> 조언 생성
-                    response, parser_tokens, analyze_tokens = analyze_battle_turn(user_input, opp_first)
-                    
-                    # [Token Update] 채팅 턴마다 토큰 누적 (Index 2: Total Token 가정)
-                    p_cnt = parser_tokens[2] if parser_tokens and len(parser_tokens) > 2 else 0
-                    a_cnt = analyze_tokens[2] if analyze_tokens and len(analyze_tokens) > 2 else 0
-                    
-                    st.session_state.battle_tokens["parser"] += p_cnt
-                    st.session_state.battle_tokens["analysis"] += a_cnt
-                    
-                    # [수정] 응답 메시지 끝에 이번 턴 토큰 정보 추가
-                    token_info = f"\n\n--- \n*💎 Cost: {p_cnt + a_cnt} Tokens (Parser: {p_cnt}, Analysis: {a_cnt})*"
-                    full_response = response + token_info
-                    
-                    place.markdown(full_response)
-            
-            # 저장할 때도 토큰 정보가 포함된 버전을 저장
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
-            
-            # 3. 화면 갱신 (변경된 상태를 사이드바에 반영)
-            st.rerun()
+        # 입력창 (분석 중에는 잠금)
+        with st.container():
+            c1, c2 = st.columns([5, 1])
+            with c1:
+                user_input = st.chat_input("상황을 입력하세요 (예: 상대 미라이돈 등장, 내 피 50%)", disabled=turn_job is not None)
+            with c2:
+                # 지난 턴에 고른 순서는 다음 턴으로 넘기지 않음 (위젯을 만들기 전에만 값을 바꿀 수 있음)
+                if st.session_state.pop("reset_turn_order", False):
+                    st.session_state["turn_order"] = "모름"
+                order = st.radio("행동 순서", list(TURN_ORDERS), key="turn_order",
+                                 help="같은 우선도 기술을 서로 쓴 턴에만 스피드/스카프 추론 작동")
+                opp_first = TURN_ORDERS[order]
+
+            if user_input:
+                # 사용자 메시지 기록 -> 상태 업데이트 + 계산 + 조언은 워커에서
+                st.session_state.messages.append({"role": "user", "content": user_input})
+                st.session_state.turn_job = job_queue.submit(
+                    "turn", jobs.run_turn_job, session, user_input, opp_first, st.session_state.get("profile_mode"),
+                    key=("turn", session.session_id, user_input, opp_first),
+                )
+                st.session_state.reset_turn_order = True
+                st.rerun()
+
+    chat_view()
 
     # [New] 하단 토큰 리포트 (배틀 누적)
     st.divider()
@@ -284,4 +473,11 @@ with tab2:
     bc1, bc2, bc3 = st.columns(3)
     bc1.metric("1. 상황 파싱", f"{bt['parser']}")
     bc2.metric("2. 전략 분석", f"{bt['analysis']}")
-    bc3.metric("💰 Total", f"{total_battle}", delta_color="off")
\ No newline at end of file
+    bc3.metric("💰 Total", f"{total_battle}", delta_color="off")
+
+    # 분석 방식별 지연/토큰 비교 (이 세션 기준)
+    mode_rows = cached_mode_rows(session.session_id, len(battle.turn_metrics), battle)
+    if mode_rows:
+        st.dataframe(mode_rows, hide_index=True, use_container_width=True)
+
+telemetry.observe("ui_render_seconds", time.perf_counter() - _rerun_start, part="app")
@@ -1,6 +1,8 @@
 import os
 import json
 import ast
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from dotenv import load_dotenv
 
 # --- [모듈 임포트] ---
@@ -9,35 +11,36 @@ from Calculator.calculator import run_calculation
 from Calculator.speed_checker import check_turn_order
 from Calculator.move_loader import get_move_data
 from Calculator.stat_estimator import estimate_stats
-from entry import extract_clean_content
+from battle_search import search_actions, format_search_report, BattleModel
+from win_probability import estimate_win_probability, format_win_report
+from entry import extract_clean_content, get_token_info, format_my_party_info, LLMStream, TOKEN_KEYS
+from rag_retriever import get_opponent_party_report
+from local_parser import preparse, same_update
+import telemetry
+from profiler import profiled
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
+from llm_provider import llm   # 제공자 선택(gemini/fake/replay) + 응답 캐시. API 키는 첫 호출 때 확인
 
 # 1. 환경 설정
 load_dotenv()
-if not os.getenv("GOOGLE_API_KEY"):
-    raise ValueError("GOOGLE_API_KEY가 설정되지 않았습니다.")
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-3-flash-preview", 
-    temperature=0.1, # 배틀 분석은 정확성이 중요하므로 낮게 설정
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
 
 # -------------------------------------------------------------------------
 # [Helper] 스펙 포장 함수 (시뮬레이션 & 업데이트 공용)
 # -------------------------------------------------------------------------
-def pack_specs():
+def pack_specs(battle=None):
     """ 현재 BattleState를 계산기 입력용 Spec으로 변환 """
-    if not current_battle.my_active or not current_battle.opp_active:
+    battle = battle or current_battle
+    if not battle.my_active or not battle.opp_active:
         return None, None, None
 
-    my_poke = current_battle.my_active
-    opp_poke = current_battle.opp_active
+    my_poke = battle.my_active
+    opp_poke = battle.opp_active
     
-    # 상대 스탯 (확정 아니면 추정치)
+    # 상대 스탯 (확정 아니면 사후분포 기대값 -> 단일 추정치)
     opp_stats = opp_poke.info.get('stats')
+    if opp_poke.belief is not None and not opp_poke.confirmed['stats']:
+        opp_stats = opp_poke.belief.expected_stats()
     if not opp_stats:
         est = estimate_stats(opp_poke.name)
         opp_stats = est['stats'] if est else {'hp':100,'atk':100,'def':100,'spa':100,'spd':100,'spe':100}
@@ -51,16 +54,16 @@ def pack_specs():
     opp_spec = {
         'stats': opp_stats, 'ranks': opp_poke.ranks,
         'item': opp_poke.info['item'], 'status': opp_poke.status_condition,
-        'screens': current_battle.side_effects['opp'],
+        'screens': battle.side_effects['opp'],
         'ability': opp_poke.info['ability']
     }
     
     field_spec = {
-        'weather': current_battle.global_effects['weather'],
-        'terrain': current_battle.global_effects['terrain'],
-        'trick_room': current_battle.global_effects['trick_room'],
-        'tailwind_me': current_battle.side_effects['me']['tailwind'],
-        'tailwind_opp': current_battle.side_effects['opp']['tailwind']
+        'weather': battle.global_effects['weather'],
+        'terrain': battle.global_effects['terrain'],
+        'trick_room': battle.global_effects['trick_room'],
+        'tailwind_me': battle.side_effects['me']['tailwind'],
+        'tailwind_opp': battle.side_effects['opp']['tailwind']
     }
     
     return my_spec, opp_spec, field_spec
@@ -68,31 +71,8 @@ def pack_specs():
 # -------------------------------------------------------------------------
 # [Step 1] 파서 & 자동 계산 로직
 # -------------------------------------------------------------------------
-def parse_and_update_state(user_input):
-    """
-    사용자의 자연어 입력을 분석하여 BattleState를 갱신합니다.
-    """
-    print("🔄 [Logic] 사용자 입력 분석 및 자동 계산 시작...")
-    
-    my_name = current_battle.my_active.name if current_battle.my_active else "None"
-    opp_name = current_battle.opp_active.name if current_battle.opp_active else "None"
-    
-    # 교체 후보 리스트 (파싱 정확도 향상용)
-    my_roster = list(current_battle.my_party_status.keys())
-    opp_roster = current_battle.opp_full_roster
-
-    # [핵심 수정] 프롬프트 대폭 강화 (모든 변수 캡처)
-    parser_template = """
-    당신은 '포켓몬 배틀 로그 파서(Parser)'입니다. 
-    사용자의 입력을 보고 상태 변경 사항을 정확한 JSON으로 추출하세요.
-
-    [현재 필드]
-    - 나: {my_name} (대기: {my_roster})
-    - 상대: {opp_name} (엔트리: {opp_roster})
-
-    [사용자 입력]
-    "{user_input}"
-
+# 파서 규칙/스키마 (기본 파서와 단일 호출 모드가 같이 사용)
+PARSER_RULES = """
     [추출 규칙]
     1. **교체**: 
        - "상대 미라이돈 등장" -> "opp_switch": "Miraidon"
@@ -102,9 +82,9 @@ def parse_and_update_state(user_input):
     4. **상태이상**: "화상 입음" -> "Burn", "마비" -> "Paralysis", "잠듦" -> "Sleep".
     5. **랭크**: "칼춤췄어(+2공)" -> {{"atk": 2}}, "위협(-1공)" -> {{"atk": -1}}.
     6. **필드/날씨**: "비 내림" -> weather: "Rain", "벽 설치" -> opp_reflect: true.
+"""
 
-    [JSON 스키마]
-    {{
+PARSER_SCHEMA = """{{
         "my_switch": str or null,
         "opp_switch": str or null,
         "my_move_used": str or null,
@@ -126,64 +106,129 @@ def parse_and_update_state(user_input):
         "opp_reflect": bool or null,
         "opp_light_screen": bool or null,
         "turn_end": bool
-    }}
+    }}"""
+
+# 고정 부분(역할/규칙/스키마)을 앞에 두고 매 턴 바뀌는 필드/입력은 맨 뒤에 (프롬프트 캐시 적중용)
+PARSER_TEMPLATE = """
+    당신은 '포켓몬 배틀 로그 파서(Parser)'입니다. 
+    사용자의 입력을 보고 상태 변경 사항을 정확한 JSON으로 추출하세요.
+""" + PARSER_RULES + """
+    [JSON 스키마]
+    """ + PARSER_SCHEMA + """
+
+    [현재 필드]
+    - 나: {my_name} (대기: {my_roster})
+    - 상대: {opp_name} (엔트리: {opp_roster})
+
+    [사용자 입력]
+    "{user_input}"
+"""
+
+
+def token_list(response):
+    """ LLM 응답 -> [입력, 출력, 합계, 캐시 적중 입력] 토큰 """
+    info = get_token_info(response)
+    return [info[k] for k in TOKEN_KEYS]
+
+
+def no_tokens():
+    return [0] * len(TOKEN_KEYS)
+
+
+def _add_tokens(a, b):
+    return [x + y for x, y in zip(a, b)]
+
+
+def _load_json(text):
+    """ 코드블록/앞뒤 설명이 섞인 응답에서 JSON 객체 추출 """
+    text = text.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start: raise
+        return json.loads(text[start:end + 1])
+
+
+def parser_vars(user_input, battle):
+    """ 파서 프롬프트 변수 (배틀 상태를 읽는 부분은 여기서 끝냄 -> 호출은 다른 스레드에서 해도 안전) """
+    # 교체 후보 리스트 (파싱 정확도 향상용)
+    return {
+        "user_input": user_input,
+        "my_name": battle.my_active.name if battle.my_active else "None",
+        "opp_name": battle.opp_active.name if battle.opp_active else "None",
+        "my_roster": ", ".join(battle.my_party_status.keys()),
+        "opp_roster": ", ".join(battle.opp_full_roster),
+    }
+
+
+def _record_phase(phases, name, ttft, latency, tokens=None):
     """
-    
-    prompt = PromptTemplate.from_template(parser_template)
-    chain = prompt | llm
-    
+    단계별 첫 토큰 시간 / 전체 시간 (스트리밍이 아니면 첫 토큰 = 전체)
+    tokens: 스트리밍이 아닌 호출만 넘김 -> 계측에 기록 (스트림은 LLMStream이 끝날 때 직접 기록)
+    """
+    if phases is not None:
+        phases[name] = {"ttft": ttft, "latency": latency}
+    if tokens is not None:
+        telemetry.record_llm(name, ttft, latency, dict(zip(TOKEN_KEYS, tokens)))
+
+
+def request_parse(variables, phases=None):
+    """ LLM 파서 호출. Returns: (파싱 dict 또는 None, 토큰) """
+    chain = PromptTemplate.from_template(PARSER_TEMPLATE) | llm
+    token_result = no_tokens()
+    start = time.perf_counter()
     try:
-        response = chain.invoke({
-            "user_input": user_input, 
-            "my_name": my_name, 
-            "opp_name": opp_name,
-            "my_roster": ", ".join(my_roster),
-            "opp_roster": ", ".join(opp_roster)
-        })
-
-        usage = response.usage_metadata
-        token_result = [
-            usage.get('input_tokens', 0),
-            usage.get('output_tokens', 0),
-            usage.get('total_tokens', 0)
-        ]
-
-        print(token_result)
-        
-        json_text = extract_clean_content(response)
-        json_text = json_text.replace("```json", "").replace("```", "").strip()
-        parsed_data = json.loads(json_text)
+        response = chain.invoke(variables)
+        elapsed = time.perf_counter() - start
+        token_result = token_list(response)
+        _record_phase(phases, "parser", elapsed, elapsed, token_result)
+        parsed_data = _load_json(extract_clean_content(response))
         print(f"🧩 파싱 결과: {parsed_data}")
-        
+        return parsed_data, token_result
     except Exception as e:
         print(f"❌ 파싱 실패: {e}")
-        return False, "파싱 오류 발생"
+        return None, token_result
+
+
+def local_preparse(user_input, battle):
+    """ LLM 없이 키워드로 미리 해석 (추측 조언 모드용, local_parser 참고) """
+    my_moves = battle.my_active.info['moves'] if battle.my_active else []
+    opp_moves = []
+    if battle.opp_active:
+        info = battle.opp_active.info
+        opp_moves = info['moves'] + info['predictions']['moves']
+    return preparse(user_input, list(battle.my_party_status.keys()), battle.opp_full_roster, my_moves, opp_moves)
 
-    # 2. 상태 업데이트 적용 (Logic Layer)
+
+@telemetry.timed("state_update")
+def apply_parsed_update(parsed_data, user_input, battle, commit=True):
+    """ 파싱 결과를 BattleState에 반영 (자동 데미지 계산 포함). Returns: 반영 내역 메시지 """
     updates_log = []
     
     # (1) 교체 처리
     if parsed_data.get("my_switch"):
         new_my = parsed_data["my_switch"]
-        current_battle.set_active("me", new_my)
+        battle.set_active("me", new_my)
         updates_log.append(f"나 교체 -> {new_my}")
         
     if parsed_data.get("opp_switch"):
         new_opp = parsed_data["opp_switch"]
-        current_battle.set_active("opp", new_opp)
+        battle.set_active("opp", new_opp)
         updates_log.append(f"상대 교체 -> {new_opp}")
 
     # (2) 자동 데미지 계산 (Auto-Calc)
     # 교체가 없을 때만 수행
     if not parsed_data.get("my_switch") and not parsed_data.get("opp_switch"):
-        my_spec, opp_spec, field_spec = pack_specs()
+        my_spec, opp_spec, field_spec = pack_specs(battle)
         
         # Case A: 내가 공격
         my_move = parsed_data.get("my_move_used")
         if my_move and my_spec:
             if parsed_data.get("opp_hp_change_input") is not None:
                 dmg = parsed_data["opp_hp_change_input"]
-                current_battle.opp_active.update_hp(dmg)
+                battle.apply_hp("opp", dmg)
+                battle.observe_damage("opp", my_move, dmg)
                 updates_log.append(f"상대 HP {dmg}% (입력)")
             else:
                 move_info = get_move_data(my_move)
@@ -191,17 +236,18 @@ def parse_and_update_state(user_input):
                     res = run_calculation(my_spec, opp_spec, move_info, field_spec)
                     dmg_range = res['damage']['percent_range'].replace("%","").split('~')
                     avg_dmg = -(float(dmg_range[0]) + float(dmg_range[1])) / 2
-                    current_battle.opp_active.update_hp(avg_dmg)
+                    battle.apply_hp("opp", avg_dmg)
                     updates_log.append(f"상대 HP {avg_dmg:.1f}% (계산)")
 
         # Case B: 상대가 공격
         opp_move = parsed_data.get("opp_move_used")
         if opp_move and opp_spec:
-            current_battle.opp_active.add_known_move(opp_move)
+            battle.opp_active.add_known_move(opp_move)
             
             if parsed_data.get("my_hp_change_input") is not None:
                 dmg = parsed_data["my_hp_change_input"]
-                current_battle.my_active.update_hp(dmg)
+                battle.apply_hp("me", dmg)
+                battle.observe_damage("me", opp_move, dmg)
                 updates_log.append(f"내 HP {dmg}% (입력)")
             else:
                 move_info = get_move_data(opp_move)
@@ -209,139 +255,596 @@ def parse_and_update_state(user_input):
                     res = run_calculation(opp_spec, my_spec, move_info, field_spec)
                     dmg_range = res['damage']['percent_range'].replace("%","").split('~')
                     avg_dmg = -(float(dmg_range[0]) + float(dmg_range[1])) / 2
-                    current_battle.my_active.update_hp(avg_dmg)
+                    battle.apply_hp("me", avg_dmg)
                     updates_log.append(f"내 HP {avg_dmg:.1f}% (계산)")
 
-    # (3) 턴 증가
+    # (3) 턴 증가 (실제 증가는 apply_llm_update에서 한 번만)
     if parsed_data.get("turn_end"):
-        current_battle.turn_count += 1
         updates_log.append("턴 종료")
 
     # [최종 반영] 랭크/상태이상/필드 등 나머지 변수 일괄 적용
-    current_battle.apply_llm_update(parsed_data)
+    battle.apply_llm_update(parsed_data)
+    if commit:
+        battle.commit(user_input)
+
+    return f"✅ 상태 반영됨: {', '.join(updates_log)}"
 
-    return True, f"✅ 상태 반영됨: {', '.join(updates_log)}", token_result
+
+def parse_and_update_state(user_input, battle=None):
+    """
+    사용자의 자연어 입력을 분석하여 BattleState를 갱신합니다.
+    """
+    battle = battle or current_battle
+    print("🔄 [Logic] 사용자 입력 분석 및 자동 계산 시작...")
+
+    parsed_data, token_result = request_parse(parser_vars(user_input, battle))
+    if parsed_data is None:
+        return False, "파싱 오류 발생", token_result
+
+    return True, apply_parsed_update(parsed_data, user_input, battle), token_result
 
 # -------------------------------------------------------------------------
 # [Step 2] 시뮬레이션 및 조언 (Advisor)
 # -------------------------------------------------------------------------
-def run_battle_simulation_report():
-    """ 현재 상태 기준으로 승리 플랜 시뮬레이션 """
-    my_spec, opp_spec, field_spec = pack_specs()
+class SimulationReportCache:
+    """
+    [시뮬레이션 리포트 줄 단위 캐시]
+    줄마다 (의존 값 튜플, 결과)를 저장하고, 의존 값이 그대로면 계산기를 다시 돌리지 않습니다.
+    의존 값은 그 줄이 실제로 읽는 상태 필드만 담습니다. (예: 물리기 공격 줄 -> 내 A/랭크/도구/화상, 상대 B/H/랭크/리플렉터, 날씨/필드)
+    """
+    def __init__(self):
+        self.lines = {}
+        self.moves = {}
+        self.hits = 0
+        self.misses = 0
+
+    def move(self, name):
+        """ 기술 데이터는 배틀 중 바뀌지 않으므로 이름별로 한 번만 조회 """
+        data = self.moves.get(name)
+        if data is None:
+            data = self.moves[name] = get_move_data(name)
+        return data
+
+    def line(self, key, deps, compute):
+        cached = self.lines.get(key)
+        if cached is not None and cached[0] == deps:
+            self.hits += 1
+            telemetry.cache_event("report_line", True)
+            return cached[1]
+        value = compute()
+        self.lines[key] = (deps, value)
+        self.misses += 1
+        telemetry.cache_event("report_line", False)
+        return value
+
+
+def _report_cache(battle):
+    cache = battle.caches.get("report")
+    if cache is None:
+        cache = battle.caches["report"] = SimulationReportCache()
+    return cache
+
+
+def _speed_deps(spec, tailwind):
+    return (spec['stats'].get('spe'), spec['ranks'].get('spe', 0), spec['item'],
+            spec['status'], spec['ability'], tailwind)
+
+
+def _damage_deps(att_spec, def_spec, move_info, field_spec, screens):
+    """ calculate_damage_math가 읽는 값만 """
+    if move_info['category'] == "Physical":
+        atk, dfn, screen = 'atk', 'def', 'reflect'
+    else:
+        atk, dfn, screen = 'spa', 'spd', 'light_screen'
+    return (
+        att_spec['stats'][atk], att_spec['ranks'].get(atk, 0), att_spec['item'], att_spec['status'],
+        att_spec.get('ability'),   # 보정 레지스트리(Calculator/modifiers.py)는 특성으로도 고름
+        def_spec['stats'][dfn], def_spec['stats']['hp'], def_spec['ranks'].get(dfn, 0),
+        bool((screens or {}).get(screen)),
+        field_spec['weather'], field_spec['terrain'],
+    )
+
+
+@telemetry.timed("calc_batch", kind="report")
+def run_battle_simulation_report(battle=None):
+    """
+    현재 상태 기준으로 승리 플랜 시뮬레이션
+    줄마다 의존하는 값이 바뀐 경우에만 다시 계산합니다 (턴 수만 바뀐 턴은 계산기 호출 0회).
+    """
+    battle = battle or current_battle
+    my_spec, opp_spec, field_spec = pack_specs(battle)
     if not my_spec: return "⚠️ 정보 부족", {}
 
+    cache = _report_cache(battle)
+    misses_before = cache.misses
+    my_name, opp_name = battle.my_active.name, battle.opp_active.name
+
     report = ""
     # 1. 스피드 판정
-    speed_res = check_turn_order(my_spec, opp_spec, field_spec, {}, {})
+    speed_res = cache.line(
+        ("speed", my_name, opp_name),
+        (_speed_deps(my_spec, field_spec['tailwind_me']), _speed_deps(opp_spec, field_spec['tailwind_opp']),
+         field_spec['weather'], field_spec['terrain'], field_spec['trick_room']),
+        lambda: check_turn_order(my_spec, opp_spec, field_spec, {}, {}),
+    )
     icon = "🚀선공" if speed_res['is_my_turn'] else "🐢후공"
     if speed_res['is_my_turn'] is None: icon = "⚖️동속"
     report += f"⚡ [스피드] {icon} (나:{speed_res['my_final_speed']} vs 상대:{speed_res['opp_final_speed']})\n"
+    belief = battle.opp_active.belief
+    if belief is not None:
+        report += cache.line(("belief", opp_name), (belief,), lambda: f"🔮 [상대 세트 추정] {belief.summary()}\n")
 
     # 2. 공격 시뮬레이션
-    report += f"⚔️ [공격] {current_battle.my_active.name} -> {current_battle.opp_active.name}\n"
-    for move_name in current_battle.my_active.info['moves']:
-        m_info = get_move_data(move_name)
+    report += f"⚔️ [공격] {my_name} -> {opp_name}\n"
+    for move_name in battle.my_active.info['moves']:
+        m_info = cache.move(move_name)
         if m_info['power'] > 0:
-            res = run_calculation(my_spec, opp_spec, m_info, field_spec)
-            report += f" - {move_name}: {res['damage']['percent_range']} ({res['damage']['ko_result']})\n"
+            def attack_line(m_info=m_info, move_name=move_name):
+                res = run_calculation(my_spec, opp_spec, m_info, field_spec)
+                return f" - {move_name}: {res['damage']['percent_range']} ({res['damage']['ko_result']})\n"
+            report += cache.line(
+                ("atk", my_name, opp_name, move_name),
+                _damage_deps(my_spec, opp_spec, m_info, field_spec, opp_spec.get('screens')),
+                attack_line,
+            )
 
     # 3. 방어 시뮬레이션
-    report += f"🛡️ [방어] {current_battle.opp_active.name} 공격 예상\n"
+    report += f"🛡️ [방어] {opp_name} 공격 예상\n"
     # 확인된 기술 + 예측 기술
-    potential_moves = current_battle.opp_active.info['moves'] + current_battle.opp_active.info['predictions']['moves']
-    unique_moves = list(dict.fromkeys(potential_moves))[:5]
+    info = battle.opp_active.info
+    unique_moves = list(dict.fromkeys(info['moves'] + info['predictions']['moves']))[:5]
     
-    if unique_moves:
-        for move_name in unique_moves:
-            m_info = get_move_data(move_name)
-            if m_info['power'] > 0:
+    for move_name in unique_moves:
+        m_info = cache.move(move_name)
+        if m_info['power'] > 0:
+            def defense_line(m_info=m_info, move_name=move_name):
                 res = run_calculation(opp_spec, my_spec, m_info, field_spec)
                 dmg_min = int(res['damage']['damage_range'].split('~')[0])
                 if (dmg_min / my_spec['stats']['hp'] > 0.3) or "확정" in res['damage']['ko_result']:
-                    report += f" - ⚠️ {move_name}: {res['damage']['percent_range']} ({res['damage']['ko_result']})\n"
-
-    return report, {"my_real_speed": speed_res['my_final_speed']}
+                    return f" - ⚠️ {move_name}: {res['damage']['percent_range']} ({res['damage']['ko_result']})\n"
+                return ""
+            report += cache.line(
+                ("def", opp_name, my_name, move_name),
+                _damage_deps(opp_spec, my_spec, m_info, field_spec, None),
+                defense_line,
+            )
+
+    recomputed = cache.misses - misses_before
+    print(f"♻️ 시뮬레이션 리포트: 재계산 {recomputed}줄 (누적 적중 {cache.hits} / 계산 {cache.misses})")
+    return report, {"my_real_speed": speed_res['my_final_speed'], "recomputed": recomputed}
 
 # -------------------------------------------------------------------------
 # [Main API] 통합 분석 함수
 # -------------------------------------------------------------------------
-def analyze_battle_turn(user_input, opp_moved_first=False):
-    """
-    1. 파싱 및 상태 업데이트 (자동 계산 포함)
-    2. 시뮬레이션 재실행
-    3. AI 조언 생성
-    """
-    
-    # 1. 상태 업데이트 (LLM Parser)
-    success, update_msg, parser_tokens = parse_and_update_state(user_input)
-    
-    # 2. 시뮬레이션 (업데이트된 상태 기준)
-    sim_report, meta = run_battle_simulation_report()
-    
-    # 3. 역산 로직
-    inference_msg = ""
-    if current_battle.opp_active and not current_battle.opp_active.is_mine:
-        inferred = current_battle.opp_active.infer_speed_nature(
-            meta.get('my_real_speed', 0), opp_moved_first, current_battle.side_effects
-        )
-        if inferred: inference_msg = f"\n🕵️ **[정보 역산 성공]** {inferred}\n"
+# 턴 분석 방식 (세션마다 battle.advisor_mode로 선택)
+# - sequential : LLM 파서 -> 상태 반영/계산 -> LLM 조언 (2회 호출, 가장 정확)
+# - single_call: 현재 상태 + 입력을 한 번에 보내 {상태 변경, 조언}을 같이 받음 (1회 호출)
+# - speculative: 로컬 파서로 미리 반영한 상태로 조언을 먼저 시작하고, LLM 파서 결과가 같으면 그대로 사용
+ADVISOR_MODES = ("sequential", "single_call", "speculative")
+MODE_LABELS = {
+    "sequential": "기본 (파싱 → 조언)",
+    "single_call": "단일 호출 (파싱+조언)",
+    "speculative": "추측 조언 (로컬 파싱 선반영)",
+}
+
+LLM_WORKERS = 4
+_LLM_POOL = None
+
+
+def _get_llm_pool():
+    global _LLM_POOL
+    if _LLM_POOL is None:
+        _LLM_POOL = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+    return _LLM_POOL
+
+
+# ---------------------------------------------------------
+# [백그라운드 탐색] 턴 경로에서 기다리지 않도록 LLM 호출과 동시에 풀에서 실행
+# - 모델(BattleModel)은 호출 시점 상태로 바로 만들고, 탐색/롤아웃만 풀에서 진행
+# - 조언 프롬프트를 만들 때 SEARCH_WAIT 안에 끝난 결과만 넣음 (늦으면 이번 턴은 생략)
+# ---------------------------------------------------------
+SEARCH_DEADLINE = 0.4   # 초 (반복 심화 마감, 트리를 다 보면 더 일찍 끝남)
+SEARCH_WAIT = 0.6       # 초 (조언 직전에 탐색 결과를 기다리는 최대 시간)
+
+
+def _search_job(model):
+    """ [풀 작업] 탐색 + 승률 롤아웃 -> 프롬프트용 보고서 """
+    with telemetry.span("calc_batch", kind="search"):
+        report = format_search_report(search_actions(None, deadline=SEARCH_DEADLINE, model=model))
+    with telemetry.span("calc_batch", kind="win_rollout"):
+        report += format_win_report(estimate_win_probability(None, model=model), model.selected) + "\n"
+    return report
+
+
+def start_search(battle):
+    """ 현재 상태로 탐색을 백그라운드에서 시작. Returns: Future (필드 포켓몬이 없거나 실패하면 None) """
+    try:
+        with telemetry.span("calc_batch", kind="model"):
+            model = BattleModel.from_battle(battle)
+    except Exception as e:
+        print(f"⚠️ 탐색 모델 생성 실패: {e}")
+        return None
+    if model is None:
+        return None
+    return _get_llm_pool().submit(_search_job, model)
 
-    # 4. 최종 프롬프트 (Advisor)
-    state_text = current_battle.get_state_report()
-    opp_info_text = current_battle.opp_active.get_summary_text() if current_battle.opp_active else ""
 
-    template = """
+def collect_search(future, timeout=SEARCH_WAIT):
+    """ 제때 끝난 탐색 결과만 반환 (늦거나 실패하면 빈 문자열. 늦은 작업은 뒤에서 마감까지 돌고 버려짐) """
+    if future is None:
+        return ""
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
+        print("⏳ 탐색이 늦어 이번 조언에서는 제외")
+    except Exception as e:
+        print(f"⚠️ 탐색 실패: {e}")
+    return ""
+
+
+# ---------------------------------------------------------
+# [프롬프트 구성] 고정 앞부분(매치 동안 안 바뀜) + 턴별 압축 상태
+# - Gemini는 앞부분이 같은 요청의 입력 토큰을 캐시에서 읽음 (usage의 cache_read -> cached_tokens)
+# - 그래서 내 파티/상대 엔트리/표기법/규칙을 항상 같은 바이트로 맨 앞에 두고,
+#   매 턴 바뀌는 상태는 get_compact_report()의 짧은 고정 형식으로 맨 뒤에 붙임
+# ---------------------------------------------------------
+STATE_LEGEND = """
+    [상태 표기법]
+    - T=턴, W=날씨, F=필드, TR=트릭룸(1/0)
+    - ME/OP = 내/상대 필드 포켓몬: 이름 HP(%) 상태이상 R[랭크 변화] V[휘발성 상태]
+    - BENCH[이름:HP] = 내 대기 포켓몬, SIDE[...] = 벽/순풍 등
+    - I:도구 (!=확정, ?=미확인), M[...] = 상대가 실제로 쓴 기술
+    - OP_PARTY seen[이름:HP, X=기절] = 공개된 상대 대기, unknown = 아직 안 나온 수
+"""
+
+
+def static_context(battle):
+    """ 매치 동안 바뀌지 않는 프롬프트 앞부분 (내 파티 + 상대 엔트리 요약 + 표기법). 같은 입력이면 같은 문자열 """
+    key = (id(battle.party), tuple(battle.party.team), tuple(battle.opp_full_roster))
+    cached = battle.caches.get("static_context")
+    hit = cached is not None and cached[0] == key
+    telemetry.cache_event("static_context", hit)
+    if hit:
+        return cached[1]
+    opp_report = get_opponent_party_report(battle.opp_full_roster) if battle.opp_full_roster else ""
+    text = f"{format_my_party_info(battle.party)}\n{opp_report}\n{STATE_LEGEND}"
+    battle.caches["static_context"] = (key, text)
+    return text
+
+
+ADVISOR_TEMPLATE = """{static_context}
+    ---
     당신은 포켓몬 배틀 AI 코치입니다.
     사용자의 입력에 따라 **상태가 이미 업데이트**되었습니다. 
     현재의 상태와 계산 결과를 바탕으로 **다음 행동**을 지시하세요.
 
-    ---
-    [🔄 업데이트 결과]
-    {update_msg}
-    
-    {state_text}
-    [상대 상세 정보]
-    {opp_info_text}
-    ---
-    {sim_report}
-    {inference_msg}
-    ---
-    [사용자 입력]
-    "{user_input}"
-
     [지시사항]
     1. **상태 변화 인지**: HP 감소, 랭크 변화, 상태이상 등을 확인하고 전략을 수정하세요.
     2. **공격 체크**: 공격 시뮬레이션에서 1타가 나면 공격을 우선시하세요.
     3. **방어 체크**: 방어 시뮬레이션에서 내가 위험하고 후공이라면, 교체나 방어를 고려하세요.
+    4. **탐색 결과 우선**: 추천 행동은 [탐색 결과] 1순위를 기본으로 하고, 그 행동이 좋은 이유를 계산 결과로 설명하세요.
+       다른 행동을 고른다면 탐색이 반영하지 못한 요소(변화기, 특성 등)를 근거로 밝히고, 없는 수치를 지어내지 마세요.
 
     [답변 양식]
     - 💡 **추천 행동**: [기술명] or [교체]
     - 📊 **근거**: (변경된 상태와 계산 결과를 인용하여 설명)
+
+    === 이번 턴 ===
+    [🔄 업데이트 결과] {update_msg}
+    [상태]
+    {state_code}
+    [상대 상세 정보] {opp_info_text}
+    {sim_report}
+    {search_report}
+    {inference_msg}
+    [사용자 입력] "{user_input}"
     """
+
+# 단일 호출: 파서 규칙 + 코치 지시를 한 프롬프트에 넣고 JSON 하나로 받음
+SINGLE_CALL_TEMPLATE = """{static_context}
+    ---
+    당신은 포켓몬 배틀 로그 파서이자 AI 코치입니다.
+    아래 상태는 **사용자 입력이 반영되기 전**입니다. 입력으로 바뀔 상태를 JSON으로 추출하고,
+    바뀐 뒤의 상황을 기준으로 **다음 행동**을 조언하세요.
+""" + PARSER_RULES + """
+    [조언 지시사항]
+    1. 입력으로 교체/HP 변화가 생기면 위 계산 결과 중 바뀐 대면은 참고만 하고, 수치를 지어내지 마세요.
+    2. 1타가 나면 공격, 내가 위험하고 후공이면 교체나 방어를 고려하세요. 기본은 [탐색 결과] 1순위입니다.
+
+    [출력 형식] 다른 말 없이 JSON 객체 하나만 출력하세요.
+    {{
+        "update": """ + PARSER_SCHEMA + """,
+        "advice": "- 💡 **추천 행동**: ...\\n- 📊 **근거**: ..."
+    }}
+
+    === 이번 턴 ===
+    [상태 (입력 반영 전)]
+    {state_code}
+    [상대 상세 정보] {opp_info_text}
+    {sim_report}
+    {search_report}
+    [사용자 입력] "{user_input}"
+    """
+
+
+def order_observable(parsed_data):
+    """ 이번 턴 양쪽이 모두 기술을 썼고 우선도가 같을 때만 행동 순서가 스피드 정보 (교체 턴 / 선공기는 제외) """
+    if not parsed_data or parsed_data.get("my_switch") or parsed_data.get("opp_switch"):
+        return False
+    my_move, opp_move = parsed_data.get("my_move_used"), parsed_data.get("opp_move_used")
+    if not my_move or not opp_move:
+        return False
+    return get_move_data(my_move).get("priority", 0) == get_move_data(opp_move).get("priority", 0)
+
+
+def observe_turn_order(battle, opp_moved_first, parsed_data, meta=None):
+    """
+    행동 순서 역산 (사후분포 갱신). opp_moved_first: None(모름) / True(상대 선공) / False(내가 선공)
+    모름이거나 순서가 스피드와 무관한 턴이면 관측하지 않음. Returns: 추론 메시지 또는 None
+    """
+    if opp_moved_first is None or not battle.opp_active or battle.opp_active.is_mine:
+        return None
+    if not order_observable(parsed_data):
+        return None
+    if meta is None:
+        _, meta = run_battle_simulation_report(battle)
+    return battle.observe_order(meta.get('my_real_speed', 0), opp_moved_first)
+
+
+def build_advisor_inputs(user_input, opp_moved_first, update_msg, battle, parsed_data=None, search=None):
+    """
+    조언 프롬프트 변수 (시뮬레이션 + 탐색 + 역산 + 상태 텍스트)
+    parsed_data: 이번 턴 반영 내용. 없으면 행동 순서 역산(사후분포 갱신)을 하지 않음
+    search: 이 상태로 미리 시작한 탐색(start_search). 없으면 지금 시작
+    """
+    if search is None:
+        search = start_search(battle)
+
+    # 2. 시뮬레이션 (업데이트된 상태 기준) - 그동안 탐색은 풀에서 진행
+    sim_report, meta = run_battle_simulation_report(battle)
     
-    prompt = PromptTemplate.from_template(template)
-    chain = prompt | llm
-    
+    # 2-1. 행동 탐색 (계산기 기반 Expectiminimax) -> LLM은 결과를 설명만 함
+    search_report = collect_search(search)
+
+    # 3. 역산 로직
+    inference_msg = ""
+    inferred = observe_turn_order(battle, opp_moved_first, parsed_data, meta)
+    if inferred: inference_msg = f"\n🕵️ **[정보 역산]** {inferred}\n"
+
+    # 4. 최종 프롬프트 변수 (Advisor): 고정 앞부분 + 압축 상태
+    return {
+        "static_context": static_context(battle),
+        "state_code": battle.get_compact_report(),
+        "opp_info_text": battle.opp_active.get_summary_text() if battle.opp_active else "",
+        "sim_report": sim_report,
+        "search_report": search_report,
+        "inference_msg": inference_msg,
+        "user_input": user_input,
+        "update_msg": update_msg
+    }
+
+
+def request_advice(variables, phases=None):
+    """ LLM 조언 호출. Returns: (조언 텍스트, 토큰) """
+    chain = PromptTemplate.from_template(ADVISOR_TEMPLATE) | llm
+    start = time.perf_counter()
     try:
-        res = chain.invoke({
-            "state_text": state_text,
-            "opp_info_text": opp_info_text,
-            "sim_report": sim_report,
-            "inference_msg": inference_msg,
-            "user_input": user_input,
-            "update_msg": update_msg
-        })
-
-        usage = res.usage_metadata
-
-        analyze_tokens = [
-            usage.get('input_tokens', 0),
-            usage.get('output_tokens', 0),
-            usage.get('total_tokens', 0)
-        ]
-
-        print(analyze_tokens)
-
-        return extract_clean_content(res), parser_tokens, analyze_tokens
+        res = chain.invoke(variables)
+        elapsed = time.perf_counter() - start
+        analyze_tokens = token_list(res)
+        _record_phase(phases, "advisor", elapsed, elapsed, analyze_tokens)
+        return extract_clean_content(res), analyze_tokens
     except Exception as e:
-        return f"Error: {e}"
\ No newline at end of file
+        return f"Error: {e}", no_tokens()
+
+
+def stream_advice(variables, phases=None):
+    """ LLM 조언 스트리밍. Returns: LLMStream (다 읽으면 phases['advisor']에 시간 기록) """
+    chain = PromptTemplate.from_template(ADVISOR_TEMPLATE) | llm
+    return LLMStream(chain, variables, phase="advisor",
+                     on_done=lambda s: _record_phase(phases, "advisor", s.ttft, s.latency))
+
+
+def _advise(variables, phases, stream):
+    """ stream이면 (LLMStream, [0,0,0]) / 아니면 (텍스트, 토큰) -> 스트림 토큰은 끝난 뒤 합산 """
+    if stream:
+        return stream_advice(variables, phases), no_tokens()
+    return request_advice(variables, phases)
+
+
+def _search_guess(user_input, battle):
+    """ 로컬 파서 결과를 반영한 복사본으로 탐색 시작 (화면이 읽는 원본은 그대로). Returns: (추측 업데이트, Future) """
+    guess = local_preparse(user_input, battle)
+    scratch = battle.fork()
+    apply_parsed_update(guess, user_input, scratch, commit=False)
+    return guess, start_search(scratch)
+
+
+def _run_sequential(user_input, opp_moved_first, battle, metric, stream=False):
+    phases = metric["phases"]
+    # 1. 상태 업데이트 (LLM Parser) - 기다리는 동안 로컬 파서 추측 상태로 탐색
+    guess, search = _search_guess(user_input, battle)
+    parsed_data, parser_tokens = request_parse(parser_vars(user_input, battle), phases)
+    update_msg = apply_parsed_update(parsed_data, user_input, battle) if parsed_data is not None else "파싱 오류 발생"
+    if parsed_data is None or not same_update(guess, parsed_data):
+        search = None   # 추측이 틀렸으면 실제 상태로 다시 탐색
+    # 2~4. 계산 + 조언
+    advice, analyze_tokens = _advise(
+        build_advisor_inputs(user_input, opp_moved_first, update_msg, battle, parsed_data, search), phases, stream
+    )
+    metric["llm_calls"] = 2
+    return advice, parser_tokens, analyze_tokens
+
+
+def _run_single_call(user_input, opp_moved_first, battle, metric, stream=False):
+    # 응답 전체가 JSON 하나라 스트리밍하지 않음 (stream이면 한 조각짜리 스트림으로 전달)
+    # 1. 반영 전 상태로 계산 (역산은 상태 반영 후에)
+    variables = build_advisor_inputs(user_input, opp_moved_first, "", battle)
+    chain = PromptTemplate.from_template(SINGLE_CALL_TEMPLATE) | llm
+    metric["llm_calls"] = 1
+
+    # 2. 한 번의 호출로 {update, advice}
+    tokens = no_tokens()
+    start = time.perf_counter()
+    try:
+        res = chain.invoke(variables)
+        elapsed = time.perf_counter() - start
+        tokens = token_list(res)
+        _record_phase(metric["phases"], "single_call", elapsed, elapsed, tokens)
+        text = extract_clean_content(res)
+        try:
+            result = _load_json(text)
+            parsed_data, advice = result.get("update") or {}, result.get("advice") or ""
+        except ValueError:
+            # JSON이 깨졌으면 조언 원문은 살리고 상태는 로컬 파서로 반영
+            print("⚠️ 단일 호출 JSON 파싱 실패 -> 로컬 파서 사용")
+            parsed_data, advice = local_preparse(user_input, battle), text
+    except Exception as e:
+        print(f"❌ 단일 호출 실패: {e}")
+        parsed_data, advice = local_preparse(user_input, battle), f"Error: {e}"
+
+    # 3. 상태 반영 -> 반영된 상태로 행동 순서 역산
+    update_msg = apply_parsed_update(parsed_data, user_input, battle)
+    inference_msg = ""
+    inferred = observe_turn_order(battle, opp_moved_first, parsed_data)
+    if inferred: inference_msg = f"\n\n🕵️ **[정보 역산]** {inferred}"
+    return f"{advice}\n\n*{update_msg}*{inference_msg}", no_tokens(), tokens
+
+
+def _run_speculative(user_input, opp_moved_first, battle, metric, stream=False):
+    pool = _get_llm_pool()
+    phases = metric["phases"]
+    # 1. LLM 파서는 백그라운드로
+    parse_future = pool.submit(request_parse, parser_vars(user_input, battle), phases)
+
+    # 2. 로컬 파서 결과를 반영한 복사본에서 조언 시작 (화면이 읽는 원본은 그대로)
+    guess = local_preparse(user_input, battle)
+    scratch = battle.fork()
+    guess_msg = apply_parsed_update(guess, user_input, scratch, commit=False)
+    guess_vars = build_advisor_inputs(user_input, opp_moved_first, guess_msg, scratch, guess)
+    guess_phases = {}
+    if stream:
+        guess_advice = stream_advice(guess_vars, guess_phases).prefetch(pool)
+    else:
+        guess_advice = pool.submit(request_advice, guess_vars, guess_phases)
+
+    # 3. LLM 파서 결과로 실제 반영 (실패하면 로컬 파서 결과를 그대로 사용)
+    parsed_data, parser_tokens = parse_future.result()
+    if parsed_data is None:
+        parsed_data = guess
+    update_msg = apply_parsed_update(parsed_data, user_input, battle)
+
+    # 4. 추측이 맞았으면 먼저 시작한 조언 사용, 틀렸으면 다시 요청 (먼저 쓴 토큰도 비용에 포함)
+    hit = same_update(guess, parsed_data)
+    metric["speculation"] = "hit" if hit else "miss"
+    if hit:
+        # 역산(사후분포 갱신)은 복사본에만 했으므로 실제 상태에 한 번 더 반영
+        observe_turn_order(battle, opp_moved_first, parsed_data)
+        metric["llm_calls"] = 2
+        if stream:
+            guess_advice.then(lambda s: _record_phase(phases, "advisor", s.ttft, s.latency))
+            return guess_advice, parser_tokens, no_tokens()
+        advice, analyze_tokens = guess_advice.result()
+        phases.update(guess_phases)
+        return advice, parser_tokens, analyze_tokens
+
+    print("🔁 추측 조언 폐기 (로컬 파싱과 LLM 파싱 결과가 다름)")
+    metric["llm_calls"] = 3
+    # 새 조언을 먼저 보내고, 버린 조언의 토큰은 그다음에 회수
+    advice, analyze_tokens = _advise(
+        build_advisor_inputs(user_input, opp_moved_first, update_msg, battle, parsed_data), phases, stream
+    )
+    if stream:
+        # 새 스트림이 끝날 때 회수 (그 전에 기다리면 첫 토큰이 늦어짐)
+        advice.then(lambda s: analyze_tokens.__setitem__(slice(None), guess_advice.result()[1]))
+        return advice, parser_tokens, analyze_tokens
+    _, wasted = guess_advice.result()
+    return advice, parser_tokens, _add_tokens(analyze_tokens, wasted)
+
+
+_MODE_RUNNERS = {
+    "sequential": _run_sequential,
+    "single_call": _run_single_call,
+    "speculative": _run_speculative,
+}
+
+
+@profiled("battle_turn")
+def analyze_battle_turn(user_input, opp_moved_first=None, battle=None, mode=None, stream=False):
+    """
+    1. 파싱 및 상태 업데이트 (자동 계산 포함)
+    2. 시뮬레이션 재실행
+    3. AI 조언 생성
+    battle: 세션별 BattleState (없으면 기본 current_battle)
+    opp_moved_first: 이번 턴 행동 순서 None(모름) / True(상대 선공) / False(내가 선공)
+    mode: ADVISOR_MODES 중 하나 (없으면 battle.advisor_mode)
+    stream: True면 조언을 LLMStream으로 반환 (조언 토큰 리스트와 턴 기록은 스트림을 다 읽은 뒤 채워짐)
+    Returns: (조언 텍스트 또는 LLMStream, 파서 토큰, 조언 토큰)
+    """
+    battle = battle or current_battle
+    mode = mode or battle.advisor_mode
+    if mode not in _MODE_RUNNERS:
+        print(f"⚠️ 알 수 없는 분석 모드 '{mode}' -> sequential")
+        mode = "sequential"
+    
+    # 0. 원본 입력 기록 (배틀 로그 재생용)
+    battle.record_input(user_input, opp_moved_first)
+
+    start = time.perf_counter()
+    metric = {"mode": mode, "turn": battle.turn_count, "llm_calls": 0, "speculation": None, "phases": {}}
+    advice, parser_tokens, analyze_tokens = _MODE_RUNNERS[mode](user_input, opp_moved_first, battle, metric, stream)
+
+    def finish(advice_tokens):
+        analyze_tokens[:] = _add_tokens(analyze_tokens, advice_tokens)
+        total = _add_tokens(parser_tokens, analyze_tokens)
+        metric.update(latency=time.perf_counter() - start, **dict(zip(TOKEN_KEYS, total)))
+        battle.turn_metrics.append(metric)
+        telemetry.observe("turn_seconds", metric["latency"], mode=mode)
+        telemetry.count("llm_calls", metric["llm_calls"], mode=mode)
+        if metric["speculation"]: telemetry.cache_event("speculation", metric["speculation"] == "hit")
+        print(f"⏱️ [{mode}] 턴 분석 {metric['latency']:.2f}초 / LLM {metric['llm_calls']}회 / 토큰 {total[2]} (캐시 입력 {total[3]})")
+
+    if not stream:
+        finish(no_tokens())
+        return advice, parser_tokens, analyze_tokens
+
+    if not isinstance(advice, LLMStream):
+        elapsed = time.perf_counter() - start
+        advice = LLMStream.from_text(advice, no_tokens(), phase=mode, latency=elapsed)
+    advice.then(lambda s: finish(list(s.tokens)))
+    return advice, parser_tokens, analyze_tokens
+
+
+def _mean_ttft(rows):
+    """ 사용자가 조언 첫 글자를 보기까지 걸린 시간 (턴 시작 기준 = 턴 지연 - 조언 단계 중 첫 토큰 이후 시간) """
+    values = []
+    for m in rows:
+        phase = m["phases"].get("advisor") or m["phases"].get("single_call")
+        if phase and phase["ttft"] is not None:
+            values.append(m["latency"] - (phase["latency"] - phase["ttft"]))
+    return sum(values) / len(values) if values else None
+
+
+def summarize_turn_metrics(battle=None):
+    """
+    모드별 평균 지연/토큰 비교
+    Returns: {mode: {"turns", "avg_latency", "avg_tokens", "avg_input_tokens", "avg_cached_tokens", "avg_calls", "avg_ttft", "hit_rate"}}
+    """
+    battle = battle or current_battle
+    summary = {}
+    for mode in ADVISOR_MODES:
+        rows = [m for m in battle.turn_metrics if m["mode"] == mode]
+        if not rows: continue
+        n = len(rows)
+        specs = [m["speculation"] for m in rows if m["speculation"]]
+        summary[mode] = {
+            "turns": n,
+            "avg_latency": sum(m["latency"] for m in rows) / n,
+            "avg_tokens": sum(m["total_tokens"] for m in rows) / n,
+            "avg_input_tokens": sum(m["input_tokens"] for m in rows) / n,
+            "avg_cached_tokens": sum(m["cached_tokens"] for m in rows) / n,
+            "avg_calls": sum(m["llm_calls"] for m in rows) / n,
+            "avg_ttft": _mean_ttft(rows),
+            "hit_rate": specs.count("hit") / len(specs) if specs else None,
+        }
+    return summary
@@ -0,0 +1,283 @@
+import re
+import threading
+from collections.abc import Mapping
+from enum import IntEnum
+
+# =========================================================
+# [배틀 상태 코드표]
+# BattlePokemon을 작게 유지하기 위한 고정 인덱스/비트/열거형 정의
+# =========================================================
+
+# --- 랭크: 고정 순서 배열 인덱스 ---
+RANK_KEYS = ('atk', 'def', 'spa', 'spd', 'spe')
+RANK_INDEX = {k: i for i, k in enumerate(RANK_KEYS)}
+ZERO_RANKS = (0,) * len(RANK_KEYS)
+
+# --- 휘발성 상태: 비트마스크 ---
+VOLATILE_KEYS = ("taunt", "trapped", "confusion", "substitute", "encore", "leech_seed")
+VOLATILE_BIT = {k: 1 << i for i, k in enumerate(VOLATILE_KEYS)}
+
+# --- 정보 확정 여부: 비트마스크 ---
+CONFIRM_KEYS = ("item", "ability", "tera_type", "stats")
+CONFIRM_BIT = {k: 1 << i for i, k in enumerate(CONFIRM_KEYS)}
+CONFIRM_ALL = (1 << len(CONFIRM_KEYS)) - 1
+
+
+class Status(IntEnum):
+    """ 영구 상태이상 코드 """
+    NONE = 0
+    BURN = 1
+    PARALYSIS = 2
+    SLEEP = 3
+    POISON = 4
+    TOXIC = 5
+    FREEZE = 6
+
+
+# UI/계산기에 보여주는 이름 (기존 문자열 값과 동일)
+STATUS_NAMES = {
+    Status.NONE: None, Status.BURN: "Burn", Status.PARALYSIS: "Paralysis",
+    Status.SLEEP: "Sleep", Status.POISON: "Poison", Status.TOXIC: "Toxic",
+    Status.FREEZE: "Freeze",
+}
+
+_STATUS_ALIASES = {
+    "burn": Status.BURN, "brn": Status.BURN, "화상": Status.BURN,
+    "paralysis": Status.PARALYSIS, "par": Status.PARALYSIS, "마비": Status.PARALYSIS,
+    "sleep": Status.SLEEP, "slp": Status.SLEEP, "잠듦": Status.SLEEP,
+    "poison": Status.POISON, "psn": Status.POISON, "독": Status.POISON,
+    "toxic": Status.TOXIC, "tox": Status.TOXIC, "맹독": Status.TOXIC,
+    "freeze": Status.FREEZE, "frz": Status.FREEZE, "얼음": Status.FREEZE,
+}
+
+
+def status_code(value):
+    """ 'Burn' / 'brn' / '화상' / Status / None -> Status (모르는 값은 NONE) """
+    if value is None:
+        return Status.NONE
+    if isinstance(value, int):
+        return Status(value)
+    return _STATUS_ALIASES.get(str(value).strip().lower(), Status.NONE)
+
+
+# ---------------------------------------------------------
+# [이름 인터닝] 표시 이름 / Showdown id / PokeAPI slug / 별칭 -> 작은 정수 ID (프로세스 내 공유)
+# - 'Flutter Mane' / 'flutter-mane' / 'fluttermane' / '날개치는머리' -> 같은 ID
+# - 정규화는 처음 보는 문자열 한 번만 (이후엔 원문 문자열 dict 조회 한 번)
+# - 캐시/테이블은 이 ID를 키로 사용, 화면/프롬프트에는 name(), PokeAPI 주소에는 slug()
+# - slug()는 표시 이름에서 만들므로 id('stealthrock')만 아는 경우엔 add_slug()로 실제 slug를 알려줘야 함
+# ---------------------------------------------------------
+
+_ID_STRIP = re.compile(r"[^0-9a-z가-힣]")
+_SLUG_STRIP = re.compile(r"[^0-9a-z\-]")
+
+
+def to_id(name):
+    """ 'Flutter Mane' / 'Flutter-Mane' / 'choicescarf' -> Showdown id (한글 별칭은 글자만 남김) """
+    if name is None: return None
+    return _ID_STRIP.sub("", str(name).lower())
+
+
+def to_slug(name):
+    """ PokeAPI 주소용: 'Flutter Mane' -> 'flutter-mane', 'Mr. Mime' -> 'mr-mime', "King's Shield" -> 'kings-shield' """
+    return _SLUG_STRIP.sub("", str(name).strip().lower().replace(" ", "-"))
+
+
+class NameTable:
+    """
+    이름 <-> 정수 ID. 0은 '없음(None)'
+    표시 이름은 처음 등록된 것. 단, 소문자 id/slug 형태로 먼저 들어왔으면 나중에 온 표기 이름으로 교체
+    """
+    def __init__(self):
+        self._ids = {None: 0}       # 원문 문자열 -> ID (정규화 결과 메모)
+        self._by_key = {}           # Showdown id / 별칭 키 -> ID
+        self._names = [None]        # ID -> 표시 이름
+        self._keys = [None]         # ID -> Showdown id
+        self._aliases = [()]        # ID -> 그 ID로 가는 모든 키 (id + 별칭)
+        self._slugs = {}            # Showdown id -> 외부 slug (PokeAPI 목록 등 원본에서 받은 것)
+        self._lock = threading.Lock()   # 백그라운드 스레드에서 동시에 등록될 수 있음
+
+    def intern(self, name):
+        i = self._ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(name)
+                if i is None:
+                    i = self._intern_locked(name)
+        return i
+
+    def _intern_locked(self, name):
+        key = to_id(name)
+        i = self._by_key.get(key)
+        if i is None:
+            i = len(self._names)
+            self._names.append(name)
+            self._keys.append(key)
+            self._aliases.append((key,))
+            self._by_key[key] = i
+        elif self._names[i] == self._names[i].lower() and name != name.lower():
+            self._names[i] = name
+        self._ids[name] = i
+        return i
+
+    def id_of(self, name):
+        """ 등록 없이 조회만. 모르는 이름이면 None """
+        i = self._ids.get(name)
+        if i is None and name is not None:
+            i = self._by_key.get(to_id(name))
+        return i
+
+    def register(self, name):
+        """ 데이터 원본(Smogon 통계 등)의 표기를 표시 이름으로 고정. 데이터를 읽을 때 호출 """
+        with self._lock:
+            i = self._intern_locked(name)
+            self._names[i] = name
+        return i
+
+    def add_alias(self, alias, name):
+        """ 별칭(한글 이름, 폼 약칭 등)을 name과 같은 ID로 """
+        with self._lock:
+            i = self._ids.get(name)
+            if i is None: i = self._intern_locked(name)
+            key = to_id(alias)
+            if key not in self._by_key:
+                self._by_key[key] = i
+                self._aliases[i] += (key,)
+        return i
+
+    def name(self, i):
+        return self._names[i]
+
+    def key(self, i):
+        """ Showdown id ('fluttermane') """
+        return self._keys[i]
+
+    def add_slug(self, slug):
+        """ 원본 slug 등록 ('stealth-rock' -> id 'stealthrock'). 표시 이름보다 우선 """
+        self._slugs[to_id(slug)] = slug
+
+    def slug(self, i):
+        """ PokeAPI slug ('flutter-mane'). 등록된 slug가 없으면 표시 이름에서 만듦 (id로만 들어온 이름은 틀릴 수 있음) """
+        if not i:
+            return None
+        return self._slugs.get(self._keys[i]) or to_slug(self._names[i])
+
+    def canonical(self, name):
+        """ 아는 이름이면 표시 이름으로, 모르면 그대로 (등록하지 않음) """
+        i = self.id_of(name)
+        return name if i is None else self._names[i]
+
+    def keys_of(self, name):
+        """ name의 ID에 붙은 모든 키 (id + 별칭). 문장 속 이름 찾기용 """
+        i = self.id_of(name)
+        return (to_id(name),) if i is None else self._aliases[i]
+
+    def __len__(self):
+        return len(self._names) - 1
+
+
+SPECIES = NameTable()
+ITEMS = NameTable()
+ABILITIES = NameTable()
+TYPES = NameTable()
+MOVES = NameTable()
+
+# --- 별칭: 한국어 이름 / 자주 쓰는 약칭 -> Smogon 표기 (확실한 것만) ---
+SPECIES_ALIASES = {
+    "Flutter Mane": ("날개치는머리", "날치머"),
+    "Ting-Lu": ("딩루",),
+    "Chien-Pao": ("파오젠",),
+    "Chi-Yu": ("위유이",),
+    "Wo-Chien": ("총지엔",),
+    "Koraidon": ("코라이돈",),
+    "Miraidon": ("미라이돈",),
+    "Dragonite": ("망나뇽",),
+    "Urshifu": ("우라오스", "악라오스"),
+    "Urshifu-Rapid-Strike": ("물라오스", "Urshifu-R", "Urshifu-Rapid"),
+    "Landorus-Therian": ("Landorus-T", "Lando-T"),
+    "Calyrex-Shadow": ("흑마렉스",),
+    "Calyrex-Ice": ("백마렉스",),
+    "Roaring Moon": ("고동치는달",),
+    "Iron Hands": ("무쇠손",),
+    "Iron Bundle": ("무쇠보따리",),
+    "Iron Treads": ("무쇠바퀴",),
+    "Glimmora": ("키라플로르",),
+    "Gholdengo": ("타부자고",),
+    "Kingambit": ("대도각참",),
+    "Garchomp": ("한카리아스",),
+    "Garganacl": ("콜로솔트",),
+    "Incineroar": ("어흥염",),
+    "Rillaboom": ("고릴타",),
+    "Amoonguss": ("뽀록나",),
+    "Arceus": ("아르세우스",),
+    "Gliscor": ("글라이온",),
+    "Lunala": ("루나아라",),
+    "Skeledirge": ("라우드본",),
+    "Ho-Oh": ("칠색조",),
+    "Dondozo": ("어써러셔",),
+    "Archaludon": ("브리두라스",),
+    "Breloom": ("버섯모",),
+    "Mimikyu": ("따라큐",),
+    "Kyogre": ("가이오가",),
+    "Clodsire": ("토오",),
+    "Porygon2": ("폴리곤2",),
+    "Eternatus": ("무한다이노",),
+    "Dugtrio": ("닥트리오",),
+    "Grimmsnarl": ("오롱털",),
+    "Terapagos": ("테라파고스",),
+    "Smeargle": ("루브도",),
+    "Ditto": ("메타몽",),
+    "Alomomola": ("맘복치",),
+    "Dachsbun": ("바우첼",),
+    "Hatterene": ("브리무음",),
+    "Sneasler": ("포푸니크",),
+}
+
+for _name, _aliases in SPECIES_ALIASES.items():
+    SPECIES.register(_name)
+    for _alias in _aliases:
+        SPECIES.add_alias(_alias, _name)
+
+# ---------------------------------------------------------
+# [dict 스타일 읽기 전용 뷰] UI/계산기 호환용
+# ---------------------------------------------------------
+
+class RanksView(Mapping):
+    """ 랭크 배열을 {'atk': 0, ...}처럼 보여줌 """
+    __slots__ = ("_values",)
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[RANK_INDEX[key]]
+
+    def __iter__(self):
+        return iter(RANK_KEYS)
+
+    def __len__(self):
+        return len(RANK_KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class BitsView(Mapping):
+    """ 비트마스크를 {'taunt': False, ...}처럼 보여줌 """
+    __slots__ = ("_mask", "_bits")
+
+    def __init__(self, mask, bits):
+        self._mask = mask
+        self._bits = bits
+
+    def __getitem__(self, key):
+        return bool(self._mask & self._bits[key])
+
+    def __iter__(self):
+        return iter(self._bits)
+
+    def __len__(self):
+        return len(self._bits)
+
+    def __repr__(self):
+        return repr(dict(self))
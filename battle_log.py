@@ -0,0 +1,270 @@
+import functools
+import json
+import os
+import sys
+import time
+import uuid
+from collections import namedtuple
+
+import telemetry
+from battle_snapshot import (
+    snapshot_to_dict, snapshot_from_dict, pokemon_to_dict, pokemon_from_dict, history_to_dict, history_from_dict
+)
+
+# =========================================================
+# [이벤트 소싱 배틀 로그]
+# - BattleState를 바꾸는 모든 호출을 타입이 있는 이벤트로 append-only 기록 (배틀당 .jsonl 1개)
+# - N개 이벤트마다 스냅샷 체크포인트 -> 재시작 시 체크포인트 + 이후 이벤트만 재생
+# =========================================================
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(current_dir, "battle_logs")
+CHECKPOINT_EVERY = 20
+
+# 이벤트 종류 -> BattleState 메서드 인자 이름 (재생 시 같은 메서드를 그대로 호출)
+EVENT_TYPES = {
+    "initialize_opponent": ("roster_list",),
+    "set_my_selection": ("selection_list",),
+    "set_active": ("side", "pokemon_name"),
+    "apply_hp": ("side", "amount"),
+    "end_turn": (),
+    "apply_llm_update": ("update_data",),
+    "record_input": ("user_input", "opp_moved_first"),
+    "observe_order": ("my_speed", "opp_moved_first"),
+    "observe_damage": ("side", "move_name", "percent"),
+    "commit": ("label",),
+    "undo": (),
+    "redo": (),
+    # 새로 등장한 상대 포켓몬의 초기 데이터 (재생 시 PokeAPI/Smogon 조회 생략용)
+    "spawn": ("pokemon",),
+    # 배틀 시작 상태 (내 파티 포함) - 로그의 첫 이벤트
+    "reset": ("snapshot",),
+}
+
+BattleEvent = namedtuple("BattleEvent", ["seq", "ts", "kind", "args"])
+
+
+def new_battle_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def _log_path(battle_id, log_dir=LOG_DIR):
+    return os.path.join(log_dir, f"{battle_id}.jsonl")
+
+
+def _checkpoint_path(battle_id, log_dir=LOG_DIR):
+    return os.path.join(log_dir, f"{battle_id}.ckpt.json")
+
+
+def exists(battle_id, log_dir=LOG_DIR):
+    return bool(battle_id) and os.path.exists(_log_path(battle_id, log_dir))
+
+
+class BattleLog:
+    """ 배틀 하나의 append-only 이벤트 로그 """
+    def __init__(self, battle_id=None, log_dir=LOG_DIR, checkpoint_every=CHECKPOINT_EVERY):
+        self.battle_id = battle_id or new_battle_id()
+        self.log_dir = log_dir
+        self.checkpoint_every = checkpoint_every
+        self.path = _log_path(self.battle_id, log_dir)
+        self.seq = 0
+        self._file = None
+        self._since_checkpoint = 0
+
+        os.makedirs(log_dir, exist_ok=True)
+        if os.path.exists(self.path):
+            # 기존 로그 이어 쓰기: 마지막 seq부터
+            for event in read_events(self.path):
+                self.seq = event.seq
+
+    @telemetry.timed("io", kind="battle_log")
+    def append(self, kind, args):
+        if kind not in EVENT_TYPES:
+            raise ValueError(f"알 수 없는 이벤트 종류: {kind}")
+        self.seq += 1
+        record = {"seq": self.seq, "ts": round(time.time(), 3), "kind": kind, "args": args}
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._since_checkpoint += 1
+        return self.seq
+
+    @telemetry.timed("io", kind="checkpoint")
+    def checkpoint(self, state):
+        """
+        현재 상태 + 되돌리기 기록을 원자적으로 저장 (이 seq 이전 이벤트는 재생 불필요)
+        턴 중간에 저장돼도 이후 undo/redo 이벤트가 전체 재생과 같은 기록 위에서 재생됨
+        """
+        payload = {"seq": self.seq, "history": history_to_dict(state.snapshot(), state.history)}
+        path = _checkpoint_path(self.battle_id, self.log_dir)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._since_checkpoint = 0
+
+    def maybe_checkpoint(self, state):
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint(state)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_events(path, after_seq=0):
+    """ 로그 파일에서 이벤트를 순서대로 읽기 (마지막 줄이 깨져 있으면 거기서 멈춤) """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record["seq"] <= after_seq:
+                continue
+            yield BattleEvent(record["seq"], record["ts"], record["kind"], record["args"])
+
+# ---------------------------------------------------------
+# [기록] BattleState 메서드 데코레이터
+# ---------------------------------------------------------
+
+def logged(method):
+    """
+    BattleState 메서드 호출을 이벤트로 기록합니다.
+    - 가장 바깥 호출만 기록 (set_my_selection 안의 set_active 등은 재생 시 자동으로 다시 일어남)
+    - 메서드가 예외 없이 끝난 뒤에만 기록
+    """
+    kind = method.__name__
+    arg_names = EVENT_TYPES[kind]
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        log = getattr(self, "log", None)
+        if log is None or self._log_depth:
+            return method(self, *args, **kwargs)
+
+        self._log_depth += 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            self._log_depth -= 1
+
+        values = dict(zip(arg_names, args))
+        values.update(kwargs)
+        log.append(kind, values)
+        log.maybe_checkpoint(self)
+        return result
+    return wrapper
+
+
+def log_spawn(state, pokemon):
+    """ 새로 만든 상대 포켓몬의 초기 스냅샷 기록 """
+    log = getattr(state, "log", None)
+    if log is not None:
+        log.append("spawn", {"pokemon": pokemon_to_dict(pokemon.snapshot())})
+
+# ---------------------------------------------------------
+# [재생 / 복구]
+# ---------------------------------------------------------
+
+def apply_event(state, event):
+    """ 이벤트 하나를 상태에 적용 (로그 기록 없이) """
+    if event.kind == "spawn":
+        snap = pokemon_from_dict(event.args["pokemon"])
+        state._spawn_cache[snap.name] = snap
+        return
+    if event.kind == "reset":
+        state.restore(snapshot_from_dict(event.args["snapshot"]))
+        state.history.clear()
+        state.commit("start")
+        return
+    getattr(state, event.kind)(**event.args)
+
+
+def replay(battle_id, state, log_dir=LOG_DIR, use_checkpoint=True):
+    """
+    체크포인트 복원 후 나머지 이벤트를 재생합니다.
+    Returns: {"events", "elapsed", "us_per_event", "from_seq"}
+    """
+    saved_log, state.log = getattr(state, "log", None), None
+    # 재생 중에는 spawn 이벤트에 초기 데이터가 있으므로 백그라운드 프리웜 불필요
+    saved_prewarm, state.prewarm_enabled = state.prewarm_enabled, False
+    start = time.perf_counter()
+    from_seq = 0
+
+    ckpt_path = _checkpoint_path(battle_id, log_dir)
+    if use_checkpoint and os.path.exists(ckpt_path):
+        with open(ckpt_path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if "history" in payload:
+            current, history = history_from_dict(payload["history"])
+            state.restore(current)
+            state.history.undo_stack, state.history.redo_stack = history.undo_stack, history.redo_stack
+        else:
+            # 예전 형식 (현재 상태만): 되돌리기 기록은 체크포인트부터 시작
+            state.restore(snapshot_from_dict(payload["snapshot"]))
+            state.history.clear()
+            state.commit("checkpoint")
+        from_seq = payload["seq"]
+
+    count = 0
+    try:
+        for event in read_events(_log_path(battle_id, log_dir), after_seq=from_seq):
+            apply_event(state, event)
+            count += 1
+    finally:
+        state.log = saved_log
+        state.prewarm_enabled = saved_prewarm
+
+    elapsed = time.perf_counter() - start
+    return {
+        "events": count,
+        "elapsed": elapsed,
+        "us_per_event": elapsed / count * 1e6 if count else 0.0,
+        "from_seq": from_seq,
+    }
+
+
+def _detach(state):
+    """ 연결된 로그를 닫고 떼어냄 (파일 핸들 정리, 이후 변경이 옛 로그에 기록되지 않게) """
+    if state.log is not None:
+        state.log.close()
+        state.log = None
+
+
+def start(state, battle_id=None, log_dir=LOG_DIR):
+    """ 새 배틀 로그 시작: 첫 이벤트로 시작 상태(내 파티 포함)를 기록 (이전 로그는 닫음) """
+    _detach(state)
+    log = BattleLog(battle_id, log_dir)
+    log.append("reset", {"snapshot": snapshot_to_dict(state.snapshot())})
+    # 재생 때 reset 이벤트와 같은 되돌리기 기록으로 시작 (실시간/재생 기록이 어긋나지 않게)
+    state.history.clear()
+    state.commit("start")
+    state.log = log
+    return log
+
+
+def recover(battle_id, state, log_dir=LOG_DIR):
+    """ Streamlit 재시작 후 같은 battle_id의 상태를 복구하고 이어서 기록 """
+    _detach(state)
+    stats = replay(battle_id, state, log_dir)
+    state.log = BattleLog(battle_id, log_dir)
+    print(f"♻️ 배틀 복구 완료 [{battle_id}]: 이벤트 {stats['events']}개 재생 "
+          f"({stats['us_per_event']:.1f}µs/event, 체크포인트 seq {stats['from_seq']})")
+    return stats
+
+
+if __name__ == "__main__":
+    # 재생 벤치마크: python battle_log.py <battle_id>
+    from battle_state import BattleState
+
+    if len(sys.argv) < 2:
+        print("사용법: python battle_log.py <battle_id>")
+        sys.exit(1)
+
+    for use_ckpt in (False, True):
+        stats = replay(sys.argv[1], BattleState(), use_checkpoint=use_ckpt)
+        label = "체크포인트 사용" if use_ckpt else "전체 재생"
+        print(f"[{label}] 이벤트 {stats['events']}개 | {stats['elapsed']*1000:.2f}ms | {stats['us_per_event']:.1f}µs/event")
@@ -0,0 +1,406 @@
+import math
+import multiprocessing
+import os
+import time
+from collections import namedtuple, defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# --- [모듈 임포트] ---
+# (프로세스 풀 자식에서도 import 되므로 battle_state/rag_retriever 같은 무거운 모듈은 가져오지 않음)
+from Calculator.calculator import calculate_damage_math
+from Calculator.modifiers import compile_damage
+from Calculator.speed_checker import calculate_dynamic_speed
+from Calculator.move_loader import get_move_data
+from belief_tracker import calc_name
+from profiler import profiled
+
+# =========================================================
+# [행동 추천 탐색 엔진] Expectiminimax
+# - BattleState에서 작은 불변 모델(BattleModel)을 뽑아 데미지/스피드를 미리 계산
+# - 내 행동(기술/교체) -> 상대 행동(최악 가정) -> 확률 노드(난수/급소/명중) 순으로 여러 턴 전개
+# - 반복 심화 + 마감 시간(anytime) + 전치표(transposition table)
+# - 루트 행동별로 프로세스 풀에 나눠서 계산
+# =========================================================
+
+DEFAULT_DEADLINE = 1.5   # 초
+MAX_DEPTH = 4            # 턴 수
+CRIT_CHANCE = 1 / 24
+CRIT_MULT = 1.5
+WIN_VALUE = 10.0         # 승패 확정 노드 점수 (HP 비율 합보다 충분히 큼)
+HP_ROUND = 3             # 전치표 적중률을 위해 HP 비율을 반올림하는 자릿수
+MAX_MOVES = 4
+PICK_SIZE = 3            # 선출 수 (3:3)
+
+SearchState = namedtuple("SearchState", ["my_active", "opp_active", "my_hp", "opp_hp"])
+SearchResult = namedtuple("SearchResult", ["action", "label", "value", "depth", "nodes"])
+
+
+class _Deadline(Exception):
+    pass
+
+# ---------------------------------------------------------
+# [1] 모델: BattleState -> 미리 계산된 표
+# ---------------------------------------------------------
+
+class BattleModel:
+    """
+    탐색/롤아웃용 불변 배틀 모델 (피클 가능 -> 프로세스 풀로 전달)
+    names[side]: 포켓몬 이름 튜플 / moves[side][i]: ((기술명, 우선도), ...)
+    speed[side][i]: 최종 스피드 / table[(side, 공격자, 방어자, 기술)]: ((확률, 피해 비율), ...)
+    damage[같은 키]: (명중률, 최소 피해 비율, 최대 피해 비율, 급소 피해 비율) - 롤아웃용 원본
+    랭크는 루트 시점 필드 포켓몬의 값으로 고정 (교체 후 초기화는 반영하지 않음)
+    selected: 내 선출이 확정됐는지 (아니면 필드 포켓몬 + 파티 앞쪽으로 PICK_SIZE마리를 임시로 씀)
+    """
+    def __init__(self, names, moves, speed, damage, root, unknown_opp=0, trick_room=False, selected=True):
+        self.names = names
+        self.moves = moves
+        self.speed = speed
+        self.damage = damage
+        self.table = {key: _outcomes(*raw) for key, raw in damage.items()}
+        self.root = root
+        self.unknown_opp = unknown_opp
+        self.trick_room = trick_room
+        self.selected = selected
+
+    @classmethod
+    def from_battle(cls, battle):
+        """ 현재 배틀 상태에서 모델 생성 (필드 포켓몬이 없으면 None) """
+        if not battle.my_active or not battle.opp_active:
+            return None
+
+        selected = bool(battle.my_entry_selection)
+        my_names = [n for n in battle.my_entry_selection if n in battle.my_party_status]
+        if battle.my_active.name not in my_names:
+            my_names.insert(0, battle.my_active.name)
+        if not selected:
+            # 선출 미정: 파티 6마리를 다 넣으면 6:3 탐색이 되므로 앞쪽 생존 포켓몬으로 3마리만
+            bench = [n for n, p in battle.my_party_status.items() if n not in my_names and not p.is_fainted]
+            my_names += bench[:PICK_SIZE - len(my_names)]
+        opp_names = list(battle.opp_revealed_party)
+
+        pokes = {
+            "me": [battle.my_party_status[n] for n in my_names],
+            "opp": [battle.opp_revealed_party[n] for n in opp_names],
+        }
+        specs = {side: [_spec_of(p, p is battle.my_active or p is battle.opp_active) for p in group]
+                 for side, group in pokes.items()}
+        moves = {side: [_damaging_moves(p) for p in group] for side, group in pokes.items()}
+        screens = {"me": battle.side_effects['me'], "opp": battle.side_effects['opp']}
+        field = {'weather': battle.global_effects['weather'], 'terrain': battle.global_effects['terrain']}
+
+        speed = {}
+        for side, group in specs.items():
+            side_field = dict(field, tailwind=battle.side_effects[side]['tailwind'])
+            speed[side] = tuple(
+                calculate_dynamic_speed(s['stats'], s['ranks'], s['item'], s['status'], s['ability'], side_field)
+                for s in group
+            )
+
+        damage = {}
+        for side, other in (("me", "opp"), ("opp", "me")):
+            for i, att in enumerate(specs[side]):
+                for j, dfn in enumerate(specs[other]):
+                    dfn = dict(dfn, screens=screens[other])
+                    chain = compile_damage(att, dfn, field)   # 대면마다 한 번, 기술/급소 계산에 공유
+                    for m, move_spec in enumerate(moves[side][i]):
+                        damage[(side, i, j, m)] = _damage_fractions(att, dfn, move_spec, field, chain)
+
+        root = SearchState(
+            my_names.index(battle.my_active.name), opp_names.index(battle.opp_active.name),
+            tuple(_hp_of(p) for p in pokes["me"]), tuple(_hp_of(p) for p in pokes["opp"]),
+        )
+        return cls(
+            {"me": tuple(my_names), "opp": tuple(opp_names)},
+            {side: tuple(tuple((ms['name'], ms.get('priority', 0)) for ms in group) for group in moves[side])
+             for side in moves},
+            speed, damage, root,
+            unknown_opp=max(0, PICK_SIZE - len(opp_names)),   # 상대도 3마리 선출
+            trick_room=bool(battle.global_effects['trick_room']),
+            selected=selected,
+        )
+
+    # --- [규칙] ---
+    def actions(self, state, side):
+        """ ('move', 기술 번호) / ('switch', 파티 번호) """
+        active = state.my_active if side == "me" else state.opp_active
+        hp = state.my_hp if side == "me" else state.opp_hp
+        acts = [("move", m) for m in range(len(self.moves[side][active]))]
+        acts += [("switch", j) for j, h in enumerate(hp) if j != active and h > 0]
+        return acts or [("pass", 0)]
+
+    def label(self, side, state, action):
+        kind, idx = action
+        if kind == "move":
+            active = state.my_active if side == "me" else state.opp_active
+            return self.moves[side][active][idx][0]
+        if kind == "switch":
+            return f"교체: {self.names[side][idx]}"
+        return "대기"
+
+    def first_mover_chances(self, state, my_move, opp_move):
+        """ [(확률, 먼저 움직이는 쪽)] 우선도 -> 스피드 (트릭룸 반전), 동속은 50:50 """
+        my_prio = self.moves["me"][state.my_active][my_move][1]
+        opp_prio = self.moves["opp"][state.opp_active][opp_move][1]
+        if my_prio != opp_prio:
+            return [(1.0, "me" if my_prio > opp_prio else "opp")]
+        my_spe = self.speed["me"][state.my_active]
+        opp_spe = self.speed["opp"][state.opp_active]
+        if my_spe == opp_spe:
+            return [(0.5, "me"), (0.5, "opp")]
+        me_first = (my_spe < opp_spe) if self.trick_room else (my_spe > opp_spe)
+        return [(1.0, "me" if me_first else "opp")]
+
+    def attack(self, state, side, move):
+        """ 공격 한 번의 결과 분포 [(확률, 다음 상태)] (공격자가 이미 쓰러졌으면 그대로) """
+        if side == "me":
+            att, dfn, att_hp, def_hp = state.my_active, state.opp_active, state.my_hp, state.opp_hp
+        else:
+            att, dfn, att_hp, def_hp = state.opp_active, state.my_active, state.opp_hp, state.my_hp
+        if att_hp[att] <= 0 or def_hp[dfn] <= 0:
+            return [(1.0, state)]
+
+        out = []
+        for p, frac in self.table[(side, att, dfn, move)]:
+            hp = list(def_hp)
+            hp[dfn] = round(max(0.0, hp[dfn] - frac), HP_ROUND)
+            nxt = state._replace(opp_hp=tuple(hp)) if side == "me" else state._replace(my_hp=tuple(hp))
+            out.append((p, nxt))
+        return out
+
+    def resolve(self, state, my_action, opp_action):
+        """ 한 턴 진행 -> {다음 상태: 확률} (같은 결과는 합침) """
+        if my_action[0] == "switch": state = state._replace(my_active=my_action[1])
+        if opp_action[0] == "switch": state = state._replace(opp_active=opp_action[1])
+
+        attacks = {}
+        if my_action[0] == "move": attacks["me"] = my_action[1]
+        if opp_action[0] == "move": attacks["opp"] = opp_action[1]
+
+        if len(attacks) == 2:
+            orders = [(p, (first, "opp" if first == "me" else "me"))
+                      for p, first in self.first_mover_chances(state, attacks["me"], attacks["opp"])]
+        else:
+            orders = [(1.0, tuple(attacks))]
+
+        result = defaultdict(float)
+        for p_order, order in orders:
+            dist = {state: p_order}
+            for side in order:
+                nxt = defaultdict(float)
+                for st, p in dist.items():
+                    for q, st2 in self.attack(st, side, attacks[side]):
+                        nxt[st2] += p * q
+                dist = nxt
+            for st, p in dist.items():
+                result[st] += p
+        return result
+
+    def evaluate(self, state):
+        """ 내 HP 비율 합 - 상대 HP 비율 합 (미확인 상대는 만피로 계산) """
+        mine = sum(state.my_hp)
+        theirs = sum(state.opp_hp) + self.unknown_opp
+        if mine <= 0: return -WIN_VALUE
+        if theirs <= 0: return WIN_VALUE
+        return mine - theirs
+
+
+def _hp_of(poke):
+    return 0.0 if poke.is_fainted else round(poke.current_hp_percent / 100, HP_ROUND)
+
+
+def _spec_of(poke, use_ranks):
+    """ 계산기 입력 스펙 (상대는 사후분포 기대 스탯 + 확률 50% 이상인 도구) """
+    info = poke.info
+    stats = info['stats']
+    item = info['item']
+    if poke.belief is not None and not poke.is_mine:
+        if not poke.confirmed['stats']:
+            stats = poke.belief.expected_stats()
+        if not poke.confirmed['item']:
+            name, p = poke.belief.marginal('item')[0]
+            item = calc_name(name) if p >= 0.5 else None
+    return {
+        'stats': stats or {'hp': 100, 'atk': 100, 'def': 100, 'spa': 100, 'spd': 100, 'spe': 100},
+        'ranks': dict(poke.ranks) if use_ranks else {},
+        'item': item, 'status': poke.status_condition, 'ability': info['ability'],
+        'types': [], 'is_terastal': False,
+    }
+
+
+def _damaging_moves(poke):
+    """ 확인된 기술 + (상대는) 예측 기술 중 위력 있는 기술 최대 4개 """
+    info = poke.info
+    names = info['moves'] if poke.is_mine else info['moves'] + info['predictions']['moves']
+    moves = []
+    for name in dict.fromkeys(names):
+        data = get_move_data(name)
+        if data.get('power', 0) > 0:
+            moves.append(data)
+        if len(moves) >= MAX_MOVES: break
+    return moves
+
+
+def _damage_fractions(att_spec, def_spec, move_spec, field, chain=None):
+    """ 계산기 결과 -> (명중률, 최소 피해/최대HP, 최대 피해/최대HP, 급소 피해/최대HP) """
+    hp = def_spec['stats']['hp']
+    lo, hi = map(int, calculate_damage_math(att_spec, def_spec, move_spec, field, chain)['damage_range'].split('~'))
+    crit = calculate_damage_math(att_spec, def_spec, dict(move_spec, is_crit=True), field, chain)['damage_range']
+    c_lo, c_hi = map(int, crit.split('~'))
+    crit_dmg = math.floor((c_lo + c_hi) / 2 * CRIT_MULT)
+    accuracy = move_spec.get('accuracy') or 100
+    return min(1.0, accuracy / 100), lo / hp, hi / hp, crit_dmg / hp
+
+
+def _outcomes(p_hit, lo, hi, crit):
+    """ 명중/난수(최소·최대)/급소를 확률 노드로 펼친 ((확률, 피해 비율), ...) """
+    merged = defaultdict(float)
+    merged[round(lo, HP_ROUND)] += p_hit * (1 - CRIT_CHANCE) / 2
+    merged[round(hi, HP_ROUND)] += p_hit * (1 - CRIT_CHANCE) / 2
+    merged[round(crit, HP_ROUND)] += p_hit * CRIT_CHANCE
+    if p_hit < 1: merged[0.0] += 1 - p_hit
+    return tuple((p, frac) for frac, p in merged.items() if p > 0)
+
+# ---------------------------------------------------------
+# [2] 탐색
+# ---------------------------------------------------------
+
+class _Searcher:
+    def __init__(self, model, deadline_ts):
+        self.model = model
+        self.deadline_ts = deadline_ts
+        self.tt = {}
+        self.nodes = 0
+        self.cut = False   # 깊이 제한으로 평가를 멈춘 노드가 있었는지 (없으면 더 깊이 봐도 결과가 같음)
+
+    def _check(self):
+        self.nodes += 1
+        if self.nodes % 256 == 0 and time.time() > self.deadline_ts:
+            raise _Deadline()
+
+    def value(self, state, depth):
+        model = self.model
+        # 쓰러진 필드 포켓몬 교체 (나는 최선, 상대는 나에게 최악인 포켓몬을 고름)
+        if state.my_hp[state.my_active] <= 0:
+            alive = [j for j, h in enumerate(state.my_hp) if h > 0]
+            if alive:
+                return max(self.value(state._replace(my_active=j), depth) for j in alive)
+        if state.opp_hp[state.opp_active] <= 0:
+            alive = [j for j, h in enumerate(state.opp_hp) if h > 0]
+            if alive:
+                return min(self.value(state._replace(opp_active=j), depth) for j in alive)
+
+        score = model.evaluate(state)
+        if abs(score) >= WIN_VALUE or state.opp_hp[state.opp_active] <= 0:
+            return score
+        if depth == 0:
+            self.cut = True
+            return score
+
+        key = (state, depth)
+        if key in self.tt:
+            return self.tt[key]
+        self._check()
+
+        best = -math.inf
+        for a in model.actions(state, "me"):
+            best = max(best, self.action_value(state, a, depth, best))
+        self.tt[key] = best
+        return best
+
+    def action_value(self, state, my_action, depth, alpha=-math.inf):
+        """ 내 행동 하나의 값 = 상대 행동 중 최소(기대값 기준). alpha 이하가 되면 중단 """
+        worst = math.inf
+        for b in self.model.actions(state, "opp"):
+            v = sum(p * self.value(st, depth - 1) for st, p in self.model.resolve(state, my_action, b).items())
+            worst = min(worst, v)
+            if worst <= alpha: break
+        return worst
+
+
+def _evaluate_root(model, action, depth, deadline_ts):
+    """ [프로세스 풀 작업] 루트 행동 하나를 depth 턴까지 평가 -> (값, 노드 수, 깊이 제한 여부). 시간 초과면 None """
+    searcher = _Searcher(model, deadline_ts)
+    try:
+        return searcher.action_value(model.root, action, depth), searcher.nodes, searcher.cut
+    except _Deadline:
+        return None
+
+
+_pool = None
+
+
+def _get_pool(workers):
+    """ 탐색용 프로세스 풀 (spawn: Streamlit 스레드와 섞여도 안전) """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+@profiled("search_actions")
+def search_actions(battle, deadline=DEFAULT_DEADLINE, max_depth=MAX_DEPTH, workers=None, model=None):
+    """
+    [행동 추천] 반복 심화 Expectiminimax.
+    마감 시간 안에 끝까지 계산한 가장 깊은 단계의 결과를 기대값 내림차순으로 반환합니다.
+    모든 수순이 승패 확정으로 끝나 더 깊이 볼 것이 없으면 마감 전에 멈춥니다.
+    workers: 프로세스 수 (1이면 현재 프로세스에서 순차 계산)
+    Returns: [SearchResult, ...] (모델을 만들 수 없으면 [])
+    """
+    model = model or BattleModel.from_battle(battle)
+    if model is None:
+        return []
+    workers = workers or min(4, os.cpu_count() or 1)
+    deadline_ts = time.time() + deadline
+    root_actions = model.actions(model.root, "me")
+
+    pool = None
+    if workers > 1 and len(root_actions) > 1:
+        try:
+            pool = _get_pool(workers)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 탐색 프로세스 풀 생성 실패, 순차 계산: {e}")
+
+    results = []
+    for depth in range(1, max_depth + 1):
+        values = _run_depth(model, root_actions, depth, deadline_ts, pool)
+        if values is None:
+            break
+        results = [
+            SearchResult(a, model.label("me", model.root, a), v, depth, n)
+            for a, (v, n, _) in zip(root_actions, values)
+        ]
+        if time.time() > deadline_ts or not any(cut for _, _, cut in values):
+            break
+    results.sort(key=lambda r: r.value, reverse=True)
+    return results
+
+
+def _run_depth(model, root_actions, depth, deadline_ts, pool):
+    """ 한 깊이에서 모든 루트 행동 평가 (하나라도 시간 초과면 None) """
+    if pool is None:
+        values = []
+        for a in root_actions:
+            res = _evaluate_root(model, a, depth, deadline_ts)
+            if res is None: return None
+            values.append(res)
+        return values
+
+    futures = [pool.submit(_evaluate_root, model, a, depth, deadline_ts) for a in root_actions]
+    pending = set(futures)
+    while pending:
+        timeout = max(0.0, deadline_ts - time.time()) + 0.05
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done or any(f.result() is None for f in done):
+            for f in pending: f.cancel()
+            return None
+    return [f.result() for f in futures]
+
+
+def format_search_report(results, top=4):
+    """ 어드바이저 프롬프트용 요약 """
+    if not results:
+        return "🔎 [탐색] 결과 없음"
+    lines = [f"🔎 [탐색 결과] {results[0].depth}턴 앞까지 (값 = 내 HP 합 - 상대 HP 합 기대값, 상대 최선 대응 가정)"]
+    for i, r in enumerate(results[:top], 1):
+        lines.append(f" {i}. {r.label}: {r.value:+.2f}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# --- [모듈 임포트] ---
+from Battle_Preparing.user_party import UserParty
+from Battle_Preparing.party_loader import load_party_from_file
+from battle_state import BattleState
+from battle_snapshot import snapshot_to_dict
+import battle_log
+
+# =========================================================
+# [세션별 배틀 관리]
+# - 세션(브라우저 탭)마다 독립된 UserParty / BattleState / 캐시
+# - Smogon 통계, 선봉 통계, 기술/종족값 캐시 같은 읽기 전용 데이터는
+#   각 모듈의 전역 객체를 그대로 참조 (세션마다 복사하지 않음)
+# - 오래 쓰지 않은 세션은 메모리 상한에 맞춰 정리
+# =========================================================
+
+MAX_SESSIONS = 64
+IDLE_TIMEOUT = 30 * 60                  # 30분 동안 안 쓰면 정리 대상
+MEMORY_CAP_BYTES = 64 * 1024 * 1024     # 세션 상태 합계 상한 (추정치)
+EVICT_INTERVAL = 30                     # 정리 검사 주기 (초)
+
+
+class BattleSession:
+    """ 한 사용자의 배틀 한 판에 필요한 상태 묶음 """
+    def __init__(self, session_id, team_file="my_team.txt", party=None):
+        self.session_id = session_id
+        if party is None:
+            party = UserParty()
+            load_party_from_file(team_file, party)
+        self.party = party    # 불러온 뒤로는 읽기만 함 -> 같은 파일이면 세션끼리 공유 가능
+        self.battle = BattleState(self.party)
+        self.caches = {}      # 세션 전용 파생 캐시 (리포트 등)
+        self.lock = threading.Lock()   # 분석 작업(jobs.py)이 상태를 바꾸는 동안 잡고 있음
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+    def touch(self):
+        self.last_used = time.time()
+
+    @property
+    def busy(self):
+        """ 분석 작업이 이 세션 상태를 쓰는 중 """
+        return self.lock.locked()
+
+    def estimate_bytes(self):
+        """ 대략적인 상태 크기 (스냅샷 직렬화 길이 + 캐시 항목 수 기반) """
+        try:
+            size = len(json.dumps(snapshot_to_dict(self.battle.snapshot()), ensure_ascii=False))
+        except (TypeError, ValueError):
+            size = 0
+        return size + 1024 * len(self.caches)
+
+    def close(self):
+        self.battle.cancel_prewarm()
+        if self.battle.log is not None:
+            self.battle.log.close()
+
+
+class SessionManager:
+    """ session_id -> BattleSession (LRU + 유휴 시간 + 메모리 상한으로 정리) """
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT,
+                 memory_cap=MEMORY_CAP_BYTES, team_file="my_team.txt"):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_cap = memory_cap
+        self.team_file = team_file
+        self.party_loader = None    # team_file -> UserParty (app.py가 캐시된 로더를 꽂음, 없으면 세션마다 새로 불러옴)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+
+    def get(self, session_id, battle_id=None):
+        """
+        세션을 가져오거나 새로 만듭니다.
+        정리된 세션이라도 battle_id의 이벤트 로그가 있으면 그 상태로 복구합니다.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.touch()
+                return session
+
+        # 파티 로드는 오래 걸릴 수 있으므로 락 밖에서
+        party = self.party_loader(self.team_file) if self.party_loader else None
+        session = BattleSession(session_id, self.team_file, party)
+        if battle_log.exists(battle_id):
+            battle_log.recover(battle_id, session.battle)
+
+        with self._lock:
+            existing = self._sessions.get(session_id)
+            if existing is not None:  # 동시에 만들어졌으면 먼저 등록된 쪽 사용
+                session.close()
+                return existing
+            self._sessions[session_id] = session
+        self.evict()
+        return session
+
+    def drop(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session: session.close()
+
+    def evict(self, force=False):
+        """ 유휴 세션 정리 -> 세션 수/메모리 상한 초과분은 가장 오래 안 쓴 순서로 정리 (작업 중인 세션은 제외) """
+        now = time.time()
+        if not force and now - self._last_evict < EVICT_INTERVAL:
+            return []
+        self._last_evict = now
+
+        evicted = []
+        with self._lock:
+            for sid, session in list(self._sessions.items()):
+                if now - session.last_used > self.idle_timeout and not session.busy:
+                    evicted.append(self._sessions.pop(sid))
+
+            sizes = {sid: s.estimate_bytes() for sid, s in self._sessions.items()}
+            total = sum(sizes.values())
+            # 작업 중인 세션은 건너뜀 (작업 스레드가 lock을 잡고 상태를 바꾸는 중)
+            for sid, session in list(self._sessions.items()):   # LRU 순서
+                if len(self._sessions) <= self.max_sessions and total <= self.memory_cap:
+                    break
+                if session.busy:
+                    continue
+                del self._sessions[sid]
+                total -= sizes.pop(sid, 0)
+                evicted.append(session)
+
+        for session in evicted:
+            session.close()
+        if evicted:
+            print(f"🧹 세션 {len(evicted)}개 정리 (남은 세션 {len(self._sessions)}개)")
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions)}
+
+
+# 프로세스 전체에서 하나 (Streamlit의 모든 세션이 공유)
+session_manager = SessionManager()
@@ -0,0 +1,273 @@
+from collections import namedtuple
+
+from battle_codes import ZERO_RANKS, SPECIES, ITEMS, ABILITIES, TYPES, MOVES
+from belief_tracker import BeliefTracker
+
+# =========================================================
+# [불변 스냅샷] BattleState 되돌리기 / 가정(What-if) 분기용
+# - 바뀌지 않은 포켓몬/정보 객체는 이전 스냅샷과 그대로 공유 (구조적 공유)
+# - 새 스냅샷을 만드는 비용은 "바뀐 필드 수"에 비례, deepcopy 없음
+# =========================================================
+
+class FrozenMap(dict):
+    """ 수정 불가능한 dict. 변경은 set()으로 새 객체를 만들어서 합니다. """
+    __slots__ = ()
+
+    def _blocked(self, *args, **kwargs):
+        raise TypeError("FrozenMap은 수정할 수 없습니다. set()을 사용하세요.")
+
+    __setitem__ = __delitem__ = _blocked
+    clear = pop = popitem = setdefault = update = _blocked
+
+    def set(self, key, value):
+        """ key만 바뀐 새 FrozenMap (값이 같으면 자기 자신) """
+        if key in self and self[key] is value:
+            return self
+        new = dict(self)
+        new[key] = value
+        return FrozenMap(new)
+
+    def remove(self, key):
+        if key not in self:
+            return self
+        new = dict(self)
+        del new[key]
+        return FrozenMap(new)
+
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+    def __reduce__(self):
+        return (FrozenMap, (dict(self),))
+
+
+EMPTY_MAP = FrozenMap()
+
+
+def freeze(value):
+    """ dict/list 중첩 구조를 FrozenMap/tuple로 변환 """
+    if isinstance(value, FrozenMap):
+        return value
+    if isinstance(value, dict):
+        return FrozenMap({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """ freeze의 역변환 (BattleState에 되돌릴 때 가변 객체로) """
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class PokemonSnapshot(namedtuple("PokemonSnapshot", [
+    "species", "is_mine", "hp", "status", "fainted",
+    "ranks", "volatile",
+    "item", "ability", "tera_type", "moves", "stats", "predictions",
+    "confirmed", "belief"
+])):
+    """
+    [포켓몬 스냅샷] 정수 코드/튜플만 담음 -> 해시/비교가 싸다 (탐색용 상태 키로 사용 가능)
+    species/item/ability/tera_type/moves는 battle_codes 인터닝 ID, status는 Status 코드,
+    ranks는 RANK_KEYS 순서 튜플, volatile/confirmed는 비트마스크,
+    belief는 상대의 BeliefTracker (불변 객체, 내 포켓몬은 None)
+    """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return SPECIES.name(self.species)
+
+
+class BattleSnapshot(namedtuple("BattleSnapshot", [
+    "turn_count", "my_active", "opp_active",
+    "opp_full_roster", "my_entry_selection",
+    "global_effects", "side_effects",
+    "my_party", "opp_party"
+])):
+    """
+    [배틀 전체 스냅샷]
+    my_active/opp_active는 이름, my_party/opp_party는 {이름: PokemonSnapshot} FrozenMap.
+    with_* 메서드는 바뀐 부분만 새로 만들고 나머지는 공유한 새 스냅샷을 돌려줍니다.
+    """
+    __slots__ = ()
+
+    def _party_key(self, side):
+        return "my_party" if side == "me" else "opp_party"
+
+    def pokemon(self, side, name=None):
+        if name is None:
+            name = self.my_active if side == "me" else self.opp_active
+        return getattr(self, self._party_key(side)).get(name)
+
+    def with_pokemon(self, side, name, **fields):
+        """ 포켓몬 하나의 필드만 바꾼 스냅샷 (예: with_pokemon("opp", "Ting-Lu", hp=50.0)) """
+        key = self._party_key(side)
+        party = getattr(self, key)
+        poke = party[name]._replace(**fields)
+        return self._replace(**{key: party.set(name, poke)})
+
+    def with_active(self, side, name):
+        """ 교체 가정: 들어오는 포켓몬의 랭크/휘발성 상태는 초기화 """
+        key = self._party_key(side)
+        party = getattr(self, key)
+        snap = self
+        if name in party:
+            poke = party[name]
+            poke = poke._replace(ranks=ZERO_RANKS, volatile=0)
+            snap = snap._replace(**{key: party.set(name, poke)})
+        return snap._replace(**{"my_active" if side == "me" else "opp_active": name})
+
+    def with_effect(self, key, value, side=None):
+        """ 필드(side=None) 또는 진영(side="me"/"opp") 효과 하나 변경 """
+        if side is None:
+            return self._replace(global_effects=self.global_effects.set(key, value))
+        side_map = self.side_effects[side].set(key, value)
+        return self._replace(side_effects=self.side_effects.set(side, side_map))
+
+
+class BattleHistory:
+    """ 커밋된 스냅샷의 되돌리기/다시 실행 스택 """
+    def __init__(self, limit=200):
+        self.limit = limit
+        self.undo_stack = []   # [(label, snapshot)] - 마지막이 현재 상태
+        self.redo_stack = []
+
+    def push(self, snapshot, label=None):
+        if self.undo_stack and self.undo_stack[-1][1] is snapshot:
+            return
+        self.undo_stack.append((label, snapshot))
+        self.redo_stack.clear()
+        if len(self.undo_stack) > self.limit:
+            del self.undo_stack[0]
+
+    def undo(self):
+        if len(self.undo_stack) < 2:
+            return None
+        self.redo_stack.append(self.undo_stack.pop())
+        return self.undo_stack[-1][1]
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        self.undo_stack.append(self.redo_stack.pop())
+        return self.undo_stack[-1][1]
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    @property
+    def can_undo(self):
+        return len(self.undo_stack) > 1
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+# ---------------------------------------------------------
+# [직렬화] 체크포인트 저장용 (JSON 호환 dict <-> 스냅샷)
+# ---------------------------------------------------------
+
+# 인터닝 ID는 프로세스마다 달라지므로 저장할 때는 이름으로 풀어서 씁니다.
+
+def pokemon_to_dict(snap):
+    return {
+        "name": snap.name, "is_mine": snap.is_mine, "hp": snap.hp,
+        "status": int(snap.status), "fainted": snap.fainted,
+        "ranks": list(snap.ranks), "volatile": snap.volatile,
+        "item": ITEMS.name(snap.item), "ability": ABILITIES.name(snap.ability),
+        "tera_type": TYPES.name(snap.tera_type),
+        "moves": [MOVES.name(m) for m in snap.moves],
+        "stats": dict(snap.stats), "predictions": thaw(snap.predictions),
+        "confirmed": snap.confirmed,
+        "belief": snap.belief.to_dict() if snap.belief is not None else None,
+    }
+
+
+def pokemon_from_dict(data):
+    return PokemonSnapshot(
+        SPECIES.intern(data["name"]), data["is_mine"], data["hp"], data["status"], data["fainted"],
+        tuple(data["ranks"]), data["volatile"],
+        ITEMS.intern(data["item"]), ABILITIES.intern(data["ability"]), TYPES.intern(data["tera_type"]),
+        tuple(MOVES.intern(m) for m in data["moves"]),
+        FrozenMap(data["stats"]), freeze(data["predictions"]),
+        data["confirmed"],
+        BeliefTracker.from_dict(data["belief"]) if data.get("belief") else None
+    )
+
+
+def snapshot_to_dict(snap, pokemon_ref=pokemon_to_dict):
+    """ pokemon_ref: 포켓몬 스냅샷 -> 저장 값 (기본은 dict, 기록 전체를 저장할 때는 공유 테이블 번호) """
+    return {
+        "turn_count": snap.turn_count,
+        "my_active": snap.my_active,
+        "opp_active": snap.opp_active,
+        "opp_full_roster": list(snap.opp_full_roster),
+        "my_entry_selection": list(snap.my_entry_selection),
+        "global_effects": thaw(snap.global_effects),
+        "side_effects": thaw(snap.side_effects),
+        "my_party": {name: pokemon_ref(p) for name, p in snap.my_party.items()},
+        "opp_party": {name: pokemon_ref(p) for name, p in snap.opp_party.items()},
+    }
+
+
+def snapshot_from_dict(data, pokemon_from=pokemon_from_dict):
+    return BattleSnapshot(
+        turn_count=data["turn_count"],
+        my_active=data["my_active"],
+        opp_active=data["opp_active"],
+        opp_full_roster=tuple(data["opp_full_roster"]),
+        my_entry_selection=tuple(data["my_entry_selection"]),
+        global_effects=freeze(data["global_effects"]),
+        side_effects=freeze(data["side_effects"]),
+        my_party=FrozenMap({n: pokemon_from(p) for n, p in data["my_party"].items()}),
+        opp_party=FrozenMap({n: pokemon_from(p) for n, p in data["opp_party"].items()}),
+    )
+
+
+def history_to_dict(current, history):
+    """
+    현재 상태 + 되돌리기/다시 실행 스택 (체크포인트용)
+    같은 스냅샷/포켓몬 객체는 한 번만 저장하고 번호로 참조 (구조 공유 그대로)
+    """
+    pokemon, poke_ids = [], {}
+    snaps, snap_ids = [], {}
+
+    def poke_ref(p):
+        i = poke_ids.get(id(p))
+        if i is None:
+            i = poke_ids[id(p)] = len(pokemon)
+            pokemon.append(pokemon_to_dict(p))
+        return i
+
+    def snap_ref(s):
+        i = snap_ids.get(id(s))
+        if i is None:
+            data = snapshot_to_dict(s, poke_ref)
+            i = snap_ids[id(s)] = len(snaps)
+            snaps.append(data)
+        return i
+
+    return {
+        "current": snap_ref(current),
+        "undo": [[label, snap_ref(s)] for label, s in history.undo_stack],
+        "redo": [[label, snap_ref(s)] for label, s in history.redo_stack],
+        "limit": history.limit,
+        "snapshots": snaps,
+        "pokemon": pokemon,
+    }
+
+
+def history_from_dict(data):
+    """ Returns: (현재 스냅샷, BattleHistory) """
+    pokemon = [pokemon_from_dict(p) for p in data["pokemon"]]
+    snaps = [snapshot_from_dict(s, pokemon.__getitem__) for s in data["snapshots"]]
+    history = BattleHistory(data.get("limit", 200))
+    history.undo_stack = [(label, snaps[i]) for label, i in data["undo"]]
+    history.redo_stack = [(label, snaps[i]) for label, i in data["redo"]]
+    return snaps[data["current"]], history
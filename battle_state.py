@@ -1,5 +1,11 @@
 import sys
 import os
+import copy
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 # --- [경로 설정] ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,121 +15,319 @@ if current_dir not in sys.path:
 # --- [모듈 임포트] ---
 from Battle_Preparing.user_party import my_party
 from Calculator.stat_estimator import estimate_stats, get_base_stats
-from rag_retriever import get_pokemon_raw_data 
+from Calculator.move_loader import get_move_data
+from rag_retriever import get_pokemon_raw_data, get_usage
+from belief_tracker import BeliefTracker
+from battle_snapshot import (
+    FrozenMap, EMPTY_MAP, PokemonSnapshot, BattleSnapshot, BattleHistory, freeze, thaw
+)
+from battle_codes import (
+    ZERO_RANKS, RANK_INDEX, VOLATILE_BIT, CONFIRM_BIT, CONFIRM_ALL,
+    Status, STATUS_NAMES, status_code, SPECIES, ITEMS, ABILITIES, TYPES, MOVES,
+    RanksView, BitsView
+)
+from battle_log import logged, log_spawn
 
 class BattlePokemon:
     """ 
     [개별 포켓몬 상태 객체]
     HP, 랭크, 상태이상, 정보 신뢰도(확정/예측) 관리
+    - __slots__ + 고정 길이 랭크 배열 + 비트마스크 + 정수 ID로 작게 유지
+    - ranks / volatile_status / info / confirmed는 UI 호환용 dict 스타일 읽기 전용 뷰
     """
-    def __init__(self, name, is_mine=True):
-        self.name = name
+    __slots__ = (
+        "species_id", "is_mine",
+        "current_hp_percent", "status_code", "is_fainted",
+        "_ranks", "volatile_mask",
+        "item_id", "ability_id", "tera_id", "move_ids", "stats", "predictions",
+        "confirmed_mask", "belief",
+        "_version", "_snap", "_snap_version",
+    )
+
+    def __init__(self, name, is_mine=True, party=None):
+        self.species_id = SPECIES.intern(name)
         self.is_mine = is_mine
         
         # 1. 기본 상태
         self.current_hp_percent = 100.0
-        self.status_condition = None # 영구 상태이상
+        self.status_code = Status.NONE # 영구 상태이상
         self.is_fainted = False
         
-        # 2. 랭크 (-6 ~ +6)
-        self.ranks = {'atk': 0, 'def': 0, 'spa': 0, 'spd': 0, 'spe': 0}
-        
-        # 3. 휘발성 상태 (교체 시 해제)
-        self.volatile_status = {
-            "taunt": False, "trapped": False, "confusion": False, 
-            "substitute": False, "encore": False, "leech_seed": False
-        }
+        # 2. 랭크 (-6 ~ +6), 3. 휘발성 상태 (교체 시 해제)
+        self._ranks = array('b', ZERO_RANKS)
+        self.volatile_mask = 0
 
-        # 4. 정보 및 신뢰도
-        self.info = {
-            "item": None, "ability": None, "tera_type": None, 
-            "moves": [], "stats": {},
-            "predictions": {"moves": [], "items": [], "teras": []}
-        }
-        
-        self.confirmed = {
-            "item": is_mine, "ability": is_mine, "tera_type": is_mine, "stats": is_mine
-        }
+        # 4. 정보 및 신뢰도 (moves/stats/predictions는 불변 객체 -> 스냅샷과 그대로 공유)
+        self.item_id = self.ability_id = self.tera_id = 0
+        self.move_ids = ()
+        self.stats = EMPTY_MAP
+        self.predictions = ((), (), ())   # (moves, items, teras)
+        self.confirmed_mask = CONFIRM_ALL if is_mine else 0
+        self.belief = None   # 상대만: 숨은 세트 사후분포 (BeliefTracker)
+
+        self._init_versions()
 
-        if is_mine: self._load_my_data()
+        if is_mine: self._load_my_data(party or my_party)
         else: self._load_smogon_data()
 
-    def _load_my_data(self):
-        data = my_party.get_pokemon(self.name)
-        if data: self.info.update(data)
+    def _init_versions(self):
+        # 스냅샷 재사용 판단용 버전 카운터 (값이 바뀔 때마다 증가)
+        self._version = 0
+        self._snap = None
+        self._snap_version = -1
+
+    def _touch(self):
+        self._version += 1
+
+    def _load_my_data(self, party):
+        data = party.get_pokemon(self.name)
+        if data:
+            for key in ("item", "ability", "tera_type", "stats"):
+                self._set_info(key, data.get(key))
+            self.move_ids = tuple(MOVES.intern(m) for m in data.get("moves") or ())
+        self._touch()
 
     def _load_smogon_data(self):
         est = estimate_stats(self.name)
-        if est: self.info['stats'] = est['stats']
+        if est: self.stats = FrozenMap(est['stats'])
         raw = get_pokemon_raw_data(self.name)
         if raw:
-            self.info['predictions']['moves'] = raw['predicted_moves']
-            self.info['predictions']['items'] = raw['predicted_items']
-            self.info['predictions']['teras'] = raw['predicted_teras']
+            self.predictions = (
+                tuple(raw['predicted_moves']),
+                tuple(raw['predicted_items']),
+                tuple(raw['predicted_teras']),
+            )
+        self.belief = BeliefTracker.from_usage(self.name, get_usage(self.name), get_base_stats(self.name))
+        self._touch()
+
+    def _set_info(self, category, value):
+        if category == "item": self.item_id = ITEMS.intern(value)
+        elif category == "ability": self.ability_id = ABILITIES.intern(value)
+        elif category == "tera_type": self.tera_id = TYPES.intern(value)
+        elif category == "stats": self.stats = FrozenMap(value or {})
+        elif category == "moves": self.move_ids = tuple(MOVES.intern(m) for m in value or ())
+        else: return False
+        return True
+
+    # --- [이름 / dict 스타일 뷰] ---
+    @property
+    def name(self):
+        return SPECIES.name(self.species_id)
+
+    @property
+    def status_condition(self):
+        """ 'Burn' 등 기존 문자열 (정상이면 None) """
+        return STATUS_NAMES[self.status_code]
+
+    @property
+    def ranks(self):
+        return RanksView(self._ranks)
+
+    @property
+    def volatile_status(self):
+        return BitsView(self.volatile_mask, VOLATILE_BIT)
+
+    @property
+    def confirmed(self):
+        return BitsView(self.confirmed_mask, CONFIRM_BIT)
+
+    @property
+    def info(self):
+        """ 기존 info dict 모양으로 조립 (읽기 전용 - 수정은 reveal_info/add_known_move로) """
+        moves, items, teras = self.predictions
+        return {
+            "item": ITEMS.name(self.item_id),
+            "ability": ABILITIES.name(self.ability_id),
+            "tera_type": TYPES.name(self.tera_id),
+            "moves": [MOVES.name(m) for m in self.move_ids],
+            "stats": self.stats,
+            "predictions": {"moves": list(moves), "items": list(items), "teras": list(teras)},
+        }
 
     # --- [상태 조작] ---
     def update_hp(self, amount):
         self.current_hp_percent = max(0, min(100, self.current_hp_percent + amount))
         if self.current_hp_percent == 0: self.is_fainted = True
+        self._touch()
 
     def set_rank(self, stat, change):
-        if stat in self.ranks:
-            self.ranks[stat] = max(-6, min(6, self.ranks[stat] + change))
+        i = RANK_INDEX.get(stat)
+        if i is not None:
+            self._ranks[i] = max(-6, min(6, self._ranks[i] + change))
+            self._touch()
+
+    def set_status(self, status):
+        self.status_code = status_code(status)
+        self._touch()
 
     def update_volatile(self, key, is_active):
-        if key in self.volatile_status: self.volatile_status[key] = is_active
+        bit = VOLATILE_BIT.get(key)
+        if bit:
+            self.volatile_mask = (self.volatile_mask | bit) if is_active else (self.volatile_mask & ~bit)
+            self._touch()
 
     def reset_battle_status(self):
-        """ 교체 시 초기화 (랭크, 휘발성 상태) """
-        self.ranks = {k: 0 for k in self.ranks}
-        for k in self.volatile_status: self.volatile_status[k] = False
+        """ 교체 시 초기화 (랭크, 휘발성 상태) - 새 객체 없이 제자리에서 """
+        belief = self.belief.on_switch() if self.belief else None
+        if self.volatile_mask or any(self._ranks) or belief is not self.belief:
+            for i in range(len(self._ranks)): self._ranks[i] = 0
+            self.volatile_mask = 0
+            self.belief = belief
+            self._touch()
 
     def reveal_info(self, category, value):
-        self.info[category] = value
-        self.confirmed[category] = True
+        if self._set_info(category, value):
+            bit = CONFIRM_BIT.get(category)
+            if bit: self.confirmed_mask |= bit
+            if self.belief is not None:
+                if category == "item": self.belief = self.belief.observe_item(value)
+                elif category == "tera_type": self.belief = self.belief.observe_tera(value)
+                elif category == "ability": self.belief = self.belief.observe_ability(value)
+            self._touch()
         print(f"💡 [정보 갱신] {self.name} {category} -> {value}")
 
     def add_known_move(self, move_name):
-        if move_name not in self.info['moves']:
-            self.info['moves'].append(move_name)
+        move_id = MOVES.intern(move_name)
+        if move_id not in self.move_ids:
+            self.move_ids += (move_id,)
+            self._touch()
+        if self.belief is not None:
+            belief = self.belief.observe_move(move_name, get_move_data(move_name).get('category'))
+            if belief is not self.belief:
+                self.belief = belief
+                self._touch()
+
+    # --- [스냅샷] ---
+    def snapshot(self):
+        """ 불변 스냅샷(정수/튜플만). 마지막 스냅샷 이후 바뀐 게 없으면 같은 객체를 그대로 반환 """
+        if self._snap is not None and self._snap_version == self._version:
+            return self._snap
+
+        ranks = tuple(self._ranks)
+        prev = self._snap
+        if prev is not None and prev.ranks == ranks: ranks = prev.ranks
+
+        self._snap = PokemonSnapshot(
+            self.species_id, self.is_mine, self.current_hp_percent, self.status_code,
+            self.is_fainted, ranks, self.volatile_mask,
+            self.item_id, self.ability_id, self.tera_id, self.move_ids,
+            self.stats, self.predictions, self.confirmed_mask, self.belief
+        )
+        self._snap_version = self._version
+        return self._snap
+
+    def restore(self, snap):
+        """ 스냅샷 값으로 되돌리기 (이미 같은 상태면 아무것도 안 함) """
+        if snap is self._snap and self._snap_version == self._version:
+            return
+        self.current_hp_percent = snap.hp
+        self.status_code = Status(snap.status)
+        self.is_fainted = snap.fainted
+        self._ranks = array('b', snap.ranks)
+        self.volatile_mask = snap.volatile
+        self.item_id, self.ability_id, self.tera_id = snap.item, snap.ability, snap.tera_type
+        self.move_ids = snap.moves
+        self.stats = snap.stats
+        self.predictions = snap.predictions
+        self.confirmed_mask = snap.confirmed
+        self.belief = snap.belief
+
+        self._version += 1
+        self._snap = snap
+        self._snap_version = self._version
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        """ 데이터 로딩(PokeAPI/Smogon) 없이 스냅샷만으로 객체 생성 """
+        obj = cls.__new__(cls)
+        obj.species_id = snap.species
+        obj.is_mine = snap.is_mine
+        obj._init_versions()
+        obj.restore(snap)
+        return obj
 
     # --- [추론 로직] ---
     def infer_speed_nature(self, my_real_speed, opponent_moved_first, field_state):
-        if self.is_mine: return None
-        base_stats = get_base_stats(self.name)
-        if not base_stats: return None
-        
-        base_spe = base_stats['spe']
-        speed_neutral = int((2 * base_spe + 31 + 63) * 0.5 + 5)
-        speed_positive = int(speed_neutral * 1.1)
-        
-        if field_state.get('tailwind_opp') or self.status_condition == 'Paralysis': return None
-
-        if opponent_moved_first:
-            if my_real_speed >= speed_positive:
-                if not self.confirmed['item']:
-                    self.reveal_info('item', 'Choice Scarf')
-                    return f"❗ 상대가 최속 한계({speed_positive})보다 빠릅니다. **구애스카프** 확정."
-            elif my_real_speed >= speed_neutral:
-                return f"❗ 상대가 준속({speed_neutral})보다 빠릅니다. **최속 보정**입니다."
-        else:
-            if my_real_speed < speed_positive:
-                return f"✅ 상대가 최속({speed_positive})보다 느립니다. 내구 보정 가능성."
-        return None
+        """
+        행동 순서로 사후분포 갱신 (한 번의 관측으로 확정하지 않음)
+        field_state: {'weather', 'terrain', 'tailwind', 'trick_room'} (상대 기준)
+        """
+        if self.is_mine or self.belief is None or not my_real_speed: return None
+        ranks, status = dict(self.ranks), self.status_condition
+        scarf_before = self.belief.prob('item', 'choicescarf')
+        belief = self.belief.observe_order(my_real_speed, opponent_moved_first, field_state, ranks, status)
+        if belief is self.belief: return None
+        self.belief = belief
+        self._touch()
+
+        speeds = belief.speed_values(field_state, ranks, status)
+        lo, hi = belief.quantile(speeds, 0.1), belief.quantile(speeds, 0.9)
+        scarf = belief.prob('item', 'choicescarf')
+        # 트릭룸에서는 먼저 움직인 쪽이 느림
+        trick_room = bool(field_state.get('trick_room'))
+        opp_faster = bool(opponent_moved_first) != trick_room
+        tr_note = " (트릭룸)" if trick_room else ""
+        if (hi < my_real_speed) if opp_faster else (lo > my_real_speed):
+            return f"⚠️ 통계상 세트로는 설명되지 않는 행동 순서입니다{tr_note} (스피드 추정 {lo:.0f}~{hi:.0f}). 우선도/특성/도구를 확인하세요."
+        if opp_faster and scarf >= 0.5 and scarf > scarf_before:
+            return f"❗ 상대가 예상보다 빠릅니다{tr_note}. **구애스카프 {scarf*100:.0f}%** (스피드 추정 {lo:.0f}~{hi:.0f})"
+        if opp_faster:
+            return f"❗ 상대가 나({my_real_speed})보다 빠릅니다{tr_note}. 스피드 추정 {lo:.0f}~{hi:.0f} (80%)"
+        return f"✅ 상대가 나({my_real_speed})보다 느립니다{tr_note}. 스피드 추정 {lo:.0f}~{hi:.0f} (80%)"
 
     def get_summary_text(self):
         if self.is_mine: return ""
-        moves = self.info['moves'] + self.info['predictions']['moves'][:5]
+        info = self.info
+        moves = info['moves'] + info['predictions']['moves'][:5]
         moves = list(dict.fromkeys(moves))[:5]
-        item = self.info['item'] if self.confirmed['item'] else f"예측({', '.join(self.info['predictions']['items'][:2])})"
+        if self.confirmed['item']:
+            item = info['item']
+        elif self.belief is not None:
+            item = "예측(" + ", ".join(f"{n} {p*100:.0f}%" for n, p in self.belief.marginal('item')[:2]) + ")"
+        else:
+            item = f"예측({', '.join(info['predictions']['items'][:2])})"
         return f"[{self.name}] 도구:{item} | 기술:{', '.join(moves)}"
 
 
+# ---------------------------------------------------------
+# [상대 로스터 프리웜] initialize_opponent 시점에 6마리를 미리 백그라운드로 생성
+# ---------------------------------------------------------
+
+PREWARM_WORKERS = 6
+_prewarm_pool = None
+_prewarm_pool_lock = threading.Lock()
+
+
+def _get_prewarm_pool():
+    """ 프로세스 전체에서 공유하는 프리웜 스레드 풀 (처음 쓸 때 생성) """
+    global _prewarm_pool
+    with _prewarm_pool_lock:
+        if _prewarm_pool is None:
+            _prewarm_pool = ThreadPoolExecutor(max_workers=PREWARM_WORKERS, thread_name_prefix="prewarm")
+        return _prewarm_pool
+
+
+def _build_opponent(pokemon_name):
+    """ [백그라운드] 상대 모델 생성 (종족값/실능 추정/Smogon) + 예상 기술 데이터 캐시 채우기 """
+    poke = BattlePokemon(pokemon_name, is_mine=False)
+    for move in poke.predictions[0]:
+        get_move_data(move)
+    return poke
+
+
+def _warm_moves(move_names):
+    """ [백그라운드] 내 파티 기술 데이터 캐시 채우기 """
+    for move in move_names:
+        get_move_data(move)
+
+
 class BattleState:
     """ 
     [전체 배틀 필드 상태]
+    party: 이 배틀에서 쓸 UserParty (세션별). 없으면 전역 my_party
     """
-    def __init__(self):
+    def __init__(self, party=None):
+        self.party = party or my_party
         self.turn_count = 1
         self.my_active = None
         self.opp_active = None
@@ -140,18 +344,70 @@ class BattleState:
             "me": {"tailwind": False, "reflect": False, "light_screen": False, "stealth_rock": False},
             "opp": {"tailwind": False, "reflect": False, "light_screen": False, "stealth_rock": False}
         }
+
+        # [NEW] 되돌리기/다시 실행용 스냅샷 기록
+        self.history = BattleHistory()
+        self._last_snapshot = None
+
+        # [NEW] 이벤트 로그 (battle_log.start/recover로 연결)
+        self.log = None
+        self._log_depth = 0
+        self._spawn_cache = {}
+
+        # [NEW] 백그라운드로 준비 중인 상대 포켓몬 {이름: Future}
+        self.prewarm_enabled = True
+        self._prewarm = {}
+
+        # [NEW] 상태에서 파생된 계산 결과 캐시 (battle.py 리포트 등, 스냅샷/로그 대상 아님)
+        self.caches = {}
+
+        # [NEW] What-if(speculate) 블록 깊이 / 그 안에서 처음 만든 상대 포켓몬의 초기 스냅샷
+        self._speculating = 0
+        self._speculative_spawns = {}
+
+        # [NEW] 턴 분석 방식 (battle.ADVISOR_MODES) 과 턴별 지연/토큰 기록
+        self.advisor_mode = "sequential"
+        self.turn_metrics = []
         
         self.refresh_my_party()
 
     def refresh_my_party(self):
-        if my_party.team:
-            self.my_party_status = {name: BattlePokemon(name, True) for name in my_party.team.keys()}
+        if self.party.team:
+            self.my_party_status = {name: BattlePokemon(name, True, self.party) for name in self.party.team.keys()}
+            self.history.clear()
             print(f"🔄 BattleState: 내 파티 {len(self.my_party_status)}마리 로드 완료")
 
+    @logged
     def initialize_opponent(self, roster_list):
+        # 표기가 달라도 (Flutter-Mane / 날치머) 같은 키로 -> 통계/프리웜/공개 파티가 한 이름을 씀
+        roster_list = [SPECIES.canonical(name) for name in roster_list]
         self.opp_full_roster = roster_list
+        if self.prewarm_enabled:
+            self.prewarm_opponents(roster_list)
+
+    def prewarm_opponents(self, roster_list):
+        """
+        상대 로스터 전원의 BattlePokemon을 백그라운드에서 미리 만듭니다.
+        set_active는 완성된 객체를 바로 쓰거나, 아직 만드는 중이면 그 작업을 기다립니다.
+        """
+        pool = _get_prewarm_pool()
+        for name in roster_list:
+            if name in self.opp_revealed_party or name in self._prewarm:
+                continue
+            self._prewarm[name] = pool.submit(_build_opponent, name)
+
+        my_moves = {MOVES.name(m) for p in self.my_party_status.values() for m in p.move_ids}
+        if my_moves:
+            pool.submit(_warm_moves, sorted(my_moves))
+
+    def cancel_prewarm(self):
+        """ 아직 시작 안 한 프리웜 작업 취소 (세션 종료 / 상대 교체 시) """
+        for future in self._prewarm.values():
+            future.cancel()
+        self._prewarm.clear()
 
     # [NEW] 선출 확정 메서드
+    @logged
     def set_my_selection(self, selection_list):
         """ app.py에서 선출 분석 후 호출됨 """
         self.my_entry_selection = selection_list
@@ -159,8 +415,11 @@ class BattleState:
         # 첫 번째 포켓몬을 선봉으로 자동 설정
         if selection_list:
             self.set_active("me", selection_list[0])
+        self.commit("선출 확정")
 
+    @logged
     def set_active(self, side, pokemon_name):
+        pokemon_name = SPECIES.canonical(pokemon_name)
         if side == "me":
             if not self.my_party_status: self.refresh_my_party()
             if pokemon_name in self.my_party_status:
@@ -168,11 +427,103 @@ class BattleState:
                 self.my_active.reset_battle_status() # 교체 시 랭크 리셋
         else:
             if pokemon_name not in self.opp_revealed_party:
-                self.opp_revealed_party[pokemon_name] = BattlePokemon(pokemon_name, is_mine=False)
+                self.opp_revealed_party[pokemon_name] = self._new_opponent(pokemon_name)
             self.opp_active = self.opp_revealed_party[pokemon_name]
             self.opp_active.reset_battle_status() # 교체 시 랭크 리셋
 
+    def _new_opponent(self, pokemon_name):
+        """ 상대 포켓몬 객체 생성 (로그 재생 중이면 기록된 초기 데이터 사용) """
+        snap = self._spawn_cache.pop(pokemon_name, None)
+        if snap is not None:
+            return BattlePokemon.from_snapshot(snap)
+
+        # What-if 블록에서 먼저 만든 적이 있으면 그 초기 상태를 재사용 (프리웜 결과는 이미 소비됨)
+        snap = self._speculative_spawns.get(pokemon_name)
+        if snap is not None:
+            poke = BattlePokemon.from_snapshot(snap)
+            if not self._speculating:
+                del self._speculative_spawns[pokemon_name]
+                log_spawn(self, poke)
+            return poke
+
+        poke = None
+        future = self._prewarm.pop(pokemon_name, None)
+        if future is not None and not future.cancelled():
+            start = time.perf_counter()
+            try:
+                poke = future.result()
+            except Exception as e:
+                print(f"⚠️ 백그라운드 준비 실패 ({pokemon_name}): {e}")
+            waited = (time.perf_counter() - start) * 1000
+            if poke is not None and waited > 1:
+                print(f"⏳ {pokemon_name} 준비 대기 {waited:.0f}ms")
+        if poke is None:
+            poke = BattlePokemon(pokemon_name, is_mine=False)
+        if self._speculating:
+            self._speculative_spawns[pokemon_name] = poke.snapshot()
+        else:
+            log_spawn(self, poke)
+        return poke
+
+    @logged
+    def apply_hp(self, side, amount):
+        """ 현재 필드 포켓몬 HP 변화 (계산기 결과 / 사용자 입력) """
+        target = self.my_active if side == "me" else self.opp_active
+        if target: target.update_hp(amount)
+
+    @logged
+    def end_turn(self):
+        self.turn_count += 1
+
+    @logged
+    def record_input(self, user_input, opp_moved_first=None):
+        """ 상태 변화 없음. 원본 입력을 로그에 남겨 오프라인 재생 벤치마크에 사용 """
+        pass
+
+    # --- [숨은 정보 관측] ---
+    def _opp_field(self):
+        """ 상대 기준 스피드 판정용 필드 """
+        return {
+            'weather': self.global_effects['weather'], 'terrain': self.global_effects['terrain'],
+            'trick_room': self.global_effects['trick_room'], 'tailwind': self.side_effects['opp']['tailwind'],
+        }
+
+    def _my_spec(self):
+        me = self.my_active
+        info = me.info
+        return {
+            'stats': me.stats, 'ranks': dict(me.ranks), 'item': info['item'],
+            'status': me.status_condition, 'ability': info['ability'],
+            'types': [], 'is_terastal': False,
+        }
+
+    @logged
+    def observe_order(self, my_speed, opp_moved_first):
+        """ 같은 우선도 행동 순서 -> 상대 사후분포 갱신. Returns: 추론 메시지 또는 None """
+        if not self.opp_active: return None
+        return self.opp_active.infer_speed_nature(my_speed, opp_moved_first, self._opp_field())
+
+    @logged
+    def observe_damage(self, side, move_name, percent):
+        """ side가 move_name에 percent% 피해를 받음 (사용자 입력 수치) -> 상대 사후분포 갱신 """
+        opp = self.opp_active
+        if not self.my_active or not opp or opp.belief is None or not percent: return
+        move_spec = get_move_data(move_name)
+        if not move_spec.get('power'): return
+        field = {'weather': self.global_effects['weather'], 'terrain': self.global_effects['terrain']}
+
+        if side == "opp":
+            field.update(opp_ranks=dict(opp.ranks), opp_screens=self.side_effects['opp'])
+            opp.belief = opp.belief.observe_damage_taken(self._my_spec(), move_spec, field, percent)
+        else:
+            defender = dict(self._my_spec(), screens=self.side_effects['me'])
+            opp.belief = opp.belief.observe_damage_dealt(
+                defender, move_spec, field, percent, dict(opp.ranks), opp.status_condition
+            )
+        opp._touch()
+
     # --- [LLM 파싱 데이터 적용] ---
+    @logged
     def apply_llm_update(self, update_data):
         print(f"🔄 [State Update] 적용: {update_data}")
         
@@ -193,8 +544,8 @@ class BattleState:
                 self.opp_active.set_rank(stat, change)
 
         # 상태이상 업데이트 (문자열 'Burn' 등이 들어온다고 가정)
-        if update_data.get("my_status"): self.my_active.status_condition = update_data["my_status"]
-        if update_data.get("opp_status"): self.opp_active.status_condition = update_data["opp_status"]
+        if update_data.get("my_status") and self.my_active: self.my_active.set_status(update_data["my_status"])
+        if update_data.get("opp_status") and self.opp_active: self.opp_active.set_status(update_data["opp_status"])
 
         if update_data.get("weather"): self.global_effects['weather'] = update_data["weather"]
         if update_data.get("terrain"): self.global_effects['terrain'] = update_data["terrain"]
@@ -211,7 +562,138 @@ class BattleState:
             if update_data.get("opp_move_used"): self.opp_active.add_known_move(update_data["opp_move_used"])
 
         if update_data.get("turn_end"):
-            self.turn_count += 1
+            self.end_turn()
+
+    # --- [스냅샷 / 되돌리기] ---
+    def _freeze_party(self, party, prev_map):
+        snaps = {name: poke.snapshot() for name, poke in party.items()}
+        if prev_map is not None and len(prev_map) == len(snaps) and all(
+            prev_map.get(name) is snap for name, snap in snaps.items()
+        ):
+            return prev_map
+        return FrozenMap(snaps)
+
+    def snapshot(self):
+        """
+        현재 배틀 전체의 불변 스냅샷.
+        바뀌지 않은 포켓몬/필드 객체는 직전 스냅샷과 공유하므로 deepcopy 없이 바뀐 만큼만 비용이 듭니다.
+        """
+        prev = self._last_snapshot
+        global_effects = freeze(self.global_effects)
+        side_effects = freeze(self.side_effects)
+        roster = tuple(self.opp_full_roster)
+        selection = tuple(self.my_entry_selection)
+        if prev is not None:
+            if prev.global_effects == global_effects: global_effects = prev.global_effects
+            if prev.side_effects == side_effects: side_effects = prev.side_effects
+            if prev.opp_full_roster == roster: roster = prev.opp_full_roster
+            if prev.my_entry_selection == selection: selection = prev.my_entry_selection
+
+        snap = BattleSnapshot(
+            turn_count=self.turn_count,
+            my_active=self.my_active.name if self.my_active else None,
+            opp_active=self.opp_active.name if self.opp_active else None,
+            opp_full_roster=roster,
+            my_entry_selection=selection,
+            global_effects=global_effects,
+            side_effects=side_effects,
+            my_party=self._freeze_party(self.my_party_status, prev.my_party if prev else None),
+            opp_party=self._freeze_party(self.opp_revealed_party, prev.opp_party if prev else None),
+        )
+        if prev is not None and snap == prev:
+            return prev
+        self._last_snapshot = snap
+        return snap
+
+    @property
+    def state_key(self):
+        """ 화면 캐시용 상태 키: 상태가 같으면 같은 값 (되돌리기로 돌아온 상태도 같은 키) """
+        return hash(self.snapshot())
+
+    def _restore_party(self, party, snap_map):
+        restored = {}
+        for name, poke_snap in snap_map.items():
+            poke = party.get(name)
+            if poke is None:
+                poke = BattlePokemon.from_snapshot(poke_snap)
+            else:
+                poke.restore(poke_snap)
+            restored[name] = poke
+        return restored
+
+    def restore(self, snap):
+        """ 스냅샷 상태로 되돌림 (바뀐 포켓몬만 다시 씀) """
+        self.turn_count = snap.turn_count
+        self.opp_full_roster = list(snap.opp_full_roster)
+        self.my_entry_selection = list(snap.my_entry_selection)
+        self.global_effects = thaw(snap.global_effects)
+        self.side_effects = thaw(snap.side_effects)
+        self.my_party_status = self._restore_party(self.my_party_status, snap.my_party)
+        self.opp_revealed_party = self._restore_party(self.opp_revealed_party, snap.opp_party)
+        self.my_active = self.my_party_status.get(snap.my_active)
+        self.opp_active = self.opp_revealed_party.get(snap.opp_active)
+        self._last_snapshot = snap
+
+    @logged
+    def commit(self, label=None):
+        """ 현재 상태를 되돌리기 기록에 추가 """
+        snap = self.snapshot()
+        self.history.push(snap, label)
+        return snap
+
+    @logged
+    def undo(self):
+        """ 직전 커밋 상태로 되돌리기 (성공 시 True) """
+        snap = self.history.undo()
+        if snap is None: return False
+        self.restore(snap)
+        print(f"↩️ 되돌리기: Turn {self.turn_count}")
+        return True
+
+    @logged
+    def redo(self):
+        snap = self.history.redo()
+        if snap is None: return False
+        self.restore(snap)
+        print(f"↪️ 다시 실행: Turn {self.turn_count}")
+        return True
+
+    @contextmanager
+    def speculate(self):
+        """
+        [What-if] 블록 안에서 상태를 마음대로 바꿔보고, 빠져나오면 원래대로 복구
+        예) with current_battle.speculate(): current_battle.set_active("me", "Gholdengo"); ...
+        블록 안의 변경은 이벤트 로그에 남지 않습니다.
+        """
+        base = self.snapshot()
+        self._speculating += 1
+        self._log_depth += 1
+        try:
+            yield self
+        finally:
+            self._log_depth -= 1
+            self._speculating -= 1
+            self.restore(base)
+
+    def fork(self):
+        """
+        [What-if 복사본] 현재 상태를 새 포켓몬 객체로 복원한 별도 BattleState (로그/되돌리기 기록 없음)
+        speculate()와 달리 원본을 잠깐도 바꾸지 않으므로, 화면이 원본을 읽는 동안 작업 스레드에서 써도 안전합니다.
+        복사본에서 처음 만든 상대 포켓몬은 speculate()처럼 초기 상태를 원본에 남겨 실제 반영 때 재사용합니다.
+        """
+        snap = self.snapshot()
+        clone = copy.copy(self)   # 파티/파생 캐시/프리웜/추측 생성 기록은 원본과 공유
+        clone.my_party_status, clone.opp_revealed_party = {}, {}
+        clone.my_active = clone.opp_active = None
+        clone.history = BattleHistory()
+        clone.log = None
+        clone.prewarm_enabled = False
+        clone.turn_metrics = []
+        clone._log_depth = 1
+        clone._speculating = 1
+        clone._last_snapshot = None
+        clone.restore(snap)
+        return clone
 
     def get_state_report(self):
         if not self.my_active or not self.opp_active: return "⚠️ 배틀 준비 중..."
@@ -257,4 +739,39 @@ class BattleState:
         🛡️ **벽/순풍**: 나[{'순풍' if self.side_effects['me']['tailwind'] else ''}] vs 상대[{'순풍' if self.side_effects['opp']['tailwind'] else ''}]
         """
 
+    def get_compact_report(self):
+        """
+        [LLM 입력용 압축 상태] 항상 같은 순서/형식 (같은 상태 -> 같은 문자열)
+        표기법은 battle.py의 STATE_LEGEND 참고
+        """
+        if not self.my_active or not self.opp_active: return "준비중"
+
+        def poke_code(p):
+            ranks = ",".join(f"{k}{v:+d}" for k, v in p.ranks.items() if v) or "-"
+            vol = ",".join(k for k, v in p.volatile_status.items() if v) or "-"
+            return f"{p.name} HP{p.current_hp_percent:.0f} {p.status_condition or '-'} R[{ranks}] V[{vol}]"
+
+        def side_code(side):
+            on = [k for k, v in self.side_effects[side].items() if v]
+            return ",".join(on) or "-"
+
+        names = self.my_entry_selection or list(self.my_party_status.keys())
+        bench = [
+            f"{n}:{self.my_party_status[n].current_hp_percent:.0f}" for n in names
+            if n != self.my_active.name and n in self.my_party_status and not self.my_party_status[n].is_fainted
+        ]
+        opp = self.opp_active
+        item = f"{opp.info['item']}!" if opp.confirmed['item'] else "?"
+        seen = [
+            f"{n}:{'X' if p.is_fainted else f'{p.current_hp_percent:.0f}'}"
+            for n, p in self.opp_revealed_party.items() if n != opp.name
+        ]
+        g = self.global_effects
+        return "\n".join([
+            f"T{self.turn_count} W:{g['weather'] or '-'} F:{g['terrain'] or '-'} TR:{int(bool(g['trick_room']))}",
+            f"ME {poke_code(self.my_active)} BENCH[{','.join(bench) or '-'}] SIDE[{side_code('me')}]",
+            f"OP {poke_code(opp)} I:{item} M[{','.join(opp.info['moves']) or '-'}] SIDE[{side_code('opp')}]",
+            f"OP_PARTY seen[{','.join(seen) or '-'}] unknown:{max(0, 3 - len(self.opp_revealed_party))}",
+        ])
+
 current_battle = BattleState()
\ No newline at end of file
@@ -0,0 +1,342 @@
+import numpy as np
+
+# --- [모듈 임포트] ---
+from Calculator.calculator import calculate_damage_math
+from Calculator.modifiers import compile_damage
+from Calculator.speed_checker import calculate_dynamic_speed
+from Calculator.stat_utils import calculate_stat, parse_smogon_spread, NATURE_MODS
+from battle_codes import to_id   # 'Choice Scarf' / 'choicescarf' / 'Choice-Scarf' -> 'choicescarf'
+
+# =========================================================
+# [상대 숨은 정보 베이즈 추론]
+# - 후보 = Smogon 통계의 (도구 x 테라 x 특성 x 노력치 배분) 조합
+# - 사전확률 = 각 항목 사용률의 곱 (서로 독립 가정)
+# - 관측(기술 공개 / 데미지 / 행동 순서 / 도구 발동)마다 가중치 배열에 우도를 곱해서 갱신
+# - 객체는 불변: observe_* 는 후보 배열을 공유하고 가중치만 새로 만든 BeliefTracker를 돌려줌
+#   (BattlePokemon 스냅샷/되돌리기에 그대로 실림)
+# =========================================================
+
+KINDS = ("item", "tera_type", "ability", "spread")
+STAT_KEYS = ("hp", "atk", "def", "spa", "spd", "spe")
+
+MAX_ITEMS = 5
+MAX_TERAS = 3
+MAX_ABILITIES = 3
+MAX_SPREADS = 6
+
+SOFT_EPS = 0.05          # 관측과 어긋나는 후보에 곱하는 값 (입력 실수 대비, 0으로 지우지 않음)
+DAMAGE_TOLERANCE = 2.0   # 데미지 관측 허용 오차 (%p, 사용자 입력이 대략적이므로)
+
+CHOICE_ITEMS = ("choiceband", "choicespecs", "choicescarf")
+
+# 계산기가 이해하는 표시 이름 (Smogon id -> 계산기 문자열)
+_CALC_NAMES = (
+    "Choice Band", "Choice Specs", "Choice Scarf", "Life Orb", "Iron Ball",
+    "Swift Swim", "Chlorophyll", "Sand Rush", "Slush Rush", "Surge Surfer",
+    "Unburden", "Quick Feet", "Prankster", "Gale Wings",
+)
+
+
+_CALC_BY_ID = {to_id(n): n for n in _CALC_NAMES}
+
+
+def calc_name(entry_id):
+    """ Smogon id를 계산기용 이름으로 (계산기가 모르는 값은 id 그대로) """
+    return _CALC_BY_ID.get(entry_id, entry_id)
+
+
+def _top(entries, n):
+    """ Smogon [[이름, 가중치], ...] 상위 n개 -> (ids, 정규화 확률) """
+    entries = [e for e in (entries or [])[:n] if e[1] > 0]
+    if not entries:
+        return [None], np.ones(1)
+    w = np.array([e[1] for e in entries], dtype=float)
+    return [e[0] for e in entries], w / w.sum()
+
+
+def _spread_stats(base_stats, spread):
+    nature, evs = parse_smogon_spread(spread)
+    mods = NATURE_MODS.get(nature, {})
+    row = [calculate_stat(base_stats["hp"], 31, evs["hp"], 1.0, is_hp=True)]
+    for stat in STAT_KEYS[1:]:
+        row.append(calculate_stat(base_stats[stat], 31, evs[stat], mods.get(stat, 1.0)))
+    return row
+
+
+class BeliefTracker:
+    """
+    [상대 한 마리의 숨은 세트 사후분포]
+    vocab[kind]: 후보 이름 목록 / idx[kind]: 후보별 인덱스 배열 / weights: 정규화된 가중치
+    stats: (후보 수, 6) 실수치 배열 (STAT_KEYS 순서)
+    """
+    __slots__ = ("name", "base_stats", "vocab", "idx", "stats", "weights",
+                 "observations", "stint_moves", "_last_order")
+
+    # --- [생성] ---
+    @classmethod
+    def from_usage(cls, name, usage_entry, base_stats):
+        """ Smogon 통계 항목 + 종족값으로 사전분포 생성 (없으면 None) """
+        if not usage_entry or not base_stats or not usage_entry.get("Spreads"):
+            return None
+        items, p_item = _top(usage_entry.get("Items"), MAX_ITEMS)
+        teras, p_tera = _top(usage_entry.get("TeraTypes"), MAX_TERAS)
+        abilities, p_ability = _top(usage_entry.get("Abilities"), MAX_ABILITIES)
+        spreads, p_spread = _top(usage_entry.get("Spreads"), MAX_SPREADS)
+
+        # 전체 조합 격자 (indexing="ij" -> 도구가 가장 바깥 축)
+        grids = np.meshgrid(
+            np.arange(len(items)), np.arange(len(teras)),
+            np.arange(len(abilities)), np.arange(len(spreads)), indexing="ij"
+        )
+        idx = {kind: g.ravel().astype(np.int16) for kind, g in zip(KINDS, grids)}
+        prior = (p_item[idx["item"]] * p_tera[idx["tera_type"]]
+                 * p_ability[idx["ability"]] * p_spread[idx["spread"]])
+
+        spread_stats = np.array([_spread_stats(base_stats, s) for s in spreads], dtype=np.int32)
+
+        return cls(
+            name, dict(base_stats),
+            {"item": items, "tera_type": teras, "ability": abilities, "spread": spreads},
+            idx, spread_stats[idx["spread"]], prior / prior.sum(),
+        )
+
+    def __init__(self, name, base_stats, vocab, idx, stats, weights,
+                 observations=(), stint_moves=(), last_order=None):
+        self.name = name
+        self.base_stats = base_stats
+        self.vocab = vocab
+        self.idx = idx
+        self.stats = stats
+        self.weights = weights
+        self.observations = observations
+        self.stint_moves = stint_moves
+        self._last_order = last_order
+
+    def _derive(self, weights=None, observation=None, **changes):
+        """ 가중치/관측 기록만 바꾼 새 객체 (후보 배열은 공유) """
+        if weights is not None:
+            total = weights.sum()
+            weights = weights / total if total > 0 else np.full(len(weights), 1 / len(weights))
+        obs = self.observations + (observation,) if observation else self.observations
+        fields = dict(
+            vocab=self.vocab, idx=self.idx, stats=self.stats,
+            stint_moves=self.stint_moves, last_order=self._last_order,
+        )
+        fields.update(changes)
+        return BeliefTracker(
+            self.name, self.base_stats, fields["vocab"], fields["idx"], fields["stats"],
+            self.weights if weights is None else weights, obs,
+            fields["stint_moves"], fields["last_order"],
+        )
+
+    def __len__(self):
+        return len(self.weights)
+
+    # --- [공통 도구] ---
+    def _grouped(self, kinds, fn):
+        """
+        kinds로 묶은 고유 조합마다 fn(대표 후보 인덱스)을 한 번만 계산하고 전체 후보로 펼침.
+        (노력치 3개 x 도구 5개면 계산기 호출 15번으로 후보 전체의 우도를 얻음)
+        """
+        keys = np.stack([self.idx[k] for k in kinds], axis=1)
+        uniq, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        values = np.array([fn(int(i)) for i in first], dtype=float)
+        return values[inverse.ravel()]
+
+    def _entry(self, kind, i):
+        return self.vocab[kind][self.idx[kind][i]]
+
+    def _stats_of(self, i):
+        return dict(zip(STAT_KEYS, (int(v) for v in self.stats[i])))
+
+    def _observe_fixed(self, kind, value, label):
+        """ 확정 관측 (도구 발동 / 테라스탈 / 특성 발동): 일치하는 후보만 남김 """
+        value_id = to_id(value)
+        names = self.vocab[kind]
+        matches = [i for i, n in enumerate(names) if to_id(n) == value_id]
+        if matches:
+            mask = np.isin(self.idx[kind], matches)
+            return self._derive(self.weights * mask, observation=(label, value))
+
+        # 통계에 없던 값: 어휘에 추가하고 모든 후보를 그 값으로 교체 (나머지 축 분포는 유지)
+        vocab = dict(self.vocab)
+        vocab[kind] = names + [value_id]
+        idx = dict(self.idx)
+        idx[kind] = np.full(len(self.weights), len(names), dtype=np.int16)
+        return self._derive(self.weights.copy(), observation=(label, value), vocab=vocab, idx=idx)
+
+    # --- [관측 갱신] ---
+    def observe_item(self, item):
+        return self._observe_fixed("item", item, "item")
+
+    def observe_tera(self, tera_type):
+        return self._observe_fixed("tera_type", tera_type, "tera_type")
+
+    def observe_ability(self, ability):
+        return self._observe_fixed("ability", ability, "ability")
+
+    def observe_move(self, move_name, category=None):
+        """
+        기술 사용 관측
+        - 같은 출전 중 서로 다른 기술 2개 이상 -> 구애 계열 도구 가능성 낮춤
+        - 변화기 사용 -> 돌격조끼 가능성 낮춤
+        """
+        move_id = to_id(move_name)
+        if move_id in self.stint_moves:
+            return self
+        stint = self.stint_moves + (move_id,)
+        lik = np.ones(len(self.weights))
+        item_ids = [to_id(n) for n in self.vocab["item"]]
+        if len(stint) > 1:
+            choice = [i for i, n in enumerate(item_ids) if n in CHOICE_ITEMS]
+            lik[np.isin(self.idx["item"], choice)] = SOFT_EPS
+        if category == "Status":
+            vest = [i for i, n in enumerate(item_ids) if n == "assaultvest"]
+            lik[np.isin(self.idx["item"], vest)] = SOFT_EPS
+        return self._derive(self.weights * lik, observation=("move", move_name, category), stint_moves=stint)
+
+    def on_switch(self):
+        """ 교체로 들어가면 구애 고정 판정 초기화 """
+        if not self.stint_moves and self._last_order is None:
+            return self
+        return self._derive(stint_moves=(), last_order=None, observation=("switch",))
+
+    def observe_damage_taken(self, attacker_spec, move_spec, field_spec, percent):
+        """ 내 공격으로 상대가 percent% 잃음 -> 상대 HP/방어 실수치(노력치 배분) 우도 """
+        percent = abs(percent)
+        screens = field_spec.get("opp_screens", {})
+        chain = compile_damage(attacker_spec, {"screens": screens}, field_spec)   # 후보마다 스탯만 다름
+
+        def likelihood(i):
+            def_spec = {"stats": self._stats_of(i), "ranks": field_spec.get("opp_ranks", {}),
+                        "screens": screens, "types": []}
+            lo, hi = _percent_range(calculate_damage_math(attacker_spec, def_spec, move_spec, field_spec, chain))
+            return 1.0 if lo - DAMAGE_TOLERANCE <= percent <= hi + DAMAGE_TOLERANCE else SOFT_EPS
+
+        lik = self._grouped(("spread",), likelihood)
+        return self._derive(self.weights * lik,
+                            observation=("damage_taken", move_spec.get("name"), percent))
+
+    def observe_damage_dealt(self, defender_spec, move_spec, field_spec, percent, ranks=None, status=None):
+        """ 상대 공격으로 내가 percent% 잃음 -> 상대 공격 실수치 + 도구(구애/생구) 우도 """
+        percent = abs(percent)
+
+        def likelihood(i):
+            att_spec = {"stats": self._stats_of(i), "ranks": ranks or {}, "status": status,
+                        "item": calc_name(self._entry("item", i)), "types": []}
+            lo, hi = _percent_range(calculate_damage_math(att_spec, defender_spec, move_spec, field_spec))
+            return 1.0 if lo - DAMAGE_TOLERANCE <= percent <= hi + DAMAGE_TOLERANCE else SOFT_EPS
+
+        lik = self._grouped(("spread", "item"), likelihood)
+        return self._derive(self.weights * lik,
+                            observation=("damage_dealt", move_spec.get("name"), percent))
+
+    def observe_order(self, my_speed, opp_moved_first, field_state, ranks=None, status=None):
+        """
+        같은 우선도에서 누가 먼저 움직였는지 관측 -> 스피드(노력치/성격) + 스카프/특성 우도
+        같은 조건의 관측이 반복되면 새 증거가 아니므로 무시
+        """
+        key = (my_speed, bool(opp_moved_first), tuple(sorted(field_state.items())),
+               tuple(sorted((ranks or {}).items())), status)
+        if key == self._last_order:
+            return self
+        trick_room = field_state.get("trick_room", False)
+
+        def likelihood(i):
+            speed = self._speed_of(i, field_state, ranks, status)
+            if speed == my_speed: return 0.5
+            faster = (speed < my_speed) if trick_room else (speed > my_speed)
+            return 1.0 if faster == bool(opp_moved_first) else SOFT_EPS
+
+        lik = self._grouped(("spread", "item", "ability"), likelihood)
+        return self._derive(self.weights * lik, last_order=key,
+                            observation=("order", my_speed, bool(opp_moved_first)))
+
+    def _speed_of(self, i, field_state, ranks=None, status=None):
+        return calculate_dynamic_speed(
+            self._stats_of(i), ranks or {}, calc_name(self._entry("item", i)), status,
+            calc_name(self._entry("ability", i)), field_state
+        )
+
+    # --- [조회] ---
+    def marginal(self, kind):
+        """ [(이름, 확률), ...] 확률 내림차순 """
+        probs = np.bincount(self.idx[kind], weights=self.weights, minlength=len(self.vocab[kind]))
+        order = np.argsort(-probs, kind="stable")
+        return [(self.vocab[kind][i], float(probs[i])) for i in order if probs[i] > 0]
+
+    def prob(self, kind, value):
+        value_id = to_id(value)
+        return sum(p for n, p in self.marginal(kind) if to_id(n) == value_id)
+
+    def most_likely(self):
+        """ 가중치가 가장 큰 후보 하나 {kind: 이름, "stats": {...}} """
+        i = int(np.argmax(self.weights))
+        result = {kind: self._entry(kind, i) for kind in KINDS}
+        result["stats"] = self._stats_of(i)
+        return result
+
+    def expected(self, values):
+        """ 후보별 값 배열의 사후 기대값 """
+        return float(np.dot(self.weights, values))
+
+    def quantile(self, values, q):
+        """ 후보별 값 배열의 사후 q분위수 (q=0.9 -> 상위 10% 최악 가정) """
+        values = np.asarray(values, dtype=float)
+        order = np.argsort(values, kind="stable")
+        cdf = np.cumsum(self.weights[order])
+        pos = min(int(np.searchsorted(cdf, q)), len(order) - 1)
+        return float(values[order[pos]])
+
+    def expected_stats(self):
+        return {k: round(self.expected(self.stats[:, j])) for j, k in enumerate(STAT_KEYS)}
+
+    def quantile_stats(self, q):
+        """ 스탯별 q분위수 (방어 계산의 최악 가정 등) """
+        return {k: int(self.quantile(self.stats[:, j], q)) for j, k in enumerate(STAT_KEYS)}
+
+    def speed_values(self, field_state, ranks=None, status=None):
+        """ 후보별 최종 스피드 (expected/quantile에 넘겨서 사용) """
+        return self._grouped(("spread", "item", "ability"),
+                             lambda i: self._speed_of(i, field_state, ranks, status))
+
+    def summary(self, top=3):
+        parts = []
+        for kind, label in (("item", "도구"), ("tera_type", "테라"), ("spread", "배분")):
+            probs = ", ".join(f"{n} {p*100:.0f}%" for n, p in self.marginal(kind)[:top])
+            parts.append(f"{label}[{probs}]")
+        return " / ".join(parts)
+
+    # --- [직렬화] 체크포인트용 ---
+    def to_dict(self):
+        return {
+            "name": self.name, "base_stats": self.base_stats,
+            "vocab": self.vocab,
+            "idx": {k: v.tolist() for k, v in self.idx.items()},
+            "weights": self.weights.tolist(),
+            "observations": [list(o) for o in self.observations],
+            "stint_moves": list(self.stint_moves),
+            "last_order": self._last_order,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        vocab = {k: list(v) for k, v in data["vocab"].items()}
+        idx = {k: np.array(v, dtype=np.int16) for k, v in data["idx"].items()}
+        spread_stats = np.array([_spread_stats(data["base_stats"], s) for s in vocab["spread"]], dtype=np.int32)
+        return cls(
+            data["name"], data["base_stats"], vocab, idx, spread_stats[idx["spread"]],
+            np.array(data["weights"], dtype=float),
+            tuple(tuple(o) for o in data["observations"]), tuple(data["stint_moves"]),
+            last_order=_freeze(data.get("last_order")),
+        )
+
+
+def _freeze(value):
+    """ JSON 리스트 -> 튜플 (중복 관측 키 비교용, 중첩 포함) """
+    return tuple(_freeze(v) for v in value) if isinstance(value, list) else value
+
+
+def _percent_range(result):
+    lo, hi = result["percent_range"].replace("%", "").split("~")
+    return float(lo), float(hi)
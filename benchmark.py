@@ -0,0 +1,399 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+# 오프라인 고정: 관련 모듈을 import 하기 전에 (가짜 LLM, 응답 캐시 끔, PokeAPI 요청 없음, 계측 켬)
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["LLM_CACHE"] = "0"
+os.environ["POKEAPI_OFFLINE"] = "1"
+os.environ["TELEMETRY"] = "1"
+
+try:
+    import resource   # 최대 RSS (Windows에는 없음)
+except ImportError:
+    resource = None
+
+import telemetry
+import profiler
+import battle_log
+import llm_provider
+from Calculator import stat_estimator, move_loader
+from battle_codes import SPECIES, MOVES
+from battle_session import BattleSession
+from battle import analyze_battle_turn, ADVISOR_MODES
+from entry import analyze_entry_strategy, extract_selection
+
+# =========================================================
+# [오프라인 재생 벤치마크] 선출 분석 -> 선출 반영 -> 턴 분석 반복을 실제 코드 경로 그대로
+# - LLM: llm_provider 가짜 제공자 (--llm-latency로 응답 지연 흉내)
+# - PokeAPI: benchmarks/base_stats.json / moves.json을 캐시에 미리 넣고 네트워크 요청 없음
+# - 입력: 채팅 대본(.txt) 또는 배틀 이벤트 로그(.jsonl, record_input 이벤트)
+# - 결과: 턴 지연 p50/p95/최대, 계산기 호출 수, 메모리 최대치 -> 기준선(baseline.json)과 비교
+#   (기준선은 방식 x 가짜 LLM 지연 x 시나리오 묶음별로 따로 기록, 조건이 다르면 비교하지 않음)
+# - 탐색 워커(프로세스 풀) 안의 계산기 호출/메모리는 세지 않음 (메인 프로세스 기준)
+# =========================================================
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+SCENARIO_DIR = os.path.join(BENCH_DIR, "scenarios")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# 기준선 대비 허용 증가율 (+ 아주 작은 값의 흔들림을 무시하는 절대 여유)
+LATENCY_TOLERANCE = 0.25
+LATENCY_SLACK = 0.05      # 초
+CALC_TOLERANCE = 0.10
+MEMORY_TOLERANCE = 0.20
+MEMORY_SLACK = 16.0       # MB
+
+# (항목, 허용 증가율, 절대 여유)
+CHECKS = (
+    ("p50_s", LATENCY_TOLERANCE, LATENCY_SLACK),
+    ("p95_s", LATENCY_TOLERANCE, LATENCY_SLACK),
+    ("entry_s", LATENCY_TOLERANCE, LATENCY_SLACK),
+    ("calc_calls_per_turn", CALC_TOLERANCE, 1.0),
+    ("rss_peak_mb", MEMORY_TOLERANCE, MEMORY_SLACK),
+    ("py_peak_mb", MEMORY_TOLERANCE, MEMORY_SLACK),
+)
+
+# ---------------------------------------------------------
+# [입력] 대본 / 이벤트 로그 -> 시나리오
+# ---------------------------------------------------------
+
+def load_transcript(path):
+    """
+    채팅 대본 (.txt)
+      # 주석
+      @opponents Koraidon, Ting-Lu, ...   (선출 분석 입력)
+      @lead Koraidon                      (상대 선봉, 없으면 첫 번째)
+      @team my_team.txt                   (내 파티 파일, 없으면 기본)
+      ! 상대 flareblitz 써서 내 피 -55%    (한 줄 = 채팅 한 번, "!" = 상대가 먼저 행동, "^" = 내가 먼저, 없으면 모름)
+    """
+    scenario = {"name": os.path.splitext(os.path.basename(path))[0], "opponents": [], "lead": None,
+                "team": None, "turns": []}
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("@"):
+                key, _, value = line[1:].partition(" ")
+                if key == "opponents":
+                    scenario["opponents"] = [n.strip() for n in value.split(",") if n.strip()]
+                elif key in ("lead", "team"):
+                    scenario[key] = value.strip()
+                continue
+            opp_first = {"!": True, "^": False}.get(line[0])
+            scenario["turns"].append((line.lstrip("!^").strip(), opp_first))
+    return scenario
+
+
+def load_event_log(path):
+    """ 배틀 이벤트 로그 (.jsonl): initialize_opponent / 첫 상대 set_active / record_input만 사용 """
+    scenario = {"name": os.path.splitext(os.path.basename(path))[0], "opponents": [], "lead": None,
+                "team": None, "turns": []}
+    for event in battle_log.read_events(path):
+        if event.kind == "initialize_opponent":
+            scenario["opponents"] = list(event.args["roster_list"])
+        elif event.kind == "set_active" and event.args.get("side") == "opp" and scenario["lead"] is None:
+            scenario["lead"] = event.args["pokemon_name"]
+        elif event.kind == "record_input":
+            scenario["turns"].append((event.args["user_input"], event.args.get("opp_moved_first")))
+    return scenario
+
+
+def load_scenario(path):
+    return load_event_log(path) if path.endswith(".jsonl") else load_transcript(path)
+
+
+def seed_local_data():
+    """ 종족값/기술 데이터를 로컬 파일에서 캐시에 채움 (디스크 캐시 파일은 건드리지 않음) """
+    with open(os.path.join(BENCH_DIR, "base_stats.json"), "r", encoding="utf-8") as f:
+        for name, stats in json.load(f).items():
+            stat_estimator.POKEAPI_CACHE[SPECIES.intern(name)] = stats
+    with open(os.path.join(BENCH_DIR, "moves.json"), "r", encoding="utf-8") as f:
+        for name, data in json.load(f).items():
+            move_loader._MEMORY_CACHE.setdefault(MOVES.intern(name), data)
+
+# ---------------------------------------------------------
+# [실행]
+# ---------------------------------------------------------
+
+def _percentile(values, q):
+    """ 최근접 순위 분위수 """
+    if not values: return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _calc_calls():
+    return telemetry.counters().get(("calc_calls", ()), 0)
+
+
+def _rss_peak_mb():
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024   # macOS는 바이트, 리눅스는 KB
+
+
+def run_scenario(scenario, mode, log_dir):
+    """ 시나리오 한 번 실행. Returns: 턴별 기록 포함 결과 dict """
+    session = BattleSession(f"bench-{scenario['name']}", scenario["team"] or "my_team.txt")
+    battle = session.battle
+    battle.advisor_mode = mode
+
+    # 1. 선출 분석 -> 선출 반영 (app.py와 같은 순서)
+    calc_before = _calc_calls()
+    start = time.perf_counter()
+    battle_log.start(battle, log_dir=log_dir)
+    battle.initialize_opponent(scenario["opponents"])
+    analysis, _ = analyze_entry_strategy(scenario["opponents"], session.party)
+    selection, source = extract_selection(analysis, session.party.team)
+    if selection:
+        battle.set_my_selection(selection)
+    battle.set_active("opp", scenario["lead"] or scenario["opponents"][0])
+    battle.commit("벤치마크 시작")
+    entry_s = time.perf_counter() - start
+
+    # 2. 턴 분석 반복
+    turns = []
+    for user_input, opp_first in scenario["turns"]:
+        calc_turn = _calc_calls()
+        start = time.perf_counter()
+        _, parser_tokens, analyze_tokens = analyze_battle_turn(user_input, opp_first, battle, mode=mode)
+        turns.append({
+            "input": user_input,
+            "latency_s": time.perf_counter() - start,
+            "calc_calls": _calc_calls() - calc_turn,
+            "llm_calls": battle.turn_metrics[-1]["llm_calls"] if battle.turn_metrics else 0,
+            "speculation": battle.turn_metrics[-1]["speculation"] if battle.turn_metrics else None,
+        })
+    session.close()
+
+    latencies = [t["latency_s"] for t in turns]
+    calc_turns = sum(t["calc_calls"] for t in turns)
+    return {
+        "mode": mode,
+        "selection": selection,
+        "selection_source": source,
+        "entry_s": entry_s,
+        "turns": len(turns),
+        "p50_s": _percentile(latencies, 0.50),
+        "p95_s": _percentile(latencies, 0.95),
+        "max_s": max(latencies, default=0.0),
+        "mean_s": sum(latencies) / len(latencies) if latencies else 0.0,
+        "calc_calls": _calc_calls() - calc_before,
+        "calc_calls_per_turn": calc_turns / len(turns) if turns else 0.0,
+        "llm_calls": sum(t["llm_calls"] for t in turns),
+        "turn_detail": turns,
+    }
+
+
+def _new_totals():
+    return {"latencies": [], "calc": 0, "turns": 0, "entry": []}
+
+
+def _summary(acc):
+    """ 여러 시나리오 실행을 합친 지연/계산 요약 """
+    latencies, turns = acc["latencies"], acc["turns"]
+    return {
+        "turns": turns,
+        "p50_s": _percentile(latencies, 0.50),
+        "p95_s": _percentile(latencies, 0.95),
+        "max_s": max(latencies, default=0.0),
+        "entry_s": sum(acc["entry"]) / len(acc["entry"]) if acc["entry"] else 0.0,
+        "calc_calls_per_turn": acc["calc"] / turns if turns else 0.0,
+    }
+
+
+def run_benchmark(paths, modes, repeat=1, warmup=1, llm_latency=0.0, trace_memory=False, profile_mode=None):
+    """ 모든 시나리오 x 방식을 repeat번 실행. Returns: 보고서 dict """
+    seed_local_data()
+    llm_provider.set_provider(llm_provider.FakeChatModel(latency=llm_latency), cache=None)
+    scenarios = [load_scenario(p) for p in paths]
+    report = {"env": {"python": sys.version.split()[0], "modes": list(modes), "repeat": repeat,
+                      "llm_latency": llm_latency, "scenario_set": sorted(s["name"] for s in scenarios)},
+              "scenarios": {}}
+
+    with tempfile.TemporaryDirectory(prefix="bench-logs-") as log_dir:
+        # 워밍업: 프로세스 풀 생성/모듈 첫 로드 비용을 측정에서 뺌
+        for _ in range(warmup):
+            if scenarios: run_scenario(scenarios[0], modes[0], log_dir)
+
+        if trace_memory:
+            tracemalloc.start()
+        totals = {}   # 방식별 / 전체(None) 합계
+        with profiler.profiling(profile_mode):
+            for scenario in scenarios:
+                for mode in modes:
+                    runs = [run_scenario(scenario, mode, log_dir) for _ in range(repeat)]
+                    latencies = [t["latency_s"] for r in runs for t in r["turn_detail"]]
+                    result = dict(runs[-1])
+                    result.update(
+                        p50_s=_percentile(latencies, 0.50), p95_s=_percentile(latencies, 0.95),
+                        max_s=max(latencies, default=0.0),
+                        entry_s=sum(r["entry_s"] for r in runs) / len(runs),
+                    )
+                    report["scenarios"][f"{scenario['name']}/{mode}"] = result
+                    for scope in (mode, None):
+                        acc = totals.setdefault(scope, _new_totals())
+                        acc["latencies"] += latencies
+                        acc["calc"] += sum(t["calc_calls"] for r in runs for t in r["turn_detail"])
+                        acc["turns"] += sum(r["turns"] for r in runs)
+                        acc["entry"] += [r["entry_s"] for r in runs]
+
+        py_peak = None
+        if trace_memory:
+            py_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+
+    memory = {"rss_peak_mb": _rss_peak_mb(), "py_peak_mb": py_peak}
+    report["modes"] = {mode: dict(_summary(acc), **memory) for mode, acc in totals.items() if mode is not None}
+    report["overall"] = dict(_summary(totals.get(None, _new_totals())), **memory)
+    report["profiles"] = [r for r in profiler.results()] if profile_mode else []
+    return report
+
+# ---------------------------------------------------------
+# [기준선 비교]
+# ---------------------------------------------------------
+
+def baseline_key(mode, llm_latency, scenario_set):
+    """ 기준선 항목 키: 방식 / 가짜 LLM 지연 / 시나리오 묶음이 모두 같아야 비교 """
+    return f"{mode}@{llm_latency:g}s:{','.join(scenario_set)}"
+
+
+def compare(report, baseline):
+    """
+    방식별로 같은 조건(baseline_key)에서 기록한 항목과만 비교하고, 없으면 경고 후 건너뜀
+    Returns: ([(범위, 항목, 기준값, 현재값, 한계값)], 비교한 방식 목록)
+    """
+    env = report["env"]
+    entries = baseline.get("runs", {})
+    regressions, checked = [], []
+    for mode, current in report["modes"].items():
+        key = baseline_key(mode, env["llm_latency"], env["scenario_set"])
+        entry = entries.get(key)
+        if entry is None:
+            print(f"⚠️ 기준선 없음 ({key}) -> 비교 건너뜀 (--save-baseline으로 기록)")
+            continue
+        if entry["env"].get("python") != env["python"]:
+            print(f"⚠️ 기준선과 Python 버전이 다름 ({entry['env'].get('python')} -> {env['python']}), 참고용으로만 보세요")
+        checked.append(mode)
+        pairs = [(mode, current, entry.get("overall", {}))]
+        pairs += [(name, result, entry.get("scenarios", {}).get(name, {}))
+                  for name, result in report["scenarios"].items() if name.endswith(f"/{mode}")]
+        for scope, cur, base in pairs:
+            for check, tolerance, slack in CHECKS:
+                if cur.get(check) is None or base.get(check) is None:
+                    continue
+                limit = base[check] * (1 + tolerance) + slack
+                if cur[check] > limit:
+                    regressions.append((scope, check, base[check], cur[check], limit))
+    return regressions, checked
+
+
+def baseline_entries(report):
+    """ 기준선 파일에 남길 값만 (턴별 상세 제외) -> {baseline_key: 항목} (방식마다 하나) """
+    keys = ("turns", "entry_s", "p50_s", "p95_s", "max_s", "calc_calls_per_turn", "rss_peak_mb", "py_peak_mb")
+    env = report["env"]
+    entries = {}
+    for mode, summary in report["modes"].items():
+        entries[baseline_key(mode, env["llm_latency"], env["scenario_set"])] = {
+            "env": dict(env, modes=[mode]),
+            "overall": {k: summary.get(k) for k in keys},
+            "scenarios": {name: {k: r.get(k) for k in keys}
+                          for name, r in report["scenarios"].items() if name.endswith(f"/{mode}")},
+        }
+    return entries
+
+
+def load_baseline(path):
+    """ 기준선 파일 (없으면 빈 것). 방식별 키가 없는 옛 형식은 조건을 알 수 없으므로 무시 """
+    if not os.path.exists(path):
+        return {"runs": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "runs" not in data:
+        print(f"⚠️ 옛 형식 기준선 ({path}) -> 무시합니다. --save-baseline으로 다시 기록하세요")
+        return {"runs": {}}
+    return data
+
+
+def print_report(report):
+    print("\n📊 [벤치마크 결과]")
+    print(f"{'시나리오/방식':<34} {'턴':>3} {'선출(s)':>8} {'p50(s)':>7} {'p95(s)':>7} {'최대(s)':>7} {'계산/턴':>8}")
+    for name, r in report["scenarios"].items():
+        print(f"{name:<34} {r['turns']:>3} {r['entry_s']:>8.3f} {r['p50_s']:>7.3f} {r['p95_s']:>7.3f} "
+              f"{r['max_s']:>7.3f} {r['calc_calls_per_turn']:>8.1f}")
+    o = report["overall"]
+    mem = f"RSS 최대 {o['rss_peak_mb']:.1f}MB" if o["rss_peak_mb"] is not None else "RSS -"
+    if o["py_peak_mb"] is not None: mem += f" / Python 힙 최대 {o['py_peak_mb']:.1f}MB"
+    print(f"{'전체':<34} {o['turns']:>3} {o['entry_s']:>8.3f} {o['p50_s']:>7.3f} {o['p95_s']:>7.3f} "
+          f"{o['max_s']:>7.3f} {o['calc_calls_per_turn']:>8.1f}")
+    print(f"💾 {mem}")
+    for p in report.get("profiles", []):
+        print(f"🔬 {p['name']} ({p['mode']}, {p['seconds']:.2f}초): {', '.join(p['files'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="오프라인 재생 벤치마크 (가짜 LLM + 로컬 데이터)")
+    parser.add_argument("scenarios", nargs="*", help="대본(.txt) 또는 이벤트 로그(.jsonl). 없으면 benchmarks/scenarios 전체")
+    parser.add_argument("--mode", default="sequential", help=f"턴 분석 방식 ({' / '.join(ADVISOR_MODES)} / all)")
+    parser.add_argument("--repeat", type=int, default=1, help="시나리오별 반복 횟수")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 워밍업 실행 횟수")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="가짜 LLM 응답 지연 (초)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Python 힙 최대치 측정 (느려짐)")
+    parser.add_argument("--profile", choices=profiler.MODES, help="턴/선출 분석 프로파일 저장")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="비교할 기준선 파일")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준선으로 저장")
+    parser.add_argument("--output", help="전체 결과(JSON) 저장 경로")
+    args = parser.parse_args(argv)
+
+    paths = args.scenarios or sorted(glob.glob(os.path.join(SCENARIO_DIR, "*.txt")) +
+                                     glob.glob(os.path.join(SCENARIO_DIR, "*.jsonl")))
+    if not paths:
+        print(f"❌ 시나리오가 없습니다: {SCENARIO_DIR}")
+        return 2
+    modes = ADVISOR_MODES if args.mode == "all" else (args.mode,)
+    if any(m not in ADVISOR_MODES for m in modes):
+        print(f"❌ 알 수 없는 방식: {args.mode}")
+        return 2
+
+    report = run_benchmark(paths, modes, repeat=args.repeat, warmup=args.warmup, llm_latency=args.llm_latency,
+                           trace_memory=args.tracemalloc, profile_mode=args.profile)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        # 이번에 돌린 방식/조건의 항목만 갈아 끼움 (다른 조건의 기준선은 유지)
+        baseline["runs"].update(baseline_entries(report))
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"📌 기준선 저장: {args.baseline} ({', '.join(report['modes'])})")
+        return 0
+
+    if not baseline["runs"]:
+        print("ℹ️ 기준선이 없어 비교를 건너뜁니다 (--save-baseline으로 생성)")
+        return 0
+    regressions, checked = compare(report, baseline)
+    if regressions:
+        print("\n❌ [성능 회귀]")
+        for scope, key, base, current, limit in regressions:
+            print(f"  - {scope} {key}: {base:.3f} -> {current:.3f} (허용 {limit:.3f})")
+        return 1
+    if not checked:
+        print("\nℹ️ 같은 조건의 기준선이 없어 비교하지 않았습니다")
+        return 0
+    print(f"\n✅ 기준선 대비 회귀 없음 ({', '.join(checked)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# --- [모듈 임포트] ---
+import telemetry
+from Calculator.calculator import run_calculation, calculate_damage_math
+from Calculator.modifiers import compile_damage
+from Calculator.speed_checker import check_turn_order
+from Calculator.stat_estimator import estimate_stats
+from Calculator.move_loader import get_move_data
+from belief_tracker import calc_name
+from rag_retriever import get_usage
+
+# =========================================================
+# [계산 API 서버] UI 없이 HTTP/JSON으로 계산기 호출 (표준 라이브러리만 사용)
+# - POST /damage  : {"attacker", "defender", "move", "field"}           -> 데미지 계산 (run_calculation)
+# - POST /speed   : {"me", "opp", "my_move", "opp_move", "field"}        -> 턴 순서 (check_turn_order)
+# - POST /stats   : {"pokemon"}                                          -> Smogon 1순위 샘플 실능 (estimate_stats)
+# - POST /matchup : {"mine": [...], "opponents": [...], "field"}         -> 내 포켓몬 x 상대 최고 위력 기술 표
+# - GET  /health, GET /metrics (Prometheus 텍스트: 엔드포인트별 지연 포함)
+# - 포켓몬은 이름(문자열, 스탯은 Smogon 추정) 또는 계산기 스펙(dict, 비운 칸만 추정값으로 채움)
+#   기술은 이름(문자열) 또는 스펙(dict)
+# - 배치: 본문이 {"requests": [요청, ...]}면 결과도 같은 순서의 {"results": [...]} (실패한 항목만 {"error"})
+# - 같은 입력은 한 번만 계산: 끝난 결과는 LRU, 다른 요청이 계산 중이면 그 결과를 기다림 (coalescing)
+# - 기술/종족값 캐시, Smogon 통계는 이 프로세스의 모듈 전역을 그대로 사용 (한 번 데워지면 계속 재사용)
+# =========================================================
+
+HOST = os.getenv("CALC_API_HOST", "127.0.0.1")
+PORT = int(os.getenv("CALC_API_PORT", "8765"))
+MAX_BATCH = 5000                     # 요청 하나에 담을 수 있는 계산 수
+MAX_BODY_BYTES = 8 * 1024 * 1024
+RESULT_CACHE_SIZE = 8192             # 끝난 결과 LRU 크기
+MATCHUP_MOVES = 4                    # 기술을 안 준 포켓몬은 Smogon 채용률 상위에서 위력 있는 기술 최대 4개
+
+
+class ApiError(Exception):
+    """ 요청 내용이 잘못됨 (해당 항목만 실패 처리) """
+    pass
+
+# ---------------------------------------------------------
+# [1] 요청 합치기 (coalescing) + 결과 캐시
+# ---------------------------------------------------------
+
+class Coalescer:
+    """ key -> 결과. 끝난 결과는 LRU에서, 계산 중인 key는 먼저 시작한 쪽의 결과를 기다림 """
+    def __init__(self, size=RESULT_CACHE_SIZE):
+        self.size = size
+        self._done = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, compute):
+        with self._lock:
+            if key in self._done:
+                self._done.move_to_end(key)
+                telemetry.cache_event("calc_api", True)
+                return self._done[key]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            telemetry.count("api_coalesced")
+            return future.result()
+
+        telemetry.cache_event("calc_api", False)
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._done[key] = result
+            if len(self._done) > self.size:
+                self._done.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._done.clear()
+
+
+_coalescer = Coalescer()
+_estimates = {}          # 이름 -> estimate_stats 결과 (estimate_stats는 부를 때마다 통계 JSON을 다시 읽음)
+_estimates_lock = threading.Lock()
+
+# ---------------------------------------------------------
+# [2] 입력 -> 계산기 스펙
+# ---------------------------------------------------------
+
+def _estimate(name):
+    if not name:
+        return None
+    est = _estimates.get(name)
+    if est is None:
+        est = estimate_stats(name)
+        if est is not None:
+            with _estimates_lock:
+                _estimates[name] = est
+    return est
+
+
+def _object(value, field):
+    """ 없으면 {} / dict가 아니면 ApiError ("field": "rain" 같은 입력이 계산기 안에서 터지지 않도록) """
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ApiError(f"{field}: 객체(dict)가 필요합니다")
+    return value
+
+
+def _field_spec(item):
+    return _object(item.get("field"), "field")
+
+
+def _pokemon_spec(value, field):
+    """ 이름 또는 스펙 -> 계산기 스펙 (stats가 없으면 Smogon 1순위 샘플로 추정) """
+    if isinstance(value, str):
+        value = {"name": value}
+    if not isinstance(value, dict):
+        raise ApiError(f"{field}: 포켓몬 이름 또는 스펙(dict)이 필요합니다")
+    for key in ("stats", "ranks", "screens"):
+        _object(value.get(key), f"{field}.{key}")
+    if not isinstance(value.get("types") or [], list):
+        raise ApiError(f"{field}.types: 목록이 필요합니다")
+    spec = {'stats': None, 'ranks': {}, 'item': None, 'status': None, 'ability': None,
+            'types': [], 'is_terastal': False, 'screens': {}}
+    if not value.get("stats"):
+        est = _estimate(value.get("name"))
+        if est is None:
+            raise ApiError(f"{field}: 스탯을 추정할 수 없습니다 ({value.get('name')})")
+        spec['stats'] = est['stats']
+    spec.update({k: v for k, v in value.items() if k not in ("name", "moves") and v is not None})
+    return spec
+
+
+def _move_spec(value, field):
+    """ 기술 이름 또는 스펙 -> 계산기 기술 스펙 (스펙에 power가 없으면 기술 데이터로 채움) """
+    if isinstance(value, str):
+        value = {"name": value}
+    if not isinstance(value, dict) or not value.get("name"):
+        raise ApiError(f"{field}: 기술 이름 또는 스펙(dict)이 필요합니다")
+    if "power" in value:
+        spec = {"type": "Normal", "category": "Physical", "priority": 0}
+    else:
+        spec = dict(get_move_data(value["name"]))
+    spec.update(value)
+    return spec
+
+
+def _moves_of(value):
+    """ matchup 공격 측 기술 후보: 직접 준 기술, 없으면 Smogon 채용률 순 """
+    name = value if isinstance(value, str) else value.get("name")
+    names = None if isinstance(value, str) else value.get("moves")
+    if names is not None and not isinstance(names, list):
+        raise ApiError("moves: 목록이 필요합니다")
+    if not names:
+        names = [calc_name(m) for m, _ in (get_usage(name) or {}).get("Moves", [])]
+    moves = []
+    for move in names:
+        spec = _move_spec(move, "moves")
+        if spec.get("power", 0) > 0:
+            moves.append(spec)
+        if len(moves) >= MATCHUP_MOVES: break
+    return moves
+
+
+def _label(value):
+    return value if isinstance(value, str) else value.get("name", "?")
+
+# ---------------------------------------------------------
+# [3] 엔드포인트 (항목 하나 -> 결과 dict)
+# ---------------------------------------------------------
+
+def calc_damage(item):
+    return run_calculation(
+        _pokemon_spec(item.get("attacker"), "attacker"),
+        _pokemon_spec(item.get("defender"), "defender"),
+        _move_spec(item.get("move"), "move"),
+        _field_spec(item),
+    )
+
+
+def calc_speed(item):
+    my_move = item.get("my_move")
+    opp_move = item.get("opp_move")
+    return check_turn_order(
+        _pokemon_spec(item.get("me"), "me"),
+        _pokemon_spec(item.get("opp"), "opp"),
+        _field_spec(item),
+        _move_spec(my_move, "my_move") if my_move else {"priority": 0},
+        _move_spec(opp_move, "opp_move") if opp_move else None,
+    )
+
+
+def calc_stats(item):
+    name = item.get("pokemon") or item.get("name")
+    est = _estimate(name)
+    if est is None:
+        raise ApiError(f"스탯을 추정할 수 없습니다 ({name})")
+    return est
+
+
+def _max_damage(result):
+    return int(result["damage_range"].split("~")[1])
+
+
+def calc_matchup(item):
+    """ 내 포켓몬(행) x 상대(열): 가장 아픈 기술의 피해 범위/확정수 + 선후공 """
+    mine, opponents = item.get("mine") or [], item.get("opponents") or []
+    if not isinstance(mine, list) or not isinstance(opponents, list):
+        raise ApiError("mine / opponents는 목록이어야 합니다")
+    field = _field_spec(item)
+    defenders = [(_label(o), _pokemon_spec(o, "opponents")) for o in opponents]
+
+    rows = []
+    for value in mine:
+        att = _pokemon_spec(value, "mine")
+        moves = _moves_of(value)
+        cells = []
+        for opp_name, dfn in defenders:
+            if not moves:
+                cells.append({"defender": opp_name, "move": None})
+                continue
+            chain = compile_damage(att, dfn, field)   # 대면마다 한 번, 기술 후보 전부에 공유
+            best_move, best = max(((m, calculate_damage_math(att, dfn, m, field, chain)) for m in moves),
+                                  key=lambda pair: _max_damage(pair[1]))
+            order = check_turn_order(att, dfn, field, best_move, {"priority": 0})
+            cells.append({
+                "defender": opp_name, "move": best_move["name"],
+                "percent_range": best["percent_range"], "ko_result": best["ko_result"],
+                "effectiveness": best["effectiveness"], "is_my_turn": order["is_my_turn"],
+            })
+        rows.append({"attacker": _label(value), "cells": cells})
+    return {"rows": rows}
+
+
+ENDPOINTS = {
+    "/damage": calc_damage,
+    "/speed": calc_speed,
+    "/stats": calc_stats,
+    "/matchup": calc_matchup,
+}
+
+
+def _run_item(endpoint, func, item):
+    """ 항목 하나 실행 (같은 입력은 Coalescer가 한 번만 계산) """
+    if not isinstance(item, dict):
+        raise ApiError("요청 항목은 JSON 객체여야 합니다")
+    key = (endpoint, json.dumps(item, sort_keys=True, ensure_ascii=False))
+    return _coalescer.run(key, lambda: func(item))
+
+
+# 입력이 잘못돼서 난 오류 (그 외 예외는 서버 쪽 문제로 보고 500)
+INPUT_ERRORS = (ApiError, KeyError, TypeError, ValueError)
+
+
+def handle(endpoint, body):
+    """
+    본문(dict) -> (HTTP 상태, 응답 dict)
+    배치({"requests": [...]})는 항목별로 성공/실패를 따로 담고 200 (어떤 예외든 그 항목만 실패)
+    """
+    func = ENDPOINTS[endpoint]
+    batch = body.get("requests") if isinstance(body, dict) else None
+    if batch is None:
+        try:
+            return 200, {"result": _run_item(endpoint, func, body)}
+        except Exception as e:
+            telemetry.count("api_errors", endpoint=endpoint)
+            return (422 if isinstance(e, INPUT_ERRORS) else 500), {"error": _error_text(e)}
+
+    if not isinstance(batch, list):
+        return 400, {"error": "requests는 목록이어야 합니다"}
+    if len(batch) > MAX_BATCH:
+        return 413, {"error": f"배치가 너무 큽니다 ({len(batch)} > {MAX_BATCH})"}
+    results = []
+    start = time.perf_counter()
+    for item in batch:
+        try:
+            results.append({"result": _run_item(endpoint, func, item)})
+        except Exception as e:
+            telemetry.count("api_errors", endpoint=endpoint)
+            results.append({"error": _error_text(e)})
+    elapsed = time.perf_counter() - start
+    telemetry.count("api_items", len(batch), endpoint=endpoint)
+    telemetry.observe("api_batch_seconds", elapsed, endpoint=endpoint)
+    return 200, {"results": results, "count": len(results), "seconds": round(elapsed, 6)}
+
+
+def _error_text(e):
+    return str(e) if isinstance(e, ApiError) else f"{type(e).__name__}: {e}"
+
+# ---------------------------------------------------------
+# [4] HTTP
+# ---------------------------------------------------------
+
+class CalcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive (연결 재사용)
+    server_version = "PokeCalcAPI/1.0"
+    quiet = True
+
+    def _send(self, status, payload, content_type="application/json; charset=utf-8"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "endpoints": sorted(ENDPOINTS)})
+        elif self.path == "/metrics":
+            self._send(200, telemetry.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": f"없는 경로: {self.path}"})
+
+    def do_POST(self):
+        endpoint = self.path.split("?", 1)[0]
+        if endpoint not in ENDPOINTS:
+            self._send(404, {"error": f"없는 경로: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0: raise ValueError(length)
+        except ValueError:
+            # 본문 길이를 모르면 다음 요청 경계도 알 수 없으므로 연결을 닫음
+            self.close_connection = True
+            self._send(400, {"error": f"Content-Length가 올바르지 않습니다: {self.headers.get('Content-Length')}"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send(413, {"error": "본문이 너무 큽니다"})
+            return
+        with telemetry.span("api_request", endpoint=endpoint):
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, UnicodeDecodeError):
+                self._send(400, {"error": "JSON 형식이 아닙니다"})
+                return
+            try:
+                status, payload = handle(endpoint, body)
+            except Exception as e:
+                # 응답 없이 연결이 끊기지 않도록 마지막 안전망
+                print(f"❌ 계산 API 오류 ({endpoint}): {type(e).__name__}: {e}")
+                telemetry.count("api_errors", endpoint=endpoint)
+                status, payload = 500, {"error": _error_text(e)}
+            self._send(status, payload)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host=HOST, port=PORT, quiet=True):
+    """ 서버 객체만 만듦 (port=0이면 빈 포트 자동 선택, 테스트/다른 도구에서 스레드로 띄울 때) """
+    handler = type("Handler", (CalcHandler,), {"quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="계산기 HTTP/JSON API 서버")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--warm", nargs="*", default=[], help="미리 스탯을 추정해 둘 포켓몬 이름")
+    parser.add_argument("--verbose", action="store_true", help="요청마다 접근 로그 출력")
+    args = parser.parse_args(argv)
+
+    for name in args.warm:
+        _estimate(name)
+    server = make_server(args.host, args.port, quiet=not args.verbose)
+    host, port = server.server_address[:2]
+    print(f"🧮 계산 API 서버: http://{host}:{port} ({', '.join(sorted(ENDPOINTS))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
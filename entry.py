@@ -1,11 +1,15 @@
 import os
+import re
 import time
 import json
 import ast
+import queue
+import threading
 from dotenv import load_dotenv
 
 # --- [모듈 임포트] ---
 from rag_retriever import get_opponent_party_report, SMOGON_DB, LEAD_STATS
+from battle_codes import SPECIES, to_id
 from Battle_Preparing.user_party import my_party
 
 # 계산기 모듈
@@ -15,23 +19,20 @@ from Calculator.stat_estimator import estimate_stats
 from Calculator.move_loader import get_move_data # [NEW] API기반 기술 로더
 
 # LangChain
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
+import telemetry
+from profiler import profiled
+from llm_provider import llm   # 제공자 선택(gemini/fake/replay) + 응답 캐시. API 키는 첫 호출 때 확인
 
 # 1. 환경 설정
 load_dotenv()
-if not os.getenv("GOOGLE_API_KEY"):
-    raise ValueError("GOOGLE_API_KEY가 .env 파일에 설정되지 않았습니다.")
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-3-flash-preview", 
-    temperature=0.1, 
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
 
 # --------------------------------------------------------------------------
 # [Helper 0] 토큰 정보 추출 함수
 # --------------------------------------------------------------------------
+# 토큰 리스트 순서 ([입력, 출력, 합계, 캐시 적중 입력])
+TOKEN_KEYS = ("input_tokens", "output_tokens", "total_tokens", "cached_tokens")
+
 def get_token_info(response):
     """LangChain 응답 객체에서 토큰 사용량을 추출합니다."""
     try:
@@ -42,14 +43,17 @@ def get_token_info(response):
             usage = response.response_metadata['usage_metadata']
             
         if usage:
+            # 앞부분이 같은 프롬프트는 Gemini가 캐시에서 읽음 (cache_read: 입력 토큰 중 캐시 적중분)
+            details = usage.get('input_token_details') or {}
             return {
                 "input_tokens": usage.get('input_tokens', 0),
                 "output_tokens": usage.get('output_tokens', 0),
-                "total_tokens": usage.get('total_tokens', 0)
+                "total_tokens": usage.get('total_tokens', 0),
+                "cached_tokens": details.get('cache_read', 0) or 0
             }
     except Exception:
         pass
-    return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
 
 # --------------------------------------------------------------------------
 # [Helper 1] 시뮬레이션 실행 함수 (수정됨)
@@ -61,7 +65,7 @@ def run_simulation(my_party_data, opponent_list):
     report = "=== ⚔️ 선봉 대면 시뮬레이션 (Simulation Report) ===\n"
     
     # 1. 상대 선봉 후보 선정 (Top 3)
-    sorted_opps = sorted(opponent_list, key=lambda x: LEAD_STATS.get(x, 0), reverse=True)[:3]
+    sorted_opps = LEAD_STATS.top_in_roster(opponent_list, 3)
     report += f"🎯 상대 유력 선봉 TOP 3: {', '.join(sorted_opps)}\n\n"
 
     for my_name, my_data in my_party_data.items():
@@ -166,6 +170,106 @@ def extract_clean_content(response):
     except Exception as e:
         return f"Error: {e}"
 
+# --------------------------------------------------------------------------
+# [Helper 3] 스트리밍 응답 (첫 토큰까지 시간 / 전체 시간 / 토큰 사용량)
+# --------------------------------------------------------------------------
+_STREAM_END = object()
+
+
+class LLMStream:
+    """
+    chain.stream() -> 텍스트 조각 이터레이터 (st.write_stream에 그대로 넘길 수 있음)
+    끝까지 읽으면 text / tokens([입력, 출력, 합계]) / ttft / latency가 채워지고 on_done(self)가 호출됩니다.
+    prefetch(pool)로 백그라운드에서 미리 받아 둘 수 있습니다. (추측 조언 모드)
+    """
+    def __init__(self, chain, variables, phase="llm", on_done=None):
+        self.chain = chain
+        self.variables = variables
+        self.phase = phase
+        self._callbacks = [on_done] if on_done else []
+        self._lock = threading.Lock()
+        self.parts = []
+        self.text = ""
+        self.tokens = [0] * len(TOKEN_KEYS)
+        self.ttft = None
+        self.latency = None
+        self.done = False
+        self._queue = None
+
+    @classmethod
+    def from_text(cls, text, tokens, phase="llm", latency=0.0, on_done=None):
+        """ 이미 받은 응답을 한 조각짜리 스트림으로 (스트리밍이 의미 없는 JSON 응답 등) """
+        stream = cls(None, None, phase, on_done)
+        stream.parts = [text]
+        stream._finish(text, tokens, latency, latency)
+        return stream
+
+    def _finish(self, text, tokens, ttft, latency):
+        with self._lock:
+            self.text, self.ttft, self.latency = text, ttft, latency
+            self.tokens[:] = tokens     # 미리 넘겨준 토큰 리스트도 같이 채워지도록 제자리 갱신
+            self.done = True
+            callbacks, self._callbacks = self._callbacks, []
+        if self.chain is not None:   # from_text로 감싼 응답은 이미 호출한 쪽에서 기록함
+            telemetry.record_llm(self.phase, ttft, latency, dict(zip(TOKEN_KEYS, tokens)))
+        ttft_text = f"{ttft:.2f}초" if ttft is not None else "-"
+        print(f"⏱️ [{self.phase}] 첫 토큰 {ttft_text} / 전체 {latency:.2f}초 / 토큰 {tokens}")
+        for callback in callbacks: callback(self)
+
+    def then(self, callback):
+        """ 스트림이 끝나면 callback(self) 호출 (이미 끝났으면 바로 호출) """
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return self
+        callback(self)
+        return self
+
+    def _chunks(self):
+        start = time.perf_counter()
+        ttft, merged = None, None
+        try:
+            for chunk in self.chain.stream(self.variables):
+                merged = chunk if merged is None else merged + chunk   # usage_metadata는 마지막 조각에 옴
+                piece = extract_clean_content(chunk)
+                if not piece: continue
+                if ttft is None: ttft = time.perf_counter() - start
+                self.parts.append(piece)
+                yield piece
+        except Exception as e:
+            piece = f"\n❌ 스트리밍 중 오류: {e}"
+            self.parts.append(piece)
+            yield piece
+        info = get_token_info(merged)
+        self._finish("".join(self.parts), [info[k] for k in TOKEN_KEYS], ttft, time.perf_counter() - start)
+
+    def prefetch(self, pool):
+        """ 백그라운드 스레드에서 스트림을 미리 읽어 큐에 쌓음 """
+        self._queue = queue.Queue()
+
+        def pump():
+            for piece in self._chunks(): self._queue.put(piece)
+            self._queue.put(_STREAM_END)
+        pool.submit(pump)
+        return self
+
+    def __iter__(self):
+        if self.done:
+            yield from self.parts
+        elif self._queue is None:
+            yield from self._chunks()
+        else:
+            while True:
+                piece = self._queue.get()
+                if piece is _STREAM_END: break
+                yield piece
+
+    def result(self):
+        """ 끝까지 읽고 (text, tokens) """
+        for _ in self: pass
+        return self.text, self.tokens
+
+
 def parse_opponent_input(user_input):
     """
     Returns: (parsed_list, token_usage_dict)
@@ -179,10 +283,13 @@ def parse_opponent_input(user_input):
     매핑 예시: "날치머"->"Flutter Mane", "물라오스"->"Urshifu-Rapid-Strike", "망나뇽"->"Dragonite"
     """
     try:
+        start = time.perf_counter()
         response = llm.invoke(parser_template.format(user_input=user_input))
+        elapsed = time.perf_counter() - start
         
         # 토큰 정보 추출
         token_info = get_token_info(response)
+        telemetry.record_llm("entry_names", elapsed, elapsed, token_info)
 
         content = extract_clean_content(response)
         clean_content = content.replace("```json", "").replace("```python", "").replace("```", "").strip()
@@ -193,18 +300,21 @@ def parse_opponent_input(user_input):
         except:
             parsed_data = ast.literal_eval(clean_content)
 
+        # 표준 표기로 통일 (LLM이 'Flutter-Mane'처럼 써도 통계/배틀 상태와 같은 이름)
+        parsed_data = [SPECIES.canonical(name) for name in parsed_data]
         print(f"✅ 이름 변환 성공: {parsed_data}")
             
         return parsed_data, token_info
         
     except Exception as e:
         print(f"❌ 이름 변환 실패: {e}")
-        return [], {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        return [], dict.fromkeys(TOKEN_KEYS, 0)
 
-def format_my_party_info():
-    if not my_party.team: return "❌ 내 파티 정보 없음"
+def format_my_party_info(party=None):
+    party = party or my_party
+    if not party.team: return "❌ 내 파티 정보 없음"
     text = "=== 🛡️ 내 파티 상세 스펙 (My Team Stats) ===\n"
-    for name, data in my_party.team.items():
+    for name, data in party.team.items():
         stats = data['stats']
         stat_str = f"H{stats['hp']} A{stats['atk']} B{stats['def']} C{stats['spa']} D{stats['spd']} [S{stats['spe']}]"
         moves = ", ".join(data['moves'])
@@ -214,12 +324,16 @@ def format_my_party_info():
 # --------------------------------------------------------------------------
 # [Main Function] 분석 실행
 # --------------------------------------------------------------------------
-def analyze_entry_strategy(opponent_input):
+@profiled("entry_strategy")
+def analyze_entry_strategy(opponent_input, party=None, stream=False):
     """
     [Entry Phase] RAG + Calculator + SpeedChecker를 모두 결합한 최종 분석
-    Returns: (analysis_text, token_usage_dict)
+    party: 세션별 UserParty (없으면 전역 my_party)
+    stream: True면 분석 텍스트 대신 LLMStream을 반환 (다 읽은 뒤 token_usage_dict에 토큰이 더해짐)
+    Returns: (analysis_text 또는 LLMStream, token_usage_dict)
     """
-    total_tokens = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    party = party or my_party
+    total_tokens = dict.fromkeys(TOKEN_KEYS, 0)
     
     # 1. 입력 파싱 (입력이 문자열인 경우에만)
     if isinstance(opponent_input, str):
@@ -236,34 +350,24 @@ def analyze_entry_strategy(opponent_input):
     print(f"🔍 [Entry Phase] '{len(opponent_list)}'마리 분석 및 대면 시뮬레이션 실행 중...")
 
     # 1. 기본 정보 준비
-    my_team_context = format_my_party_info()
+    my_team_context = format_my_party_info(party)
     opp_team_context = get_opponent_party_report(opponent_list)
     
     # 2. 대면 시뮬레이션 실행 (계산기 가동)
     try:
-        simulation_report = run_simulation(my_party.team, opponent_list)
+        with telemetry.span("calc_batch", kind="entry_sim"):
+            simulation_report = run_simulation(party.team, opponent_list)
     except Exception as e:
         print(f"⚠️ 시뮬레이션 중 오류 발생 (건너뜀): {e}")
         simulation_report = "시뮬레이션 실패 (API 또는 데이터 오류)"
 
     # 3. 프롬프트 설계
+    # 매번 같은 부분(역할/분석 로직/양식 -> 내 파티)을 앞에, 매치마다 바뀌는 부분(상대/시뮬레이션)을 뒤에 둠
+    # -> 앞부분이 같은 요청은 Gemini 프롬프트 캐시에 걸려 입력 토큰 비용/지연이 줄어듦 (cached_tokens로 확인)
     template = """
     당신은 '포켓몬 랭크배틀(3vs3 싱글)' 전문 AI 코치입니다.
     제공된 **정확한 시뮬레이션 데이터(Simulation Report)**와 통계를 바탕으로 승리 전략을 수립하세요.
 
-    ---
-    [1. 내 파티 정보]
-    {my_team_context}
-    
-    [2. 상대 파티 정보 (Smogon 통계)]
-    {opp_team_context}
-    
-    [3. ⚔️ 선봉 대면 시뮬레이션 결과 (Fact Check)]
-    * 이 데이터는 실제 데미지 공식과 스피드 공식을 돌린 결과입니다. **절대적으로 신뢰하세요.**
-    * '🚀선공'은 내가 먼저 때린다는 뜻이고, '확정 1타'는 내가 상대를 한 방에 잡는다는 뜻입니다.
-    {simulation_report}
-    ---
-
     [분석 로직]
     1. **선봉 결정 (Lead Check)**: [3. 시뮬레이션 결과]를 보세요. 상대 유력 선봉(TOP 3)을 상대로 '🚀선공'이면서 '확정 1타'를 내는 포켓몬이 있다면 최고의 선봉입니다.
     2. **스피드 싸움**: 시뮬레이션에서 '🐢후공'이 뜨는 대면은 위험합니다. 기합의띠나 내구 보정이 없다면 피하세요.
@@ -284,25 +388,51 @@ def analyze_entry_strategy(opponent_input):
 
     3. **승리 플랜 (Game Plan)**:
        - (초반 운영과 주의해야 할 상대의 테라스탈/도구 변수를 3줄 요약)
+
+    리포트 맨 끝에는 추천 선출을 아래 형식의 한 줄로 덧붙이세요. (앱이 이 줄을 읽어 선출을 바로 반영합니다)
+    이름은 반드시 [1. 내 파티 정보]의 대괄호 안 이름 그대로 쓰세요: {party_keys}
+    SELECTION: {{"lead": "선봉 이름", "back": ["후속 이름", "후속 이름"]}}
+
+    ---
+    [1. 내 파티 정보]
+    {my_team_context}
+    
+    [2. 상대 파티 정보 (Smogon 통계)]
+    {opp_team_context}
+    
+    [3. ⚔️ 선봉 대면 시뮬레이션 결과 (Fact Check)]
+    * 이 데이터는 실제 데미지 공식과 스피드 공식을 돌린 결과입니다. **절대적으로 신뢰하세요.**
+    * '🚀선공'은 내가 먼저 때린다는 뜻이고, '확정 1타'는 내가 상대를 한 방에 잡는다는 뜻입니다.
+    {simulation_report}
+    ---
+    위 리포트 양식대로 답하세요.
     """
 
     prompt = PromptTemplate.from_template(template)
     chain = prompt | llm
+    variables = {
+        "party_keys": ", ".join(party.team),
+        "my_team_context": my_team_context,
+        "opp_team_context": opp_team_context,
+        "simulation_report": simulation_report
+    }
+
+    if stream:
+        def add_tokens(s):
+            for k, v in zip(TOKEN_KEYS, s.tokens): total_tokens[k] += v
+        return LLMStream(chain, variables, phase="entry_strategy", on_done=add_tokens), total_tokens
     
     try:
         start_time = time.time()
         
-        response = chain.invoke({
-            "my_team_context": my_team_context,
-            "opp_team_context": opp_team_context,
-            "simulation_report": simulation_report
-        })
+        response = chain.invoke(variables)
         
         end_time = time.time()
         print(f"⏱️ 분석 완료! (소요 시간: {end_time - start_time:.2f}초)")
 
         # 토큰 정보 추출
         main_tokens = get_token_info(response)
+        telemetry.record_llm("entry_strategy", end_time - start_time, end_time - start_time, main_tokens)
         
         # 토큰 누적
         for k in total_tokens: total_tokens[k] += main_tokens[k]
@@ -312,54 +442,62 @@ def analyze_entry_strategy(opponent_input):
     except Exception as e:
         return f"❌ Gemini 3.0 분석 중 오류 발생: {str(e)}", total_tokens
     
-def parse_recommended_selection(ai_response_text):
-    """
-    [New] AI의 분석 결과 텍스트에서 '나의 추천 선출' 3마리를 추출하여 리스트로 반환
-    Returns: (selection_list, token_usage_dict)
+# --------------------------------------------------------------------------
+# [선출 추출] 분석 리포트 끝의 SELECTION 줄 -> 내 파티 이름 리스트 (LLM 추가 호출 없음)
+# --------------------------------------------------------------------------
+_SELECTION_RE = re.compile(r"^[ \t*`-]*SELECTION\s*:\s*(\{.*\})[ \t*`]*$", re.M)
+
+def _match_party(names, party_keys):
+    """ 이름들을 내 파티 키로 맞추고 (표기/별칭 차이는 종족 ID로), 파티에 없는 이름/중복은 버림 (최대 3마리) """
+    by_id = {SPECIES.intern(k): k for k in party_keys}
+    selection = []
+    for name in names:
+        key = by_id.get(SPECIES.id_of(name))
+        if key and key not in selection: selection.append(key)
+    return selection[:3]
+
+def _local_selection(report_text, party_keys):
+    """ SELECTION 줄이 없거나 깨졌을 때: '세 마리 구성 요약' 줄 -> 리포트 전체 순으로 파티 이름을 찾음 """
+    m = re.search(r"세 마리 구성 요약\s*:?(.*)", report_text)
+    for text in ([m.group(1)] if m else []) + [report_text]:
+        compact = to_id(text)
+        found = sorted((compact.find(to_id(k)), k) for k in party_keys if to_id(k) in compact)
+        if len(found) >= min(3, len(party_keys)) or text is report_text:
+            return [k for _, k in found][:3]
+    return []
+
+def extract_selection(report_text, party_keys):
     """
-    print("🔄 AI 추천 선출을 파싱하여 상태에 반영 중...")
-    
-    parser_template = """
-    당신은 '포켓몬 선출 리포트 파서'입니다.
-    아래의 분석 리포트에서 AI가 추천한 **[나의 선출 포켓몬 3마리]**의 이름을 정확히 추출하세요.
-    반드시 **영어 공식 명칭**으로 변환해야 합니다.
-
-    [분석 리포트 내용]
-    {report_text}
-
-    [출력 형식 (JSON)]
-    {{
-        "lead": "PokemonName", (선봉)
-        "back1": "PokemonName", (후속1)
-        "back2": "PokemonName"  (후속2)
-    }}
+    분석 리포트에서 추천 선출 3마리를 추출 (첫 번째가 선봉)
+    1순위: 리포트 끝의 SELECTION JSON 줄 (내 파티 이름으로 검증)
+    2순위: 리포트 본문에서 로컬 추출
+    Returns: (selection_list, source)  source = "block" / "local" / None
     """
-    
-    prompt = PromptTemplate.from_template(parser_template)
-    chain = prompt | llm
-    
-    try:
-        response = chain.invoke({"report_text": ai_response_text})
-        
-        # 토큰 정보 추출
-        token_info = get_token_info(response)
-
-        content = extract_clean_content(response)
-        
-        # JSON 파싱
-        clean_json = content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean_json)
-        
-        # 리스트로 변환 (선봉, 후속1, 후속2)
-        selection = [data.get("lead"), data.get("back1"), data.get("back2")]
-        # None 제거
-        selection = [p for p in selection if p]
-        
-        return selection, token_info
-        
-    except Exception as e:
-        print(f"❌ 선출 파싱 실패: {e}")
-        return [], {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    party_keys = list(party_keys)
+    m = _SELECTION_RE.search(report_text or "")
+    if m:
+        try:
+            data = json.loads(m.group(1))
+            if not isinstance(data, dict):
+                raise TypeError(f"객체가 아님: {type(data).__name__}")
+            lead, back = data.get("lead"), data.get("back") or []
+            if isinstance(back, str):
+                back = [back]   # "back": "Incineroar" -> 한 마리 목록 (문자열을 글자로 쪼개지 않게)
+            if not isinstance(back, list) or not isinstance(lead, (str, type(None))):
+                raise TypeError(f"lead는 이름, back은 이름 목록이어야 합니다: {data}")
+            names = [lead] + back
+            selection = _match_party([n for n in names if n], party_keys)
+            if len(selection) == min(3, len(party_keys)):
+                return selection, "block"
+            print(f"⚠️ SELECTION 줄 검증 실패 (파티에 없는 이름 포함): {names}")
+        except (ValueError, AttributeError, TypeError) as e:
+            print(f"⚠️ SELECTION 줄 해석 실패: {e}")
+    selection = _local_selection(report_text or "", party_keys)
+    return selection, ("local" if selection else None)
+
+def strip_selection_block(report_text):
+    """ 화면 표시용: 기계용 SELECTION 줄 제거 """
+    return _SELECTION_RE.sub("", report_text or "").rstrip()
     
 # --------------------------------------------------------------------------
 # [실행 예시]
@@ -383,6 +521,6 @@ if __name__ == "__main__":
     print("\n" + result_text)
     print("\n📊 Total Token Usage in Main Analysis:", token_data)
     
-    # 추가 파싱 테스트
-    selection, sel_tokens = parse_recommended_selection(result_text)
-    print(f"\nSelecton: {selection}, Tokens: {sel_tokens}")
\ No newline at end of file
+    # 선출 추출 테스트 (LLM 호출 없음)
+    selection, source = extract_selection(result_text, my_party.team)
+    print(f"\nSelection: {selection} ({source})")
\ No newline at end of file
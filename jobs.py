@@ -0,0 +1,241 @@
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# --- [모듈 임포트] ---
+import telemetry
+import profiler
+import battle_log
+from entry import analyze_entry_strategy, parse_opponent_input, extract_selection, strip_selection_block, TOKEN_KEYS
+from battle import analyze_battle_turn
+
+# =========================================================
+# [작업 큐] Streamlit 화면 스레드 <-> 분석 워커
+# - 선출/턴 분석을 워커 풀에서 실행, 화면은 job id로 진행 상황을 폴링 (사이드바 등은 그동안 계속 반응)
+# - 같은 키의 작업이 아직 진행 중이면 새로 만들지 않고 그 job id를 돌려줌 (재실행/연타로 인한 중복 제출 방지)
+# - 취소: 대기 중이면 바로 취소, 실행 중이면 다음 확인 지점(스트림 조각 사이)에서 멈춤
+# - 같은 세션의 작업은 session.lock으로 한 번에 하나씩 (상태를 동시에 바꾸지 않도록)
+# =========================================================
+
+JOB_WORKERS = 4
+MAX_FINISHED = 200      # 끝난 작업을 보관할 개수 (오래된 것부터 정리)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """ 작업 하나의 상태. 워커가 progress/message/parts를 갱신하고 화면은 읽기만 함 """
+    def __init__(self, job_id, kind, key=None):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "대기 중"
+        self.parts = []          # 스트리밍 중간 결과 (폴링 때 지금까지 받은 글을 보여 줌)
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    @property
+    def elapsed(self):
+        if self.started is None: return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def report(self, progress=None, message=None):
+        if progress is not None: self.progress = progress
+        if message is not None: self.message = message
+
+    def check_cancelled(self):
+        """ 워커 쪽 확인 지점: 취소 요청이 있으면 여기서 멈춤 """
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+class JobQueue:
+    """ job id -> Job. submit()은 바로 돌아오고 실제 실행은 워커 스레드에서 """
+    def __init__(self, workers=JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._inflight = {}     # 중복 제거 키 -> 진행 중인 job id
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, key=None, **kwargs):
+        """
+        func(job, *args, **kwargs)를 워커에서 실행
+        key: 같은 키의 작업이 진행 중이면 새로 만들지 않고 그 job id 반환
+        Returns: job id
+        """
+        with self._lock:
+            if key is not None:
+                existing = self._jobs.get(self._inflight.get(key))
+                if existing is not None and not existing.done:
+                    telemetry.count("jobs_deduplicated", kind=kind)
+                    return existing.id
+            job = Job(uuid.uuid4().hex[:12], kind, key)
+            self._jobs[job.id] = job
+            if key is not None: self._inflight[key] = job.id
+            self._prune()
+        telemetry.count("jobs_submitted", kind=kind)
+        job.future = self._pool.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+            return
+        job.status, job.started = RUNNING, time.time()
+        telemetry.observe("job_wait_seconds", job.started - job.created, kind=job.kind)
+        status = DONE
+        try:
+            job.result = func(job, *args, **kwargs)
+            if job.cancelled: status = CANCELLED
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = FAILED
+            traceback.print_exc()
+        self._finish(job, status)
+
+    def _finish(self, job, status):
+        with self._lock:
+            if job.done: return
+            job.status = status
+            job.finished = time.time()
+            if status == DONE: job.report(1.0, "완료")
+            elif status == CANCELLED: job.report(message="취소됨")
+            else: job.report(message=f"실패: {job.error}")
+            if job.key is not None and self._inflight.get(job.key) == job.id:
+                del self._inflight[job.key]
+        telemetry.observe("job_seconds", job.elapsed, kind=job.kind, status=status)
+        print(f"🧵 [{job.kind}] 작업 {job.id} {status} ({job.elapsed:.2f}초)")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def cancel(self, job_id):
+        """ Returns: 취소 요청을 보냈으면 True (이미 끝난 작업이면 False) """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():   # 아직 시작 전 -> 바로 정리
+            self._finish(job, CANCELLED)
+        return True
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job.done]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self._jobs[jid]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_queue():
+    """ 프로세스 전체에서 하나 (Streamlit의 모든 세션이 공유) """
+    global _QUEUE
+    if _QUEUE is None:
+        with _QUEUE_LOCK:
+            if _QUEUE is None:
+                _QUEUE = JobQueue()
+    return _QUEUE
+
+# ---------------------------------------------------------
+# [분석 작업] app.py가 제출하는 작업 본문 (워커 스레드에서 실행)
+# ---------------------------------------------------------
+
+def _drain(job, stream, progress, message):
+    """ LLMStream을 읽으면서 조각마다 job.parts에 쌓고 취소 확인 """
+    job.report(progress, message)
+    for piece in stream:
+        job.parts.append(piece)
+        job.check_cancelled()
+    return stream.text
+
+
+def run_entry_job(job, session, entry_input, profile_mode=None):
+    """ 이름 변환 -> 배틀 로그 시작 -> 선출 분석(스트리밍) -> 추천 선출 반영 """
+    with session.lock, profiler.profiling(profile_mode):
+        job.report(0.05, "상대 이름 변환 중")
+        opp_list, t1 = parse_opponent_input(entry_input)
+        if not opp_list:
+            raise ValueError("입력 해석 실패")
+        job.check_cancelled()
+
+        battle = session.battle
+        log = battle_log.start(battle)
+        battle.initialize_opponent(opp_list)
+
+        job.report(0.2, "대면 시뮬레이션 / 통계 정리 중")
+        stream, t2 = analyze_entry_strategy(opp_list, session.party, stream=True)
+        analysis = _drain(job, stream, 0.4, "전략 분석 중")
+
+        selection, source = extract_selection(analysis, session.party.team)
+        if selection:
+            battle.set_my_selection(selection)
+            print(f"✅ 추천 선출 반영 ({source}): {selection}")
+    session.touch()
+
+    return {
+        "opponent_list": opp_list,
+        "battle_id": log.battle_id,
+        "analysis": strip_selection_block(analysis),
+        "selection": selection,
+        "tokens": {k: t1.get(k, 0) + t2.get(k, 0) for k in TOKEN_KEYS},
+        "timing": {"ttft": stream.ttft, "latency": stream.latency},
+    }
+
+
+def run_turn_job(job, session, user_input, opp_first, profile_mode=None):
+    """
+    턴 분석: 상태 반영 + 계산 + 조언(스트리밍)
+    조언 도중 취소하면 상태 반영은 이미 끝난 뒤라 그대로 남음 (되돌리기로 복구)
+    """
+    with session.lock, profiler.profiling(profile_mode):
+        job.report(0.1, "상태 반영 / 계산 중")
+        stream, parser_tokens, analyze_tokens = analyze_battle_turn(user_input, opp_first, session.battle, stream=True)
+        text = _drain(job, stream, 0.6, "조언 작성 중")
+        turn = session.battle.turn_metrics[-1] if session.battle.turn_metrics else {}
+    session.touch()
+
+    return {
+        "text": text,
+        "parser_tokens": list(parser_tokens),
+        "analyze_tokens": list(analyze_tokens),
+        "latency": turn.get("latency"),
+    }
@@ -0,0 +1,457 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import telemetry
+
+# =========================================================
+# [LLM 제공자 계층]
+# - entry.py / battle.py는 이 모듈의 llm 하나만 사용 (LangChain 채팅 모델과 같은 인터페이스)
+# - 실제 모델은 첫 호출 때 만듦 -> API 키 없이도 import 가능
+# - 제공자: gemini (기본) / fake (규칙 기반 가짜 응답) / replay (기록된 응답 재생, 없으면 기록)
+#   환경 변수 LLM_PROVIDER로 고르거나 set_provider()로 교체
+# - 응답 캐시: 프롬프트 내용 해시 -> 로컬 디스크 (TTL + 용량 상한, 오래 안 쓴 것부터 삭제)
+# =========================================================
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+GEMINI_MODEL = "gemini-3-flash-preview"
+GEMINI_TEMPERATURE = 0.1   # 파싱/배틀 분석은 정확성이 중요하므로 낮게 설정
+
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(current_dir, "llm_cache"))
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 24 * 60 * 60))            # 초
+CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", 64)) * 1024 * 1024)
+
+
+def _usage(input_tokens, output_tokens, cached=0):
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+             "total_tokens": input_tokens + output_tokens}
+    if cached:
+        usage["input_token_details"] = {"cache_read": cached}
+    return usage
+
+
+def _estimate_tokens(text):
+    """ 가짜 제공자용 대략적인 토큰 수 (한글 섞인 텍스트 기준 글자 4개 ≈ 1토큰) """
+    return max(1, len(text) // 4)
+
+
+def _prompt_text(messages):
+    return "\n".join(m.content if isinstance(m.content, str) else json.dumps(m.content, ensure_ascii=False)
+                     for m in messages)
+
+
+def prompt_key(model_id, messages, stop=None, **kwargs):
+    """ 요청 내용 해시 (모델 + 메시지 + 옵션). 같은 요청이면 같은 키 """
+    payload = json.dumps({
+        "model": model_id,
+        "messages": [[m.type, m.content] for m in messages],
+        "stop": stop,
+        "kwargs": {k: repr(v) for k, v in sorted(kwargs.items())},
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------
+# [응답 캐시] 키 하나 = 파일 하나 (JSON). 읽을 때마다 mtime 갱신 -> 용량 초과 시 mtime 오래된 순 삭제
+# ---------------------------------------------------------
+
+class ResponseCache:
+    EVICT_EVERY = 200   # 용량이 남아도 이만큼 저장할 때마다 한 번은 전체 훑기 (TTL 지난 파일 정리)
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._lock:
+            self._evict()   # 시작할 때 한 번 훑어서 총 용량(self._total)을 잡아 둠
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _count(self, hit):
+        with self._lock:
+            if hit: self.hits += 1
+            else: self.misses += 1
+
+    @telemetry.timed("io", kind="llm_cache_read")
+    def get(self, key):
+        """ Returns: {"content", "usage"} 또는 None (없거나 TTL 지남) """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count(False)
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl:
+            with self._lock:
+                self._total -= self._remove(path)
+            self._count(False)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(True)
+        return entry
+
+    @telemetry.timed("io", kind="llm_cache_write")
+    def put(self, key, content, usage):
+        entry = {"created": time.time(), "content": content, "usage": usage}
+        path = self._path(key)
+        try:
+            with self._lock:
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                size = os.path.getsize(tmp)
+                old = self._size(path)
+                os.replace(tmp, path)
+                # 디렉터리 전체를 훑는 건 추정 총량이 상한을 넘었거나 주기가 됐을 때만
+                self._total += size - old
+                self._puts += 1
+                if self._total > self.max_bytes or self._puts >= self.EVICT_EVERY:
+                    self._evict()
+        except (OSError, TypeError) as e:
+            print(f"⚠️ LLM 캐시 저장 실패: {e}")
+
+    def _size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _remove(self, path):
+        """ Returns: 지운 파일 크기 (못 지웠으면 0) """
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return 0
+        return size
+
+    def _evict(self):
+        """ TTL 지난 항목 삭제 후, 용량 상한을 넘으면 오래 안 쓴 순서로 삭제 (self._lock 안에서 호출) """
+        now = time.time()
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"): continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if now - st.st_mtime > self.ttl:
+                self._remove(path)
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes: break
+            self._remove(path)
+            total -= size
+        self._total = total
+        self._puts = 0
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._remove(os.path.join(self.cache_dir, name))
+            self._total = 0
+
+
+# ---------------------------------------------------------
+# [가짜 제공자] 프롬프트 종류별 규칙으로 결정적인 응답 생성 (API 키/네트워크 불필요)
+# ---------------------------------------------------------
+
+def _fake_parser(prompt):
+    """ 배틀 로그 파서 프롬프트 -> 로컬 파서로 JSON 생성 """
+    from local_parser import preparse
+    my = re.search(r"- 나: .*?\(대기: (.*?)\)", prompt)
+    opp = re.search(r"- 상대: .*?\(엔트리: (.*?)\)", prompt)
+    user = re.search(r"\[사용자 입력\]\s*\"(.*?)\"", prompt, re.S)
+    split = lambda m: [n.strip() for n in m.group(1).split(",") if n.strip()] if m else []
+    return json.dumps(preparse(user.group(1) if user else "", split(my), split(opp)), ensure_ascii=False)
+
+
+def _fake_names(prompt):
+    """ 이름 번역 프롬프트 -> 입력을 공백으로 나눈 리스트 (이미 영어 이름이라고 가정) """
+    user = re.search(r"입력: \"(.*?)\"", prompt)
+    return json.dumps(user.group(1).split() if user else [])
+
+
+def _fake_entry(prompt):
+    """ 선출 분석 프롬프트 -> 내 파티 앞 3마리로 고정 양식 리포트 (+ SELECTION 줄) """
+    names = re.findall(r"^\s*\[([^\]]+)\] @", prompt, re.M)[:3]
+    selection = {"lead": names[0] if names else None, "back": names[1:]}
+    return (f"1. **나의 추천 선출**:\n   - **세 마리 구성 요약: {', '.join(names)}**\n"
+            f"   - **선봉(Lead): {names[0] if names else '-'}**\n\n"
+            f"SELECTION: {json.dumps(selection, ensure_ascii=False)}\n")
+
+
+def _fake_advice(prompt):
+    """ 조언 프롬프트 -> 탐색 결과 1순위를 추천 """
+    m = re.search(r"\[탐색 결과\][^\n]*\n\s*1\. ([^:\n]+): ([+-][\d.]+)", prompt)
+    action = m.group(1) if m else "-"
+    return f"- 💡 **추천 행동**: {action}\n- 📊 **근거**: 탐색 결과 1순위 (기대값 {m.group(2) if m else '-'})"
+
+
+def _fake_single_call(prompt):
+    update = json.loads(_fake_parser(prompt))
+    return json.dumps({"update": update, "advice": _fake_advice(prompt)}, ensure_ascii=False)
+
+
+# (프롬프트에 들어 있는 문구, 응답 함수) - 먼저 맞는 규칙 사용
+DEFAULT_FAKE_RULES = (
+    ("파서이자 AI 코치", _fake_single_call),
+    ("포켓몬 배틀 로그 파서", _fake_parser),
+    ("포켓몬 이름 번역기", _fake_names),
+    ("전문 AI 코치", _fake_entry),
+    ("포켓몬 배틀 AI 코치", _fake_advice),
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    규칙 기반 가짜 채팅 모델 (같은 프롬프트 -> 같은 응답)
+    rules: ((문구 또는 정규식, 문자열 또는 함수(prompt)->str), ...)
+    latency: 응답 전 대기 (초), chunk_delay: 스트리밍 조각 사이 대기 (초)
+    """
+    rules: Any = DEFAULT_FAKE_RULES
+    default: str = "OK"
+    latency: float = 0.0
+    chunk_delay: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def respond(self, prompt):
+        for pattern, reply in self.rules:
+            if pattern in prompt or re.search(pattern, prompt):
+                return reply(prompt) if callable(reply) else reply
+        return self.default
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = _prompt_text(messages)
+        self.calls += 1
+        if self.latency: time.sleep(self.latency)
+        text = self.respond(prompt)
+        message = AIMessage(content=text, usage_metadata=_usage(_estimate_tokens(prompt), _estimate_tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = _prompt_text(messages)
+        self.calls += 1
+        if self.latency: time.sleep(self.latency)
+        text = self.respond(prompt)
+        pieces = re.findall(r"\S+\s*|\s+", text) or [""]
+        for i, piece in enumerate(pieces):
+            if self.chunk_delay: time.sleep(self.chunk_delay)
+            usage = _usage(_estimate_tokens(prompt), _estimate_tokens(text)) if i == len(pieces) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+
+
+# ---------------------------------------------------------
+# [재생 제공자] JSONL 기록 {"key", "content", "usage"} 재생. inner가 있으면 없는 요청은 inner로 받아 기록
+# ---------------------------------------------------------
+
+class ReplayChatModel(BaseChatModel):
+    path: str
+    inner: Any = None
+    model_id: str = GEMINI_MODEL
+
+    @property
+    def _llm_type(self):
+        return "replay"
+
+    def _records(self):
+        records = self.__dict__.get("_loaded")
+        if records is None:
+            records = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            rec = json.loads(line)
+                            records[rec["key"]] = rec
+            self.__dict__["_loaded"] = records
+        return records
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = prompt_key(self.model_id, messages, stop)
+        rec = self._records().get(key)
+        if rec is None:
+            if self.inner is None:
+                raise KeyError(f"기록되지 않은 LLM 요청입니다 ({key[:12]}...)")
+            result = self.inner._generate(messages, stop=stop, **kwargs)
+            message = result.generations[0].message
+            rec = {"key": key, "content": message.content, "usage": message.usage_metadata or {}}
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._records()[key] = rec
+            return result
+        message = AIMessage(content=rec["content"], usage_metadata=rec["usage"] or _usage(0, 0))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# ---------------------------------------------------------
+# [제공자 선택 + 캐시] entry.py / battle.py가 공유하는 llm
+# ---------------------------------------------------------
+
+_ACTIVE = None
+_ACTIVE_LOCK = threading.Lock()
+_CACHE = None
+
+
+def _build_gemini():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from dotenv import load_dotenv
+    load_dotenv()
+    if not os.getenv("GOOGLE_API_KEY"):
+        raise ValueError("GOOGLE_API_KEY가 .env 파일에 설정되지 않았습니다.")
+    return ChatGoogleGenerativeAI(
+        model=GEMINI_MODEL,
+        temperature=GEMINI_TEMPERATURE,
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    )
+
+
+def provider_name():
+    return os.getenv("LLM_PROVIDER", "gemini").lower()
+
+
+def _build_default():
+    name = provider_name()
+    if name == "fake":
+        return FakeChatModel()
+    if name == "replay":
+        path = os.getenv("LLM_REPLAY_FILE", os.path.join(current_dir, "llm_replay.jsonl"))
+        inner = _build_gemini() if os.getenv("GOOGLE_API_KEY") else None
+        return ReplayChatModel(path=path, inner=inner)
+    return _build_gemini()
+
+
+def active_model():
+    """ 현재 제공자 (처음 호출될 때 생성) """
+    global _ACTIVE
+    if _ACTIVE is None:
+        with _ACTIVE_LOCK:
+            if _ACTIVE is None:
+                _ACTIVE = _build_default()
+                print(f"🔌 LLM 제공자: {getattr(_ACTIVE, '_llm_type', type(_ACTIVE).__name__)}")
+    return _ACTIVE
+
+
+def set_provider(model, cache=None):
+    """
+    제공자 교체 (테스트/벤치마크용). 예) set_provider(FakeChatModel(latency=0.3))
+    cache: ResponseCache / None(끄기) / "keep"(그대로)
+    """
+    global _ACTIVE, _CACHE
+    _ACTIVE = model
+    if cache != "keep":
+        _CACHE = cache
+
+
+def is_ready():
+    """ API 키 없이도 쓸 수 있는 제공자거나, 키가 설정되어 있으면 True """
+    return _ACTIVE is not None or provider_name() in ("fake", "replay") or bool(os.getenv("GOOGLE_API_KEY"))
+
+
+def get_cache():
+    return _CACHE
+
+
+def _model_id(model):
+    return getattr(model, "model", None) or getattr(model, "_llm_type", type(model).__name__)
+
+
+def _cached_message(entry, chunk=False):
+    """ 캐시 적중: 토큰 비용 0으로 표시 """
+    cls = AIMessageChunk if chunk else AIMessage
+    return cls(content=entry["content"], usage_metadata=_usage(0, 0),
+               response_metadata={"llm_cache": "hit", "original_usage": entry.get("usage")})
+
+
+class ProviderChatModel(BaseChatModel):
+    """ 현재 제공자로 위임 + 응답 캐시. 모듈 전역 llm으로 하나만 만들어 공유 """
+
+    @property
+    def _llm_type(self):
+        return "provider"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        model, cache = active_model(), _CACHE
+        key = prompt_key(_model_id(model), messages, stop, **kwargs) if cache else None
+        entry = cache.get(key) if cache else None
+        if cache: telemetry.cache_event("llm_response", entry is not None)
+        if entry is not None:
+            return ChatResult(generations=[ChatGeneration(message=_cached_message(entry))])
+        with telemetry.span("llm_call", model=_model_id(model), stream=False):
+            result = model._generate(messages, stop=stop, **kwargs)
+        if cache:
+            message = result.generations[0].message
+            cache.put(key, message.content, message.usage_metadata)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        model, cache = active_model(), _CACHE
+        key = prompt_key(_model_id(model), messages, stop, **kwargs) if cache else None
+        entry = cache.get(key) if cache else None
+        if cache: telemetry.cache_event("llm_response", entry is not None)
+        if entry is not None:
+            yield ChatGenerationChunk(message=_cached_message(entry, chunk=True))
+            return
+
+        # 제너레이터라 span 대신 직접 잼 (소비하는 쪽 span과 섞이지 않도록)
+        start = time.perf_counter()
+        if type(model)._stream is BaseChatModel._stream:
+            # 스트리밍을 지원하지 않는 제공자 -> 한 조각으로
+            message = model._generate(messages, stop=stop, **kwargs).generations[0].message
+            chunks = [ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content, usage_metadata=message.usage_metadata))]
+        else:
+            chunks = model._stream(messages, stop=stop, **kwargs)
+
+        merged = None
+        for chunk in chunks:
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        telemetry.observe("llm_call_seconds", time.perf_counter() - start, model=_model_id(model), stream=True)
+        if cache and merged is not None:
+            cache.put(key, merged.message.content, merged.message.usage_metadata)
+
+
+def _default_cache():
+    if os.getenv("LLM_CACHE", "1") in ("0", "false", "off"):
+        return None
+    try:
+        return ResponseCache()
+    except OSError as e:
+        print(f"⚠️ LLM 캐시 디렉터리 생성 실패 (캐시 끔): {e}")
+        return None
+
+
+_CACHE = _default_cache()
+llm = ProviderChatModel()
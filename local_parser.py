@@ -0,0 +1,167 @@
+import re
+
+from battle_codes import SPECIES, MOVES, to_id
+
+# =========================================================
+# [로컬 사전 파서] LLM 없이 키워드/정규식으로 채팅 한 줄을 미리 해석
+# - 결과 형식은 battle.py LLM 파서의 JSON 스키마와 같음 (모르는 항목은 null)
+# - 추측 조언(speculative) 모드에서 LLM 파서를 기다리지 않고 조언을 먼저 시작하는 데 사용
+# - 틀려도 괜찮음: LLM 파서 결과와 다르면 조언을 다시 요청함
+# =========================================================
+
+# 비교할 때 같은 값으로 보는 HP 오차 (%p)
+HP_TOLERANCE = 10
+
+_OPP_WORDS = ("상대",)
+_MY_WORDS = ("내가", "내 ", "나 ", "나는", "우리")
+
+_STATUS_WORDS = {
+    "화상": "Burn", "마비": "Paralysis", "잠듦": "Sleep", "잠들": "Sleep",
+    "맹독": "Toxic", "독": "Poison", "얼음": "Freeze",
+}
+_WEATHER_WORDS = {"비": "Rain", "쾌청": "Sun", "햇살": "Sun", "모래바람": "Sand", "설경": "Snow", "눈": "Snow"}
+_TERRAIN_WORDS = {
+    "일렉트릭필드": "Electric", "그래스필드": "Grassy", "사이코필드": "Psychic", "미스트필드": "Misty",
+}
+_RANK_MOVES = {
+    "칼춤": {"atk": 2}, "나쁜음모": {"spa": 2}, "용춤": {"atk": 1, "spe": 1}, "용의춤": {"atk": 1, "spe": 1},
+    "명상": {"spa": 1, "spd": 1}, "철벽": {"def": 2}, "고속이동": {"spe": 2}, "껍질깨기": {"atk": 2, "spa": 2, "spe": 2},
+}
+_RANK_STATS = {"특공": "spa", "특방": "spd", "공": "atk", "방": "def", "스피드": "spe", "스핏": "spe"}
+
+_RANK_RE = re.compile(r"([+-]\d)\s*(특공|특방|공|방|스피드|스핏)")
+_DAMAGE_RE = re.compile(r"(-\d+(?:\.\d+)?)\s*%|(\d+(?:\.\d+)?)\s*%\s*(?:데미지|피해|깎)")
+_CLAUSE_RE = re.compile(r"[,.\n]|그리고|하고 ")
+
+
+def _side(clause):
+    if any(w in clause for w in _OPP_WORDS): return "opp"
+    if any(w in clause for w in _MY_WORDS) or clause.startswith("나") or clause.startswith("내"): return "me"
+    return None
+
+
+def _side_at(clause, pos):
+    """ pos 앞에서 가장 가까운 주어 ("상대 지진 써서 내 피 -40%" -> 수치는 '내' 쪽) """
+    head = " " + clause[:pos]
+    opp = max(head.rfind(w) for w in _OPP_WORDS)
+    me = max(head.rfind(" " + w.strip()) for w in _MY_WORDS)
+    if opp < 0 and me < 0: return _side(clause)
+    return "opp" if opp > me else "me"
+
+
+def _find_name(clause_key, names, table):
+    """
+    절 안에 들어 있는 이름 중 가장 긴 것 (Ting-Lu vs Ting-Lu-Tera 같은 경우 대비)
+    table의 별칭도 찾음 ('상대 딩루 교체' -> 'Ting-Lu')
+    """
+    hits = [n for n in names if n and any(k in clause_key for k in table.keys_of(n) if k)]
+    return max(hits, key=len) if hits else None
+
+
+def empty_update():
+    return {
+        "my_switch": None, "opp_switch": None, "my_move_used": None, "opp_move_used": None,
+        "my_hp_change_input": None, "opp_hp_change_input": None,
+        "my_status_change": None, "opp_status_change": None,
+        "my_rank_change": {}, "opp_rank_change": {},
+        "weather": None, "terrain": None, "trick_room": None,
+        "my_tailwind": None, "opp_reflect": None, "opp_light_screen": None, "turn_end": False,
+    }
+
+
+def preparse(user_input, my_roster, opp_roster, my_moves=(), opp_moves=()):
+    """
+    채팅 한 줄 -> LLM 파서와 같은 형식의 dict
+    my_moves / opp_moves: 현재 필드 포켓몬이 쓸 수 있는(또는 예측되는) 기술 이름
+    """
+    data = empty_update()
+    for clause in filter(None, (c.strip() for c in _CLAUSE_RE.split(user_input))):
+        side = _side(clause)
+        ck = to_id(clause)
+        compact = clause.replace(" ", "")
+
+        # 1. 교체: 로스터 이름이 들어 있으면 그쪽 교체 (양쪽 로스터에 다 있으면 주어로 판단)
+        mine = _find_name(ck, my_roster, SPECIES)
+        theirs = _find_name(ck, opp_roster, SPECIES)
+        if mine and theirs:
+            mine, theirs = (None, theirs) if side == "opp" else (mine, None)
+        if mine and any(w in clause for w in ("교체", "나옴", "등장", "내보")):
+            data["my_switch"] = mine
+        elif theirs and any(w in clause for w in ("교체", "나옴", "등장", "내보")):
+            data["opp_switch"] = theirs
+
+        # 2. 기술: 필드 포켓몬의 기술 이름
+        my_move = _find_name(ck, my_moves, MOVES)
+        opp_move = _find_name(ck, opp_moves, MOVES)
+        if my_move and (side != "opp" or not opp_move):
+            data["my_move_used"] = my_move
+        if opp_move and (side == "opp" or not my_move):
+            data["opp_move_used"] = opp_move
+
+        # 3. 피해 수치 ("상대 -30%", "내 피 30% 깎임"): 절의 주어 쪽 HP 변화
+        m = _DAMAGE_RE.search(clause)
+        hp_side = _side_at(clause, m.start()) if m else None
+        if hp_side:
+            value = float(m.group(1) or -float(m.group(2)))
+            data["opp_hp_change_input" if hp_side == "opp" else "my_hp_change_input"] = value
+
+        # 4. 상태이상
+        for word, status in _STATUS_WORDS.items():
+            pos = clause.find(word)
+            if pos >= 0:
+                st_side = _side_at(clause, pos)
+                if st_side: data[f"{'opp' if st_side == 'opp' else 'my'}_status_change"] = status
+                break
+
+        # 5. 랭크 (변화기 이름 / "+2공" 표기)
+        if side:
+            ranks = data["opp_rank_change" if side == "opp" else "my_rank_change"]
+            for word, change in _RANK_MOVES.items():
+                if word in compact:
+                    for stat, v in change.items(): ranks[stat] = ranks.get(stat, 0) + v
+            for amount, stat in _RANK_RE.findall(clause):
+                key = _RANK_STATS[stat]
+                ranks[key] = ranks.get(key, 0) + int(amount)
+
+        # 6. 날씨/필드/벽
+        for word, weather in _WEATHER_WORDS.items():
+            if re.search(rf"(^|\s){word}(\s|$|가|이|를|내림|옴)", clause) or f"{word}내림" in compact:
+                data["weather"] = weather
+        for word, terrain in _TERRAIN_WORDS.items():
+            if word in compact: data["terrain"] = terrain
+        if "트릭룸" in compact: data["trick_room"] = "해제" not in compact and "끝" not in compact
+        if "순풍" in compact and side != "opp": data["my_tailwind"] = True
+        if "리플렉터" in compact: data["opp_reflect"] = True
+        if "빛의장막" in compact: data["opp_light_screen"] = True
+        if "턴종료" in compact or "턴끝" in compact: data["turn_end"] = True
+    return data
+
+
+# ---------------------------------------------------------
+# [비교] 추측한 해석이 LLM 파서 결과와 같은지
+# ---------------------------------------------------------
+
+_NAME_FIELDS = ("my_switch", "opp_switch", "my_move_used", "opp_move_used",
+                "my_status_change", "opp_status_change", "weather", "terrain")
+_FLAG_FIELDS = ("trick_room", "my_tailwind", "opp_reflect", "opp_light_screen", "turn_end")
+_HP_FIELDS = ("my_hp_change_input", "opp_hp_change_input")
+
+
+def _ranks(value):
+    return {k: v for k, v in (value or {}).items() if v}
+
+
+def same_update(a, b, hp_tolerance=HP_TOLERANCE):
+    """ 조언 결과가 달라질 만한 항목이 모두 같으면 True """
+    for f in _NAME_FIELDS:
+        va, vb = a.get(f), b.get(f)
+        if (to_id(va) if va else None) != (to_id(vb) if vb else None):
+            return False
+    for f in _FLAG_FIELDS:
+        if bool(a.get(f)) != bool(b.get(f)):
+            return False
+    for f in _HP_FIELDS:
+        if abs((a.get(f) or 0) - (b.get(f) or 0)) > hp_tolerance:
+            return False
+    return _ranks(a.get("my_rank_change")) == _ranks(b.get("my_rank_change")) and \
+        _ranks(a.get("opp_rank_change")) == _ranks(b.get("opp_rank_change"))
@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+
+# =========================================================
+# [프로파일링] 느린 턴이 어디서 시간을 쓰는지 (estimate_stats JSON / PokeAPI / 디스크 저장 / LLM)
+# - @profiled(이름)으로 감싼 함수가 프로파일링이 켜진 상태에서 불리면 그 호출 전체를 측정
+# - 켜는 법: 환경변수 PROFILE=sample|cprofile (프로세스 전체)
+#            enable(mode) / disable() (세션 전체), with profiling(mode): ... (요청 하나)
+# - 꺼져 있으면 감싼 함수는 전역 정수 하나만 확인하고 바로 원래 함수를 호출
+# - 출력 (PROFILE_DIR):
+#   sample  : <시각>_<이름>.folded  (collapsed stack, flamegraph.pl / speedscope / inferno에 그대로)
+#   cprofile: <시각>_<이름>.prof    (pstats, snakeviz / flameprof) + .txt (누적 시간 상위 함수)
+# =========================================================
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+MODES = ("sample", "cprofile")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))   # 샘플링 간격 (초)
+TOP_FUNCTIONS = 40      # cprofile .txt에 남길 함수 수
+MAX_RESULTS = 50        # results()로 볼 최근 프로파일 수
+
+_GLOBAL_MODE = os.getenv("PROFILE", "").lower() or None
+if _GLOBAL_MODE not in MODES: _GLOBAL_MODE = None
+
+# 켜진 곳의 수 (전역 모드 + 열린 profiling 블록). 0이면 감싼 함수는 그냥 통과
+_armed = 1 if _GLOBAL_MODE else 0
+_armed_lock = threading.Lock()
+_local = threading.local()          # 스레드별 요청 모드 / 이미 측정 중인지
+_cprofile_lock = threading.Lock()   # cProfile은 동시에 하나만 (다른 스레드가 쓰는 중이면 샘플링으로)
+_results = deque(maxlen=MAX_RESULTS)
+
+# 다른 스레드의 이 함수들은 일이 없어 기다리는 중 -> 샘플에서 제외
+_IDLE_LEAVES = {("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker"),
+                ("selectors.py", "select"), ("socket.py", "accept")}
+
+
+def _arm(delta):
+    global _armed
+    with _armed_lock:
+        _armed += delta
+
+
+def enable(mode="sample"):
+    """ 세션 전체 프로파일링 (disable()까지) """
+    global _GLOBAL_MODE
+    if mode not in MODES:
+        raise ValueError(f"알 수 없는 프로파일링 모드: {mode} (가능: {', '.join(MODES)})")
+    if _GLOBAL_MODE is None: _arm(1)
+    _GLOBAL_MODE = mode
+
+
+def disable():
+    global _GLOBAL_MODE
+    if _GLOBAL_MODE is not None: _arm(-1)
+    _GLOBAL_MODE = None
+
+
+@contextmanager
+def profiling(mode="sample"):
+    """ with 블록 안에서 이 스레드가 부르는 @profiled 함수만 측정 (mode=None이면 아무것도 안 함) """
+    if not mode:
+        yield
+        return
+    if mode not in MODES:
+        raise ValueError(f"알 수 없는 프로파일링 모드: {mode} (가능: {', '.join(MODES)})")
+    previous = getattr(_local, "mode", None)
+    _local.mode = mode
+    _arm(1)
+    try:
+        yield
+    finally:
+        _arm(-1)
+        _local.mode = previous
+
+
+def results():
+    """ 최근 프로파일 목록 (최신순): {"name", "mode", "seconds", "files", "samples"} """
+    return list(reversed(_results))
+
+
+# ---------------------------------------------------------
+# [샘플링] 주기적으로 모든 스레드의 스택을 읽어 collapsed stack으로 셈
+# ---------------------------------------------------------
+
+class StackSampler:
+    """
+    interval마다 sys._current_frames()를 읽는 샘플링 프로파일러
+    호출한 스레드는 대기 중이어도 셈 (LLM 응답 대기 = 벽시계 시간), 다른 스레드는 일하는 스택만
+    """
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._owner = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me: continue
+                code = frame.f_code
+                if ident != self._owner and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """ flamegraph.pl 입력 형식: '스택;스택;... 개수' 한 줄씩 """
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+# ---------------------------------------------------------
+# [감싸기]
+# ---------------------------------------------------------
+
+def _output_path(name, ext):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+    return os.path.join(PROFILE_DIR, f"{stamp}_{name}.{ext}")
+
+
+def _write_cprofile(name, prof):
+    prof_path = _output_path(name, "prof")
+    prof.dump_stats(prof_path)
+    txt_path = prof_path[:-len(".prof")] + ".txt"
+    with open(txt_path, "w", encoding="utf-8") as f:
+        stats = pstats.Stats(prof, stream=f)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    return [prof_path, txt_path]
+
+
+def _write_collapsed(name, sampler):
+    path = _output_path(name, "folded")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    return [path]
+
+
+def _run_profiled(name, mode, func, args, kwargs):
+    prof = sampler = None
+    if mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+        prof = cProfile.Profile()
+    else:
+        mode = "sample"
+        sampler = StackSampler().start()
+    _local.active = True
+    start = time.perf_counter()
+    try:
+        if prof is not None:
+            prof.enable()
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.active = False
+        if prof is not None:
+            prof.disable()
+            _cprofile_lock.release()
+        else:
+            sampler.stop()
+        try:
+            files = _write_cprofile(name, prof) if prof is not None else _write_collapsed(name, sampler)
+        except OSError as e:
+            print(f"⚠️ 프로파일 저장 실패: {e}")
+            files = []
+        _results.append({"name": name, "mode": mode, "seconds": elapsed, "files": files,
+                         "samples": sampler.samples if sampler else None})
+        print(f"🔬 [{name}] {mode} 프로파일 {elapsed:.2f}초 -> {', '.join(files) or '-'}")
+
+
+def profiled(name):
+    """
+    프로파일링이 켜져 있을 때만 호출 전체를 측정하는 데코레이터
+    이미 측정 중인 호출 안에서 다시 불리면 (턴 분석 안의 계산기 등) 바깥 측정에 포함되고 따로 만들지 않음
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _armed:
+                return func(*args, **kwargs)
+            mode = getattr(_local, "mode", None) or _GLOBAL_MODE
+            if not mode or getattr(_local, "active", False):
+                return func(*args, **kwargs)
+            return _run_profiled(name, mode, func, args, kwargs)
+        return wrapper
+    return decorator
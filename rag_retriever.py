@@ -2,6 +2,9 @@ import json
 import os
 import sys
 
+from Statistics.lead_index import load_lead_stats
+from battle_codes import SPECIES
+
 # --- [경로 설정] ---
 # 현재 파일 위치를 기준으로 경로를 잡습니다.
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -30,38 +33,21 @@ def load_usage_data():
         return {}
 
 def load_lead_data():
-    """ lead_stats.txt 파싱하여 딕셔너리로 반환 """
-    leads = {}
-    if not os.path.exists(LEAD_DATA_PATH):
-        return {}
-
-    try:
-        with open(LEAD_DATA_PATH, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            
-        for line in lines:
-            if "|" not in line or "Rank" in line or "Usage %" in line:
-                continue
-            
-            parts = line.split("|")
-            if len(parts) < 4: continue
-            
-            name = parts[2].strip()
-            usage_str = parts[3].strip().replace("%", "")
-            
-            try:
-                leads[name] = float(usage_str)
-            except ValueError:
-                continue
-        return leads
-    except Exception as e:
-        print(f"⚠️ 선봉 데이터 파싱 중 오류: {e}")
-        return {}
+    """ 선봉 통계 로드 (lead_stats.txt 해시 기준 바이너리 캐시 사용, 파싱은 내용이 바뀔 때만) """
+    return load_lead_stats(LEAD_DATA_PATH)
 
 # --- [전역 데이터 로드] ---
 SMOGON_DB = load_usage_data()
 LEAD_STATS = load_lead_data()
 
+# 종족 ID -> 통계 항목 (Smogon 표기를 표시 이름으로 등록 -> 'Flutter-Mane' / '날치머'도 같은 항목)
+SMOGON_BY_ID = {SPECIES.register(name): data for name, data in SMOGON_DB.items()}
+
+
+def get_usage(pokemon_name):
+    """ 이름/별칭 -> Smogon 통계 항목 (없으면 None) """
+    return SMOGON_BY_ID.get(SPECIES.id_of(pokemon_name))
+
 
 # --- [기존 기능: 선출 분석용 텍스트 요약] ---
 def get_pokemon_summary(pokemon_name):
@@ -69,10 +55,11 @@ def get_pokemon_summary(pokemon_name):
     특정 포켓몬의 정보를 LLM이 읽기 좋은 텍스트로 요약 반환
     (entry.py 및 battle.py 프롬프트용)
     """
-    if pokemon_name not in SMOGON_DB:
+    data = get_usage(pokemon_name)
+    if data is None:
         return f"⚠️ [{pokemon_name}]: Smogon 통계 데이터가 없습니다."
 
-    data = SMOGON_DB[pokemon_name]
+    pokemon_name = SPECIES.canonical(pokemon_name)
     
     # 선봉 확률 정보
     lead_prob = LEAD_STATS.get(pokemon_name, 0.0)
@@ -130,10 +117,9 @@ def get_pokemon_raw_data(pokemon_name):
     BattleState 객체에 저장하기 위해 가공되지 않은 리스트/딕셔너리 형태의 데이터를 반환합니다.
     (battle_state.py 사용)
     """
-    if pokemon_name not in SMOGON_DB:
+    data = get_usage(pokemon_name)
+    if data is None:
         return None
-
-    data = SMOGON_DB[pokemon_name]
     
     return {
         # 기술 TOP 7 (이름만 리스트로) -> 방어 시뮬레이션용
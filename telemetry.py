@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# =========================================================
+# [계측] 단계별 지연 / 토큰 / 캐시 적중률을 한 곳에 모음
+# - span(): with 블록 시간 -> 히스토그램 (<이름>_seconds) + 최근 구간 기록 (JSONL)
+# - count(): 카운터, observe(): 히스토그램 값, cache_event(): 캐시 적중/실패
+# - 내보내기: Prometheus 텍스트 (textfile collector용 .prom) / JSON lines (로컬 디스크)
+# - 전역 레지스트리 하나 (스레드 안전). 프로세스 풀(탐색 워커) 안의 값은 모이지 않음
+# =========================================================
+
+TELEMETRY_DIR = os.getenv("TELEMETRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry"))
+ENABLED = os.getenv("TELEMETRY", "1") not in ("0", "false", "off")
+PREFIX = "pokebattle_"
+
+# 히스토그램 구간 (초). 계산기 한 번(ms 미만) ~ LLM 응답(수십 초)까지
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MAX_EVENTS = 5000   # JSONL로 내보내기 전까지 메모리에 쌓아 둘 최근 구간 수
+
+_lock = threading.Lock()
+_counters = {}                      # (이름, 라벨) -> 값
+_histograms = {}                    # (이름, 라벨) -> Histogram
+_events = deque(maxlen=MAX_EVENTS)  # 구간 기록 (JSONL 내보내기용)
+_local = threading.local()          # 스레드별 열린 span 이름 (부모 기록용)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class Histogram:
+    """ 고정 구간 히스토그램 (구간별 개수는 누적 아님, 내보낼 때 누적) """
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # 마지막 칸 = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max: self.max = value
+
+    def quantile(self, q):
+        """ 구간 안에서 선형 보간한 분위수 (대략값) """
+        if not self.count: return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+# ---------------------------------------------------------
+# [기록]
+# ---------------------------------------------------------
+
+def count(name, value=1, **labels):
+    if not ENABLED: return
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    if not ENABLED or value is None: return
+    key = (name, _label_key(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.add(value)
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextmanager
+def span(name, **labels):
+    """ with telemetry.span("calc_batch", kind="report"): ... -> calc_batch_seconds{kind="report"} """
+    if not ENABLED:
+        yield
+        return
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    depth = len(stack)
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        del stack[depth:]
+        observe(f"{name}_seconds", elapsed, **labels)
+        _events.append({"ts": round(time.time(), 3), "span": name, "parent": parent,
+                        "seconds": round(elapsed, 6), **{k: v for k, v in labels.items() if v is not None}})
+
+
+def timed(name, **labels):
+    """ 함수 전체를 span으로 감싸는 데코레이터 """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_event(cache, hit):
+    count("cache_requests", cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm(phase, ttft, latency, tokens=None):
+    """
+    LLM 호출 한 번 (phase: parser / advisor / entry_strategy ...)
+    tokens: {"input_tokens": .., "output_tokens": .., "cached_tokens": ..} (없으면 생략)
+    """
+    observe("llm_phase_seconds", latency, phase=phase)
+    observe("llm_ttft_seconds", ttft, phase=phase)
+    count("llm_phase_calls", phase=phase)
+    for kind, value in (tokens or {}).items():
+        if value: count("llm_tokens", value, phase=phase, kind=kind.replace("_tokens", ""))
+    if ENABLED:
+        _events.append({"ts": round(time.time(), 3), "span": "llm_phase", "phase": phase,
+                        "ttft": ttft, "seconds": latency, **(tokens or {})})
+
+
+# ---------------------------------------------------------
+# [조회] 사이드바 패널용
+# ---------------------------------------------------------
+
+def hit_ratios():
+    """ {캐시 이름: (적중, 전체, 적중률)} """
+    totals = {}
+    with _lock:
+        for (name, labels), value in _counters.items():
+            if name != "cache_requests": continue
+            lab = dict(labels)
+            hits, total = totals.get(lab.get("cache"), (0, 0))
+            totals[lab.get("cache")] = (hits + (value if lab.get("result") == "hit" else 0), total + value)
+    return {cache: (hits, total, hits / total if total else 0.0) for cache, (hits, total) in sorted(totals.items())}
+
+
+def summary():
+    """ 히스토그램별 요약 행 (평균/p50/p95/최대, 초) - 전체 시간이 큰 순 """
+    with _lock:
+        items = list(_histograms.items())
+    rows = []
+    for (name, labels), hist in items:
+        rows.append({
+            "metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels),
+            "count": hist.count, "total": hist.sum, "avg": hist.sum / hist.count if hist.count else 0.0,
+            "p50": hist.quantile(0.5), "p95": hist.quantile(0.95), "max": hist.max,
+        })
+    rows.sort(key=lambda r: -r["total"])
+    return rows
+
+
+def counters():
+    with _lock:
+        return {(name, labels): value for (name, labels), value in _counters.items()}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _events.clear()
+
+
+# ---------------------------------------------------------
+# [내보내기] Prometheus 텍스트 / JSON lines
+# ---------------------------------------------------------
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def prometheus_text():
+    """ Prometheus text exposition format (0.0.4) """
+    with _lock:
+        counter_items = sorted(_counters.items())
+        hist_items = sorted(_histograms.items(), key=lambda kv: kv[0])
+        hist_items = [(key, list(h.counts), h.count, h.sum) for key, h in hist_items]
+
+    lines, typed = [], set()
+    for (name, labels), value in counter_items:
+        metric = f"{PREFIX}{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+    for (name, labels), counts, total, value_sum in hist_items:
+        metric = f"{PREFIX}{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_fmt_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric}_sum{_fmt_labels(labels)} {value_sum:.6f}")
+        lines.append(f"{metric}_count{_fmt_labels(labels)} {total}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """ .prom 파일로 저장 (임시 파일 -> 교체, node_exporter textfile collector가 반쯤 쓴 파일을 읽지 않도록) """
+    path = path or os.path.join(TELEMETRY_DIR, "metrics.prom")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+    return path
+
+
+def flush_jsonl(path=None):
+    """ 쌓인 구간 기록을 JSONL 파일에 이어 쓰고 비움. Returns: (경로, 쓴 줄 수) """
+    path = path or os.path.join(TELEMETRY_DIR, "events.jsonl")
+    events = []
+    while _events:   # popleft는 원자적 -> 다른 스레드가 그 사이에 추가한 구간도 잃지 않음
+        events.append(_events.popleft())
+    if not events: return path, 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    return path, len(events)
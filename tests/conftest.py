@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# 테스트는 오프라인 고정: 가짜 LLM, 응답 캐시 끔, PokeAPI 요청 없음 (모듈을 import 하기 전에)
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["LLM_CACHE"] = "0"
+os.environ["POKEAPI_OFFLINE"] = "1"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def local_data():
+    """ 종족값/기술 데이터를 벤치마크용 로컬 파일에서 캐시에 채움 """
+    from benchmark import seed_local_data
+    seed_local_data()
+
+
+@pytest.fixture
+def session(local_data):
+    """ 내 파티 + 상대 로스터 + 선출/선봉까지 정해진 배틀 세션 (백그라운드 프리웜 없음) """
+    from battle_session import BattleSession
+    s = BattleSession("test", os.path.join(ROOT, "my_team.txt"))
+    battle = s.battle
+    battle.prewarm_enabled = False
+    battle.initialize_opponent(["Koraidon", "Ting-Lu", "Flutter Mane", "Chien-Pao", "Glimmora", "Dragonite"])
+    battle.set_my_selection(["Urshifu-Rapid-Strike", "Gholdengo", "Incineroar"])
+    battle.set_active("opp", "Koraidon")
+    battle.commit("test")
+    yield s
+    s.close()
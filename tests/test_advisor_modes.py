@@ -0,0 +1,118 @@
+import json
+from typing import Any
+
+import pytest
+
+import battle as battle_mod
+import llm_provider
+
+TEXT = "상대 -40%"
+
+
+class RecordingModel(llm_provider.FakeChatModel):
+    """ 호출마다 (프롬프트 종류, 토큰 합계)를 남기는 가짜 모델 """
+    log: Any = None
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.log.append(result.generations[0].message.usage_metadata["total_tokens"])
+        return result
+
+
+@pytest.fixture
+def fake_llm():
+    """ 파서 응답을 테스트에서 정하는 가짜 제공자 (끝나면 원래 제공자로 복구) """
+    saved = llm_provider._ACTIVE, llm_provider._CACHE
+    reply = {}
+    advice = "- 💡 **추천 행동**: 테스트"
+    model = RecordingModel(log=[], rules=(
+        ("파서이자 AI 코치", lambda p: json.dumps({"update": reply["update"], "advice": advice}, ensure_ascii=False)),
+        ("포켓몬 배틀 로그 파서", lambda p: json.dumps(reply["update"], ensure_ascii=False)),
+        ("포켓몬 배틀 AI 코치", advice),
+    ))
+    llm_provider.set_provider(model, cache=None)
+    yield model, reply
+    llm_provider._ACTIVE, llm_provider._CACHE = saved
+
+
+def _run(session, mode):
+    battle = session.battle
+    battle.set_active("me", "Gholdengo")
+    battle.commit("lead")
+    advice, parser_tokens, analyze_tokens = battle_mod.analyze_battle_turn(TEXT, None, battle, mode=mode)
+    return battle, advice, parser_tokens, analyze_tokens, battle.turn_metrics[-1]
+
+
+def _check_tokens(model, parser_tokens, analyze_tokens, metric):
+    """ 모든 호출(버린 추측 조언 포함)의 토큰이 턴 합계에 들어가야 함 """
+    assert metric["llm_calls"] == len(model.log)
+    assert metric["total_tokens"] == sum(model.log)
+    assert parser_tokens[2] + analyze_tokens[2] == sum(model.log)
+
+
+@pytest.mark.parametrize("mode", ["sequential", "single_call"])
+def test_mode_applies_update(session, fake_llm, mode):
+    model, reply = fake_llm
+    reply["update"] = dict(battle_mod.local_preparse(TEXT, session.battle), opp_hp_change_input=-25.0)
+    battle, advice, parser_tokens, analyze_tokens, metric = _run(session, mode)
+
+    assert battle.opp_active.current_hp_percent == pytest.approx(75.0)   # LLM 파서 결과가 반영됨
+    assert "테스트" in advice
+    assert metric["llm_calls"] == (2 if mode == "sequential" else 1)
+    assert metric["speculation"] is None
+    _check_tokens(model, parser_tokens, analyze_tokens, metric)
+
+
+def test_speculative_hit(session, fake_llm):
+    model, reply = fake_llm
+    reply["update"] = battle_mod.local_preparse(TEXT, session.battle)
+    battle, advice, parser_tokens, analyze_tokens, metric = _run(session, "speculative")
+
+    assert battle.opp_active.current_hp_percent == pytest.approx(60.0)
+    assert metric["speculation"] == "hit"
+    assert metric["llm_calls"] == 2
+    _check_tokens(model, parser_tokens, analyze_tokens, metric)
+
+
+def test_speculative_miss(session, fake_llm):
+    model, reply = fake_llm
+    reply["update"] = dict(battle_mod.local_preparse(TEXT, session.battle), opp_hp_change_input=-70.0)
+    battle, advice, parser_tokens, analyze_tokens, metric = _run(session, "speculative")
+
+    # 추측(-40%)은 버리고 LLM 파서 결과(-70%)로 반영, 버린 조언 토큰도 비용에 포함
+    assert battle.opp_active.current_hp_percent == pytest.approx(30.0)
+    assert metric["speculation"] == "miss"
+    assert metric["llm_calls"] == 3
+    _check_tokens(model, parser_tokens, analyze_tokens, metric)
+
+
+def test_guess_runs_on_a_copy(session, fake_llm, monkeypatch):
+    """ 추측 상태는 복사본에만: 작업 중에도 화면이 읽는 원본 배틀은 바뀌지 않음 """
+    model, reply = fake_llm
+    reply["update"] = battle_mod.local_preparse(TEXT, session.battle)
+    live = session.battle
+    seen = []
+    original = battle_mod.start_search
+
+    def spy(state):
+        seen.append((state is live, live.opp_active.current_hp_percent, state.opp_active.current_hp_percent))
+        return original(state)
+
+    monkeypatch.setattr(battle_mod, "start_search", spy)
+    _run(session, "sequential")
+    assert seen[0] == (False, 100.0, 60.0)   # LLM 파서를 기다리는 동안 추측 상태로 탐색
+    assert live.opp_active.current_hp_percent == pytest.approx(60.0)
+
+
+def test_fork_leaves_original_untouched(session):
+    battle = session.battle
+    battle.set_active("me", "Gholdengo")
+    before = battle.snapshot()
+    scratch = battle.fork()
+    scratch.apply_hp("opp", -50)
+    scratch.set_active("opp", "Ting-Lu")
+    assert battle.snapshot() == before
+    assert "Ting-Lu" not in battle.opp_revealed_party
+    # 복사본에서 만든 상대는 실제 반영 때 같은 초기 상태로 재사용
+    battle.set_active("opp", "Ting-Lu")
+    assert battle.opp_active.snapshot() == scratch.opp_revealed_party["Ting-Lu"].snapshot()
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import battle_log
+from battle_snapshot import snapshot_to_dict
+from battle_state import BattleState
+
+
+def _state():
+    state = BattleState()
+    state.prewarm_enabled = False
+    return state
+
+
+def _dump(state):
+    """ 비교용: 현재 상태 + 되돌리기/다시 실행 스택 전체 """
+    history = state.history
+    return json.dumps({
+        "current": snapshot_to_dict(state.snapshot()),
+        "undo": [(label, snapshot_to_dict(s)) for label, s in history.undo_stack],
+        "redo": [(label, snapshot_to_dict(s)) for label, s in history.redo_stack],
+    }, sort_keys=True, ensure_ascii=False)
+
+
+def _play(state):
+    """ 턴 중간 체크포인트가 undo/redo 앞뒤 어디에나 걸리도록 섞인 순서 """
+    state.initialize_opponent(["Ting-Lu", "Koraidon", "Flutter Mane"])
+    state.set_active("opp", "Ting-Lu")
+    state.commit("lead")
+    state.apply_hp("opp", -30)
+    state.end_turn(); state.commit("turn 1")
+    state.end_turn(); state.commit("turn 2")
+    state.end_turn()
+    state.undo()
+    state.set_active("opp", "Koraidon")
+    state.apply_hp("opp", -50)
+    state.end_turn(); state.commit("turn 3")
+    state.undo(); state.undo(); state.redo()
+
+
+@pytest.mark.parametrize("checkpoint_every", [1, 2, 3, 5, 1000])
+def test_replay_with_and_without_checkpoint_match(tmp_path, checkpoint_every):
+    live = _state()
+    log = battle_log.start(live, log_dir=str(tmp_path))
+    log.checkpoint_every = checkpoint_every
+    _play(live)
+    log.close()
+
+    full, from_ckpt = _state(), _state()
+    battle_log.replay(log.battle_id, full, log_dir=str(tmp_path), use_checkpoint=False)
+    stats = battle_log.replay(log.battle_id, from_ckpt, log_dir=str(tmp_path), use_checkpoint=True)
+
+    assert _dump(full) == _dump(live)
+    assert _dump(from_ckpt) == _dump(live)
+    if checkpoint_every < 1000:
+        assert stats["from_seq"] > 0
+
+    # 복원된 기록 위에서 계속 되돌려도 같은 상태
+    for state in (live, full, from_ckpt):
+        state.log = None
+        state.undo(); state.undo()
+    assert _dump(from_ckpt) == _dump(full) == _dump(live)
+
+
+def test_mid_turn_checkpoint_undo(tmp_path):
+    """ 리뷰에서 재현한 순서: end_turn/commit x2, end_turn, undo (checkpoint_every=3) """
+    live = _state()
+    log = battle_log.start(live, log_dir=str(tmp_path))
+    log.checkpoint_every = 3
+    live.end_turn(); live.commit("t")
+    live.end_turn(); live.commit("t")
+    live.end_turn()
+    live.undo()
+    log.close()
+
+    replayed = _state()
+    battle_log.replay(log.battle_id, replayed, log_dir=str(tmp_path), use_checkpoint=True)
+    assert live.turn_count == replayed.turn_count == 2
+
+
+def test_repeated_order_observation_after_checkpoint(tmp_path, local_data):
+    """ 같은 행동 순서를 두 번 관측: 체크포인트가 사이에 있어도 두 번째는 새 증거가 아님 """
+    live = _state()
+    log = battle_log.start(live, log_dir=str(tmp_path))
+    log.checkpoint_every = 1000
+    live.initialize_opponent(["Ting-Lu", "Koraidon", "Flutter Mane"])
+    live.set_active("opp", "Koraidon")
+    live.commit("lead")
+    live.observe_order(150, True)
+    live.commit("turn 1")
+    log.checkpoint(live)
+    live.observe_order(150, True)
+    live.commit("turn 2")
+    log.close()
+
+    full, from_ckpt = _state(), _state()
+    battle_log.replay(log.battle_id, full, log_dir=str(tmp_path), use_checkpoint=False)
+    stats = battle_log.replay(log.battle_id, from_ckpt, log_dir=str(tmp_path), use_checkpoint=True)
+    assert stats["from_seq"] > 0
+    weights = [s.opp_active.belief.weights.tolist() for s in (live, full, from_ckpt)]
+    assert weights[0] == weights[1] == weights[2]
+    assert _dump(from_ckpt) == _dump(full) == _dump(live)
+
+
+def test_start_closes_previous_log(tmp_path):
+    """ 같은 세션에서 선출 분석을 다시 하면 이전 로그 파일을 닫고 새 로그에만 기록 """
+    state = _state()
+    first = battle_log.start(state, log_dir=str(tmp_path))
+    state.end_turn(); state.commit("t")
+    second = battle_log.start(state, log_dir=str(tmp_path))
+    assert first._file is None and state.log is second
+    events = list(battle_log.read_events(first.path))
+
+    state.end_turn(); state.commit("t")
+    assert list(battle_log.read_events(first.path)) == events
+    second.close()
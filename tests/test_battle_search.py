@@ -0,0 +1,53 @@
+import numpy as np
+
+import win_probability
+from battle_search import BattleModel, SearchState, PICK_SIZE
+from win_probability import estimate_win_probability, win_table, format_win_report, RolloutTables, simulate
+
+
+def test_model_uses_selection(session):
+    battle = session.battle
+    battle.set_active("me", "Gholdengo")
+    model = BattleModel.from_battle(battle)
+    assert model.selected
+    assert set(model.names["me"]) == {"Urshifu-Rapid-Strike", "Gholdengo", "Incineroar"}
+    assert estimate_win_probability(battle, n=200, seed=0, model=model) is not None
+
+
+def test_model_without_selection_is_capped(session):
+    battle = session.battle
+    battle.my_entry_selection = []
+    battle.set_active("me", "Amoonguss")
+    model = BattleModel.from_battle(battle)
+    assert not model.selected
+    assert len(model.names["me"]) == PICK_SIZE
+    assert model.names["me"][0] == "Amoonguss"
+    # 선출 미정이면 승률을 내지 않음 (임시 3마리는 탐색용)
+    assert estimate_win_probability(battle, n=200, seed=0, model=model) is None
+    assert win_table(battle, n=200, seed=0, model=model) == []
+    assert "선출 미정" in format_win_report(None, model.selected)
+
+
+def _toy_model(my_hp, opp_moves, damage):
+    """ 계산기 없이 손으로 만든 모델 (내 포켓몬은 기술 없음, 스피드 동일) """
+    names = {"me": tuple(f"M{i}" for i in range(len(my_hp))), "opp": ("O",)}
+    moves = {"me": tuple(() for _ in my_hp), "opp": (tuple((m, 0) for m in opp_moves),)}
+    speed = {"me": (100,) * len(my_hp), "opp": (100,)}
+    return BattleModel(names, moves, speed, damage, SearchState(0, 0, tuple(my_hp), (1.0,)))
+
+
+def test_turn_limit_with_equal_hp_is_a_draw():
+    score, _ = simulate(RolloutTables(_toy_model([1.0], [], {})), 50, np.random.default_rng(0))
+    assert (score == 0.5).all()
+
+
+def test_opponent_does_not_see_first_turn_switch(monkeypatch):
+    """ 상대 기술은 교체 전 필드 포켓몬(M0) 기준: M0에게 센 기술을 골라 교체해 들어온 M1은 안 아픔 """
+    damage = {
+        ("opp", 0, 0, 0): (1.0, 0.9, 0.9, 0.9), ("opp", 0, 1, 0): (1.0, 0.0, 0.0, 0.0),   # m0: M0에게만 셈
+        ("opp", 0, 0, 1): (1.0, 0.1, 0.1, 0.1), ("opp", 0, 1, 1): (1.0, 1.0, 1.0, 1.0),   # m1: M1을 한 방에
+    }
+    monkeypatch.setattr(win_probability, "MAX_TURNS", 1)
+    tables = RolloutTables(_toy_model([1.0, 1.0], ["m0", "m1"], damage))
+    score, _ = simulate(tables, 50, np.random.default_rng(0), ("switch", 1))
+    assert (score == 1.0).all()   # M1이 멀쩡하므로 HP 합 2.0 > 1.0
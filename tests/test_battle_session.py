@@ -0,0 +1,21 @@
+import os
+
+from battle_session import BattleSession, SessionManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cap_eviction_skips_busy_sessions(local_data):
+    manager = SessionManager(max_sessions=1)
+    party = BattleSession("seed", os.path.join(ROOT, "my_team.txt")).party
+    old, new = BattleSession("old", party=party), BattleSession("new", party=party)
+    manager._sessions.update(old=old, new=new)   # old가 가장 오래 안 쓴 세션
+
+    with old.lock:   # 분석 작업이 old를 쓰는 중
+        evicted = manager.evict(force=True)
+    assert evicted == [new]
+    assert list(manager._sessions) == ["old"]
+
+    # 작업이 끝난 뒤에는 상한대로 정리됨
+    manager._sessions["newer"] = BattleSession("newer", party=party)
+    assert manager.evict(force=True) == [old]
@@ -0,0 +1,85 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import calc_server
+
+STATS = {"hp": 175, "atk": 182, "def": 120, "spa": 75, "spd": 81, "spe": 163}
+ATTACKER = {"name": "Urshifu-Rapid-Strike", "stats": STATS, "types": ["Fighting", "Water"]}
+DEFENDER = {"name": "Koraidon", "stats": STATS, "types": ["Fighting", "Dragon"]}
+MOVE = {"name": "Test Punch", "power": 80, "type": "Fighting", "category": "Physical"}
+
+
+@pytest.fixture(scope="module")
+def post():
+    server = calc_server.make_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    port = server.server_address[1]
+
+    def send(path, body, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            conn.request("POST", path, json.dumps(body), dict({"Content-Type": "application/json"}, **(headers or {})))
+            res = conn.getresponse()
+            return res.status, json.loads(res.read())
+        finally:
+            conn.close()
+
+    yield send
+    server.shutdown()
+    server.server_close()
+
+
+def _damage(**overrides):
+    return dict({"attacker": ATTACKER, "defender": DEFENDER, "move": MOVE}, **overrides)
+
+
+def test_damage_ok(post):
+    status, body = post("/damage", _damage(field={"weather": "Rain"}))
+    assert status == 200
+    assert body["result"]["move"] == "Test Punch"
+
+
+@pytest.mark.parametrize("item", [
+    _damage(field="rain"),
+    _damage(attacker=dict(ATTACKER, ranks=[1])),
+    _damage(defender=dict(DEFENDER, screens="reflect")),
+    _damage(attacker=dict(ATTACKER, stats=5)),
+])
+def test_bad_shapes_are_422(post, item):
+    status, body = post("/damage", item)
+    assert status == 422
+    assert "dict" in body["error"]
+
+
+def test_batch_isolates_failures(post):
+    status, body = post("/damage", {"requests": [_damage(), _damage(field="rain"), _damage()]})
+    assert status == 200
+    assert [("result" in r, "error" in r) for r in body["results"]] == [(True, False), (False, True), (True, False)]
+
+
+def test_unexpected_errors_still_get_a_response(post, monkeypatch):
+    def boom(item):
+        raise RuntimeError("boom")
+    monkeypatch.setitem(calc_server.ENDPOINTS, "/stats", boom)
+    calc_server._coalescer.clear()
+
+    status, body = post("/stats", {"pokemon": "Koraidon"})
+    assert status == 500 and "boom" in body["error"]
+    status, body = post("/stats", {"requests": [{"pokemon": "Koraidon"}]})
+    assert status == 200 and "boom" in body["results"][0]["error"]
+
+    # handle() 자체가 실패해도 연결을 그냥 끊지 않음
+    monkeypatch.setattr(calc_server, "handle", lambda endpoint, body: 1 / 0)
+    status, body = post("/stats", {"pokemon": "Koraidon"})
+    assert status == 500 and "ZeroDivisionError" in body["error"]
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_400(post, length):
+    status, body = post("/damage", _damage(), {"Content-Length": length})
+    assert status == 400 and "Content-Length" in body["error"]
+    # 서버는 계속 응답함
+    assert post("/damage", _damage())[0] == 200
@@ -0,0 +1,53 @@
+import pytest
+
+from entry import extract_selection, strip_selection_block
+
+PARTY = ["Roaring Moon", "Gholdengo", "Urshifu-Rapid-Strike", "Incineroar", "Landorus-Therian", "Amoonguss"]
+BODY = ("1. **나의 추천 선출**:\n"
+        "   - **세 마리 구성 요약: Gholdengo, Incineroar, Amoonguss**\n"
+        "   - **선봉(Lead): Gholdengo**\n")
+
+
+def _report(selection_line=""):
+    return BODY + ("\n" + selection_line + "\n" if selection_line else "")
+
+
+@pytest.mark.parametrize("line", [
+    'SELECTION: {"lead": "Gholdengo", "back": ["Incineroar", "Amoonguss"]}',
+    '**SELECTION: {"lead": "gholdengo", "back": ["incineroar", "Amoonguss"]}**',   # 마크다운/소문자 id
+])
+def test_selection_block(line):
+    report = "아무 본문\n" + line   # 본문에 이름이 없어도 블록만으로 결정
+    assert extract_selection(report, PARTY) == (["Gholdengo", "Incineroar", "Amoonguss"], "block")
+
+
+def test_string_back_is_one_name():
+    line = 'SELECTION: {"lead": "Gholdengo", "back": "Incineroar"}'
+    assert extract_selection(line, ["Gholdengo", "Incineroar"]) == (["Gholdengo", "Incineroar"], "block")
+    # 3마리 파티에서는 블록이 모자라므로 본문에서 추출 (글자 단위로 쪼개진 이름이 섞이지 않음)
+    assert extract_selection(_report(line), PARTY) == (["Gholdengo", "Incineroar", "Amoonguss"], "local")
+
+
+def test_regex_fallback_without_block():
+    assert extract_selection(_report(), PARTY) == (["Gholdengo", "Incineroar", "Amoonguss"], "local")
+
+
+@pytest.mark.parametrize("line", [
+    "SELECTION: {lead: Gholdengo}",                                  # JSON 아님
+    'SELECTION: {"lead": ["Gholdengo"], "back": ["Incineroar"]}',    # lead가 목록
+    'SELECTION: {"lead": "Gholdengo", "back": {"a": "Incineroar"}}',  # back이 객체
+    'SELECTION: {"lead": "Pikachu", "back": ["Incineroar", "Amoonguss"]}',   # 파티에 없는 이름
+])
+def test_malformed_block_falls_back(line):
+    assert extract_selection(_report(line), PARTY) == (["Gholdengo", "Incineroar", "Amoonguss"], "local")
+
+
+@pytest.mark.parametrize("report", [None, "", "선출 추천 없음"])
+def test_nothing_found(report):
+    assert extract_selection(report, PARTY) == ([], None)
+
+
+def test_strip_selection_block():
+    line = 'SELECTION: {"lead": "Gholdengo", "back": ["Incineroar", "Amoonguss"]}'
+    assert strip_selection_block(_report(line)) == BODY.rstrip()
+    assert strip_selection_block(None) == ""
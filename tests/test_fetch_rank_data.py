@@ -0,0 +1,63 @@
+import json
+import os
+from operator import itemgetter
+
+import pytest
+
+from Statistics.fetch_rank_data import stream_rank_data, iter_file_chunks
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "chaos_small.json")
+
+
+def _sorted(d, n=None):
+    items = sorted((d or {}).items(), key=itemgetter(1), reverse=True)
+    return items if n is None else items[:n]
+
+
+def reference(path, min_usage=0.01, top_k=None):
+    """ 기존 방식: json.load로 전체를 읽고 dict로 가공한 뒤 json.dump """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    rows = [(name, stats) for name, stats in raw["data"].items() if stats.get("usage", 0) >= min_usage]
+    if top_k is not None:
+        rows = sorted(rows, key=lambda r: r[1]["usage"], reverse=True)[:top_k]
+    processed = {
+        name: {
+            "Usage_Rate": round(stats.get("usage", 0) * 100, 2),
+            "Moves": _sorted(stats.get("Moves"), 10),
+            "Items": _sorted(stats.get("Items"), 5),
+            "Abilities": _sorted(stats.get("Abilities"), 3),
+            "TeraTypes": _sorted(stats.get("Tera Types")),
+            "Spreads": _sorted(stats.get("Spreads"), 3),
+            "Teammates": _sorted(stats.get("Teammates"), 10),
+        }
+        for name, stats in rows
+    }
+    return json.dumps(processed, indent=2, ensure_ascii=False), len(processed)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_stream_matches_json_load(tmp_path, chunk_size):
+    """ 작은 청크(숫자/문자열이 경계에서 잘림)든 큰 청크든 기존 출력과 글자 단위로 같아야 함 """
+    out = tmp_path / "rank.json"
+    count = stream_rank_data(iter_file_chunks(FIXTURE, chunk_size), str(out))
+    expected, expected_count = reference(FIXTURE)
+    assert count == expected_count == 4
+    assert out.read_text(encoding="utf-8") == expected
+
+
+@pytest.mark.parametrize("min_usage, top_k", [(0.0, None), (0.02, None), (0.01, 2), (0.0, 1), (0.5, 3)])
+def test_min_usage_and_top_k(tmp_path, min_usage, top_k):
+    out = tmp_path / "rank.json"
+    count = stream_rank_data(FIXTURE, str(out), min_usage=min_usage, top_k=top_k)
+    expected, expected_count = reference(FIXTURE, min_usage, top_k)
+    assert count == expected_count
+    assert out.read_text(encoding="utf-8") == expected
+    assert list(json.loads(out.read_text(encoding="utf-8"))) == list(json.loads(expected))
+
+
+def test_truncated_input_raises(tmp_path):
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        text = f.read()
+    with pytest.raises(ValueError):
+        stream_rank_data(iter([text[: len(text) // 2]]), str(tmp_path / "rank.json"))
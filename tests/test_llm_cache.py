@@ -0,0 +1,37 @@
+import os
+
+import llm_provider
+from llm_provider import ResponseCache
+
+
+def test_put_scans_directory_only_when_needed(tmp_path, monkeypatch):
+    cache = ResponseCache(cache_dir=str(tmp_path), max_bytes=10_000)
+    scans = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(llm_provider.os, "listdir", lambda d: scans.append(d) or real_listdir(d))
+
+    for i in range(20):
+        cache.put(f"k{i}", "x" * 100, {})
+    assert scans == []   # 상한 아래에서는 디렉터리 전체를 훑지 않음
+    assert cache._total == sum(os.path.getsize(tmp_path / n) for n in real_listdir(tmp_path))
+
+    for i in range(20, 80):
+        cache.put(f"k{i}", "x" * 100, {})
+    assert scans   # 추정 총량이 상한을 넘으면 오래된 순으로 정리
+    assert sum(os.path.getsize(tmp_path / n) for n in real_listdir(tmp_path)) <= 10_000
+    assert cache.get("k79") is not None and cache.get("k0") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_overwrite_does_not_double_count(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    for _ in range(3):
+        cache.put("k", "x" * 100, {})
+    assert cache._total == os.path.getsize(tmp_path / "k.json")
+    cache.clear()
+    assert cache._total == 0
+
+
+def test_startup_scan_counts_existing_files(tmp_path):
+    ResponseCache(cache_dir=str(tmp_path)).put("k", "x" * 100, {})
+    assert ResponseCache(cache_dir=str(tmp_path))._total == os.path.getsize(tmp_path / "k.json")
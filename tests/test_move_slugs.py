@@ -0,0 +1,60 @@
+import json
+
+from battle_codes import NameTable, MOVES
+from Calculator import move_loader
+
+
+def test_slug_from_registered_list():
+    table = NameTable()
+    i = table.intern("dracometeor")
+    assert table.slug(i) == "dracometeor"          # 표시 이름을 모르면 id 그대로 (PokeAPI 404)
+    table.add_slug("draco-meteor")
+    assert table.slug(i) == "draco-meteor"
+    assert table.slug(table.intern("Draco Meteor")) == "draco-meteor"
+    assert table.slug(table.intern("Make It Rain")) == "make-it-rain"   # 목록에 없으면 표시 이름에서
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+def test_smogon_id_fetches_right_slug(tmp_path, monkeypatch):
+    """ 캐시가 비어 있을 때 Smogon id('stealthrock')로 조회해도 올바른 PokeAPI 주소를 씀 """
+    urls = []
+
+    def fake_get(url, timeout=None):
+        urls.append(url)
+        if url == move_loader.MOVE_LIST_URL:
+            return _Response({"results": [{"name": "stealth-rock"}, {"name": "u-turn"}]})
+        return _Response({
+            "type": {"name": "rock"}, "damage_class": {"name": "status"}, "power": None, "priority": 0,
+            "accuracy": None, "names": [{"language": {"name": "ko"}, "name": "스텔스록"},
+                                        {"language": {"name": "en"}, "name": "Stealth Rock"}],
+        })
+
+    monkeypatch.setattr(move_loader, "OFFLINE", False)
+    monkeypatch.setattr(move_loader, "SLUG_FILE", str(tmp_path / "move_slugs.json"))
+    monkeypatch.setattr(move_loader, "CACHE_FILE", str(tmp_path / "moves_cache.json"))
+    monkeypatch.setattr(move_loader, "_SLUGS_READY", False)
+    monkeypatch.setattr(move_loader, "_MEMORY_CACHE", {})
+    monkeypatch.setattr(move_loader.requests, "get", fake_get)
+
+    data = move_loader.get_move_data("stealthrock")
+    assert urls == [move_loader.MOVE_LIST_URL, "https://pokeapi.co/api/v2/move/stealth-rock"]
+    assert data["name"] == "Stealth Rock" and data["type"] == "Rock"
+    assert MOVES.name(MOVES.intern("stealthrock")) == "Stealth Rock"
+    assert json.loads((tmp_path / "move_slugs.json").read_text()) == ["stealth-rock", "u-turn"]
+
+    # 목록은 한 번만 받음
+    move_loader.get_move_data("uturn")
+    assert urls.count(move_loader.MOVE_LIST_URL) == 1
+    assert urls[-1].endswith("/u-turn")
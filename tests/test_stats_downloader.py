@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from Statistics import stats_downloader
+from Statistics.stats_downloader import StatsJob, download
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "chaos_small.json")
+JOB = StatsJob("2025-12", "gen9bssregj", "1760", "chaos")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Smogon 통계 서버 흉내: ETag/Last-Modified 조건부 요청, Range(If-Range) 이어받기, 416 """
+    def do_GET(self):
+        stub = self.server
+        stub.seen.append(dict(self.headers))
+        body, etag, modified = stub.body, stub.etag, stub.last_modified
+
+        if self.headers.get("If-None-Match") == etag or (
+                not self.headers.get("If-None-Match") and self.headers.get("If-Modified-Since") == modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        status, payload = 200, body
+        rng = self.headers.get("Range")
+        if rng and self.headers.get("If-Range") in (None, etag, modified):
+            first = int(rng.split("=")[1].split("-")[0])
+            if first >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status, payload = 206, body[first:]
+
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", modified)
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {len(body) - len(payload)}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    with open(FIXTURE, "rb") as f:
+        body = f.read()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.body, server.etag, server.last_modified = body, '"v1"', "Mon, 01 Dec 2025 00:00:00 GMT"
+    server.seen = []
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/stats"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(stats_downloader, "BACKOFF", 0)
+
+
+def _get(stub, dest, **kwargs):
+    return download(JOB, str(dest), base_url=stub.base_url, **kwargs)
+
+
+def _meta(dest):
+    with open(str(dest) + ".meta.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_200_then_304_on_etag(stub, tmp_path):
+    dest = tmp_path / JOB.file_name
+    first = _get(stub, dest)
+    assert first.status == "downloaded" and first.bytes == len(stub.body)
+    assert dest.read_bytes() == stub.body
+    assert _meta(dest)["etag"] == '"v1"'
+
+    second = _get(stub, dest)
+    assert second.status == "not_modified"
+    assert stub.seen[-1]["If-None-Match"] == '"v1"'
+
+
+def test_304_on_if_modified_since(stub, tmp_path):
+    dest = tmp_path / JOB.file_name
+    _get(stub, dest)
+    meta = _meta(dest)
+    meta["etag"] = None
+    stats_downloader._save_meta(str(dest), meta)
+
+    result = _get(stub, dest)
+    assert result.status == "not_modified"
+    assert "If-None-Match" not in stub.seen[-1]
+    assert stub.seen[-1]["If-Modified-Since"] == stub.last_modified
+
+
+def test_206_resume(stub, tmp_path):
+    dest = tmp_path / JOB.file_name
+    half = len(stub.body) // 2
+    (tmp_path / (JOB.file_name + ".part")).write_bytes(stub.body[:half])
+    stats_downloader._save_meta(str(dest), {"part_validator": '"v1"'})
+
+    result = _get(stub, dest)
+    assert result.status == "resumed"
+    assert result.bytes == len(stub.body) - half
+    assert stub.seen[-1]["Range"] == f"bytes={half}-"
+    assert dest.read_bytes() == stub.body
+    assert not os.path.exists(str(dest) + ".part")
+
+
+def test_416_complete_part_is_promoted(stub, tmp_path):
+    """ 다 받은 .part가 교체 전에 남은 경우: 다시 받지 않고 검증 후 교체 """
+    dest = tmp_path / JOB.file_name
+    (tmp_path / (JOB.file_name + ".part")).write_bytes(stub.body)
+    stats_downloader._save_meta(str(dest), {"part_validator": '"v1"'})
+
+    result = _get(stub, dest)
+    assert result.status == "resumed" and result.bytes == 0
+    assert dest.read_bytes() == stub.body
+    assert _meta(dest)["etag"] == '"v1"'
+    assert not os.path.exists(str(dest) + ".part")
+
+    assert _get(stub, dest).status == "not_modified"
+
+
+def test_416_invalid_part_is_discarded(stub, tmp_path):
+    """ 원본보다 길거나 깨진 .part: 지우고 Range 없이 처음부터 """
+    dest = tmp_path / JOB.file_name
+    (tmp_path / (JOB.file_name + ".part")).write_bytes(b"x" * (len(stub.body) + 10))
+    stats_downloader._save_meta(str(dest), {"part_validator": '"v1"'})
+
+    result = _get(stub, dest)
+    assert result.status == "downloaded"
+    assert "Range" not in stub.seen[-1]
+    assert dest.read_bytes() == stub.body
+
+
+def test_verification_failure_keeps_old_file(stub, tmp_path):
+    dest = tmp_path / JOB.file_name
+    _get(stub, dest)
+    old_meta = _meta(dest)
+
+    stub.body, stub.etag = stub.body[: len(stub.body) // 2], '"v2"'   # 새 버전이 잘린 파일
+    result = _get(stub, dest)
+    assert result.status == "failed"
+    assert "검증" in result.error
+    with open(FIXTURE, "rb") as f:
+        assert dest.read_bytes() == f.read()
+    assert _meta(dest)["etag"] == old_meta["etag"]
+    assert not os.path.exists(str(dest) + ".part")
+
+
+def test_verify_hook_replaces_content_check(stub, tmp_path):
+    """ fetch_rank_data처럼 가공 패스를 검증으로 넘기면 그 함수만 한 번 호출됨 """
+    calls = []
+    result = _get(stub, tmp_path / JOB.file_name, verify=lambda kind, path: calls.append(kind) or True)
+    assert result.status == "downloaded"
+    assert calls == ["chaos"]
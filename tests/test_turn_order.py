@@ -0,0 +1,63 @@
+import pytest
+
+from battle import order_observable, observe_turn_order
+
+
+def _update(**kwargs):
+    data = {"my_switch": None, "opp_switch": None, "my_move_used": None, "opp_move_used": None}
+    data.update(kwargs)
+    return data
+
+
+@pytest.mark.parametrize("update, expected", [
+    (_update(my_move_used="Surging Strikes", opp_move_used="flareblitz"), True),
+    (_update(my_move_used="Aqua Jet", opp_move_used="flareblitz"), False),      # 선공기 vs 일반 기술
+    (_update(my_move_used="Surging Strikes"), False),                            # 상대는 기술을 안 씀
+    (_update(opp_move_used="flareblitz", my_switch="Gholdengo"), False),         # 교체 턴
+    (_update(my_move_used="Surging Strikes", opp_move_used="flareblitz", opp_switch="Ting-Lu"), False),
+    (None, False),
+])
+def test_order_observable(local_data, update, expected):
+    assert order_observable(update) is expected
+
+
+def test_unknown_order_does_not_touch_belief(session):
+    battle = session.battle
+    before = battle.opp_active.belief
+    same_priority = _update(my_move_used="Surging Strikes", opp_move_used="flareblitz")
+    assert observe_turn_order(battle, None, same_priority) is None
+    assert battle.opp_active.belief is before
+
+
+@pytest.mark.parametrize("update", [
+    _update(opp_move_used="flareblitz", my_switch="Gholdengo"),
+    _update(my_move_used="Aqua Jet", opp_move_used="flareblitz"),
+    _update(my_move_used="Surging Strikes"),
+])
+def test_non_speed_turns_are_not_observed(session, update):
+    battle = session.battle
+    before = battle.opp_active.belief
+    for opp_first in (True, False):
+        assert observe_turn_order(battle, opp_first, update) is None
+    assert battle.opp_active.belief is before
+
+
+def test_same_priority_turn_updates_belief(session):
+    battle = session.battle
+    before = battle.opp_active.belief
+    observe_turn_order(battle, True, _update(my_move_used="Surging Strikes", opp_move_used="flareblitz"))
+    assert battle.opp_active.belief is not before
+
+
+@pytest.mark.parametrize("trick_room, opp_first, expected", [
+    (False, True, "빠릅니다"),
+    (True, False, "빠릅니다 (트릭룸)"),      # 트릭룸에서 나중에 움직임 = 더 빠름
+    (True, True, "설명되지 않는"),           # 트릭룸에서 먼저 움직임 = 내 스피드 100보다 느림 (코라이돈으로는 불가능)
+    (False, False, "설명되지 않는"),
+])
+def test_trick_room_order_messages(session, trick_room, opp_first, expected):
+    battle = session.battle
+    battle.global_effects["trick_room"] = trick_room
+    msg = battle.observe_order(100, opp_first)
+    assert expected in msg
+    assert ("트릭룸" in msg) == trick_room
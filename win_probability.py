@@ -0,0 +1,219 @@
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# --- [모듈 임포트] ---
+from battle_search import BattleModel, CRIT_CHANCE
+from profiler import profiled
+
+# =========================================================
+# [승률 추정] 몬테카를로 롤아웃 (NumPy 배치)
+# - BattleModel(탐색 엔진과 같은 데미지/스피드 표)에서 남은 3:3을 끝까지 진행
+# - 고정 정책: 양쪽 모두 "현재 상대에게 기대 피해가 가장 큰 기술", 쓰러지면 다음 생존 포켓몬
+# - 난수(0.85~1.00 균등), 급소, 명중, 동속 동전 던지기, 남은 HP 반영
+# - 모든 롤아웃을 배열 한 번에 진행 (턴 단위 루프만 파이썬)
+# =========================================================
+
+DEFAULT_ROLLOUTS = 4000
+MAX_TURNS = 40
+Z_95 = 1.96
+
+WinEstimate = namedtuple("WinEstimate", ["p", "low", "high", "n", "avg_turns", "elapsed"])
+
+
+def wilson_interval(wins, n, z=Z_95):
+    """ 이항 비율의 Wilson 신뢰구간 (무승부는 0.5승으로 넣어서 호출) """
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class RolloutTables:
+    """
+    BattleModel -> 롤아웃용 배열
+    미확인 상대(아직 안 나온 선출)는 공개된 상대의 표를 돌아가며 빌려 쓰는 대리 포켓몬으로 둠
+    """
+    def __init__(self, model):
+        self.model = model
+        n_me = len(model.names["me"])
+        n_opp_seen = len(model.names["opp"])
+        self.opp_src = np.array(
+            list(range(n_opp_seen)) + [i % n_opp_seen for i in range(model.unknown_opp)], dtype=np.int64
+        )
+        n_opp = len(self.opp_src)
+        k = max([len(m) for side in ("me", "opp") for m in model.moves[side]] + [1])
+
+        # [공격 쪽, 공격자, 방어자, 기술] -> 명중률 / 최소 / 최대 / 급소 피해 비율, 우선도
+        self.tables = {}
+        for side, n_att, n_def in (("me", n_me, n_opp), ("opp", n_opp, n_me)):
+            shape = (n_att, n_def, k)
+            hit, lo, hi, crit = (np.zeros(shape) for _ in range(4))
+            prio = np.zeros((n_att, k), dtype=np.int64)
+            valid = np.zeros((n_att, k), dtype=bool)
+            for a in range(n_att):
+                src_a = a if side == "me" else self.opp_src[a]
+                moves = model.moves[side][src_a]
+                for m, (_, priority) in enumerate(moves):
+                    prio[a, m] = priority
+                    valid[a, m] = True
+                    for d in range(n_def):
+                        src_d = self.opp_src[d] if side == "me" else d
+                        hit[a, d, m], lo[a, d, m], hi[a, d, m], crit[a, d, m] = model.damage[(side, src_a, src_d, m)]
+            expected = hit * ((1 - CRIT_CHANCE) * (lo + hi) / 2 + CRIT_CHANCE * crit)
+            expected[~np.broadcast_to(valid[:, None, :], expected.shape)] = -1.0
+            self.tables[side] = {
+                "hit": hit, "lo": lo, "hi": hi, "crit": crit, "prio": prio,
+                "has_move": valid.any(axis=1),
+                "best": expected.argmax(axis=2),   # [공격자, 방어자] -> 정책 기술
+            }
+
+        self.speed = {
+            "me": np.array(model.speed["me"], dtype=np.int64),
+            "opp": np.array(model.speed["opp"], dtype=np.int64)[self.opp_src],
+        }
+        root = model.root
+        self.root_hp = {
+            "me": np.array(root.my_hp, dtype=float),
+            "opp": np.concatenate([np.array(root.opp_hp, dtype=float), np.ones(model.unknown_opp)]),
+        }
+
+    def sample_damage(self, rng, side, att, dfn, move):
+        """ 롤아웃별 피해 비율 (att/dfn/move: (N,) 정수 배열, move < 0이면 공격 없음) """
+        t = self.tables[side]
+        m = np.maximum(move, 0)
+        n = len(att)
+        roll = rng.random(n)
+        hit = rng.random(n) < t["hit"][att, dfn, m]
+        crit = rng.random(n) < CRIT_CHANCE
+        lo, hi = t["lo"][att, dfn, m], t["hi"][att, dfn, m]
+        dmg = np.where(crit, t["crit"][att, dfn, m], lo + (hi - lo) * roll)
+        return np.where(hit & (move >= 0), dmg, 0.0)
+
+
+def _replace_fainted(hp, active):
+    """ 필드 포켓몬이 쓰러진 롤아웃은 첫 번째 생존 포켓몬으로 교체 """
+    rows = np.arange(len(active))
+    alive = hp > 0
+    need = ~alive[rows, active] & alive.any(axis=1)
+    return np.where(need, alive.argmax(axis=1), active)
+
+
+def simulate(tables, n, rng, first_action=None):
+    """
+    n개의 롤아웃을 끝까지 진행.
+    first_action: 첫 턴 내 행동 ('move', 기술 번호) / ('switch', 파티 번호) (없으면 정책대로)
+    Returns: (승리 점수 배열 (승 1 / 무 0.5 / 패 0), 진행 턴 수 배열)
+    """
+    model = tables.model
+    rows = np.arange(n)
+    hp_me = np.tile(tables.root_hp["me"], (n, 1))
+    hp_opp = np.tile(tables.root_hp["opp"], (n, 1))
+    act_me = np.full(n, model.root.my_active, dtype=np.int64)
+    act_opp = np.full(n, model.root.opp_active, dtype=np.int64)
+    done = np.zeros(n, dtype=bool)
+    turns = np.zeros(n, dtype=np.int64)
+    t_me, t_opp = tables.tables["me"], tables.tables["opp"]
+
+    for turn in range(MAX_TURNS):
+        live = ~done
+        if not live.any():
+            break
+
+        # 1. 행동 선택 (첫 턴만 지정 행동 가능)
+        # 상대는 내 교체를 미리 알 수 없으므로 교체 전 필드 포켓몬 기준으로 기술 선택
+        my_move = np.where(t_me["has_move"][act_me], t_me["best"][act_me, act_opp], -1)
+        opp_move = np.where(t_opp["has_move"][act_opp], t_opp["best"][act_opp, act_me], -1)
+        if turn == 0 and first_action is not None:
+            kind, idx = first_action
+            if kind == "switch":
+                act_me = np.full(n, idx, dtype=np.int64)
+                my_move = np.full(n, -1, dtype=np.int64)
+            elif kind == "move":
+                my_move = np.full(n, idx, dtype=np.int64)
+
+        # 2. 행동 순서: 우선도 -> 스피드(트릭룸 반전) -> 동속은 동전 던지기
+        my_prio = np.where(my_move >= 0, t_me["prio"][act_me, np.maximum(my_move, 0)], 0)
+        opp_prio = np.where(opp_move >= 0, t_opp["prio"][act_opp, np.maximum(opp_move, 0)], 0)
+        my_spe, opp_spe = tables.speed["me"][act_me], tables.speed["opp"][act_opp]
+        faster = (my_spe < opp_spe) if model.trick_room else (my_spe > opp_spe)
+        speed_first = np.where(my_spe == opp_spe, rng.random(n) < 0.5, faster)
+        my_first = np.where(my_prio != opp_prio, my_prio > opp_prio, speed_first)
+
+        # 3. 피해 적용 (먼저 맞고 쓰러진 쪽은 행동 못 함)
+        d_me = tables.sample_damage(rng, "me", act_me, act_opp, my_move)
+        d_opp = tables.sample_damage(rng, "opp", act_opp, act_me, opp_move)
+        cur_opp, cur_me = hp_opp[rows, act_opp], hp_me[rows, act_me]
+
+        o1 = np.maximum(cur_opp - d_me, 0.0)
+        m1 = np.maximum(cur_me - d_opp * (o1 > 0), 0.0)
+        m2 = np.maximum(cur_me - d_opp, 0.0)
+        o2 = np.maximum(cur_opp - d_me * (m2 > 0), 0.0)
+        hp_opp[rows, act_opp] = np.where(live, np.where(my_first, o1, o2), cur_opp)
+        hp_me[rows, act_me] = np.where(live, np.where(my_first, m1, m2), cur_me)
+        turns += live
+
+        # 4. 교체 / 종료 판정
+        act_me = _replace_fainted(hp_me, act_me)
+        act_opp = _replace_fainted(hp_opp, act_opp)
+        done |= ~(hp_me > 0).any(axis=1) | ~(hp_opp > 0).any(axis=1)
+
+    me_alive = (hp_me > 0).any(axis=1)
+    opp_alive = (hp_opp > 0).any(axis=1)
+    score = np.where(me_alive & ~opp_alive, 1.0, np.where(opp_alive & ~me_alive, 0.0, 0.5))
+    # 턴 제한에 걸린 롤아웃은 남은 HP 합으로 판정 (같으면 무승부)
+    unfinished = me_alive & opp_alive
+    me_sum, opp_sum = hp_me.sum(axis=1), hp_opp.sum(axis=1)
+    by_hp = np.where(me_sum > opp_sum, 1.0, np.where(me_sum < opp_sum, 0.0, 0.5))
+    score = np.where(unfinished, by_hp, score)
+    return score, turns
+
+
+def _estimate(tables, n, rng, first_action=None):
+    start = time.perf_counter()
+    score, turns = simulate(tables, n, rng, first_action)
+    wins = float(score.sum())
+    low, high = wilson_interval(wins, n)
+    return WinEstimate(wins / n, low, high, n, float(turns.mean()), time.perf_counter() - start)
+
+
+@profiled("win_probability")
+def estimate_win_probability(battle, n=DEFAULT_ROLLOUTS, seed=None, model=None):
+    """ 현재 상태에서 고정 정책으로 끝까지 진행했을 때의 승률 (모델을 만들 수 없거나 선출 미정이면 None) """
+    model = model or BattleModel.from_battle(battle)
+    if model is None or not model.selected or not model.names["opp"]:
+        return None
+    return _estimate(RolloutTables(model), n, np.random.default_rng(seed))
+
+
+@profiled("win_table")
+def win_table(battle, n=DEFAULT_ROLLOUTS // 2, seed=None, model=None):
+    """
+    [행동별 승률표] 첫 턴 행동(기술/교체)을 고정하고 이후는 정책대로 진행
+    Returns: [(행동 이름, WinEstimate), ...] 승률 내림차순 (선출 미정이면 [])
+    """
+    model = model or BattleModel.from_battle(battle)
+    if model is None or not model.selected or not model.names["opp"]:
+        return []
+    tables = RolloutTables(model)
+    rng = np.random.default_rng(seed)
+    rows = []
+    for action in model.actions(model.root, "me"):
+        if action[0] == "pass": continue
+        rows.append((model.label("me", model.root, action), _estimate(tables, n, rng, action)))
+    rows.sort(key=lambda r: r[1].p, reverse=True)
+    return rows
+
+
+def format_win_report(estimate, selected=True):
+    if not selected:
+        return "🎲 [승률] 선출 미정 (내 선출 3마리를 정하면 계산)"
+    if estimate is None:
+        return "🎲 [승률] 계산 불가"
+    return (f"🎲 [승률] {estimate.p*100:.1f}% (95% 구간 {estimate.low*100:.1f}~{estimate.high*100:.1f}%, "
+            f"롤아웃 {estimate.n}회, 평균 {estimate.avg_turns:.1f}턴)")